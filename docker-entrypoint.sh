@@ -1,8 +1,8 @@
 #!/bin/bash
 set -e
 
-# Create backup directory (outside MySQL data dir)
-mkdir -p /opt/backups
+# Create backup and index directories (outside MySQL data dir)
+mkdir -p /opt/backups /opt/toolkit-data
 
 # Start MySQL in background using the original entrypoint
 docker-entrypoint.sh mysqld &
@@ -14,5 +14,10 @@ until mysqladmin ping -h localhost -u root -p${MYSQL_ROOT_PASSWORD} --silent 2>/
 done
 echo "MySQL is ready!"
 
-# Keep container running
-wait
+# Keep container running even when mysqld is stopped or crashed by
+# `toolkit network --type service|crash`; shut it down cleanly on exit
+trap 'mysqladmin -u root -p${MYSQL_ROOT_PASSWORD} shutdown 2>/dev/null; exit 0' TERM INT
+while true; do
+    sleep 1 &
+    wait $!
+done
@@ -0,0 +1,71 @@
+"""Replication protocol packet handling, fed from an in-memory stream
+
+    python -m unittest discover tests
+"""
+import io
+import os
+import struct
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'toolkit'))
+
+from utils import binlog_stream  # noqa: E402
+from utils.binlog_stream import ReplicationConnection, stream_events  # noqa: E402
+
+QUERY_EVENT = 2
+
+
+def event(body_size, position):
+    """A QUERY event of body_size bytes (19-byte header, no checksum)"""
+    length = 19 + body_size
+    header = struct.pack('<IBIIIH', 0, QUERY_EVENT, 1, length, position + length, 0)
+    return header + bytes([position & 0xff]) * body_size
+
+
+def packet(payload, seq):
+    return len(payload).to_bytes(3, 'little') + bytes([seq]) + payload
+
+
+def connection(payloads):
+    """A ReplicationConnection reading the given packet payloads, without a server"""
+    conn = ReplicationConnection.__new__(ReplicationConnection)
+    conn.reader = io.BytesIO(b''.join(packet(p, i & 0xff) for i, p in enumerate(payloads)))
+    conn.header = bytearray(4)
+    conn.buffer = bytearray(1 << 16)
+    conn.seq = 0
+    return conn
+
+
+class StreamEventsTest(unittest.TestCase):
+
+    def test_large_event_after_small_one(self):
+        small = event(100, 4)
+        large = event(200 * 1024, 4 + len(small))
+        conn = connection([b'\x00' + small, b'\x00' + large, b'\xfe\x00\x00\x00\x00'])
+        seen = []
+        stream_events(conn, lambda view, *_: seen.append(bytes(view)))
+        self.assertEqual(seen, [small, large])
+
+    def test_event_split_across_packets(self):
+        # Payloads of MAX_PACKET bytes continue in the next packet; shrink it
+        # so the split path runs without 16MB events
+        small = event(100, 4)
+        large = b'\x00' + event(5000, 4 + len(small))
+        chunks = [large[i:i + 1024] for i in range(0, len(large), 1024)]
+        if len(chunks[-1]) == 1024:
+            chunks.append(b'')
+        conn = connection([b'\x00' + small] + chunks + [b'\xfe\x00\x00\x00\x00'])
+        conn.buffer = bytearray(512)
+        saved = binlog_stream.MAX_PACKET
+        binlog_stream.MAX_PACKET = 1024
+        try:
+            seen = []
+            stream_events(conn, lambda view, *_: seen.append(bytes(view)))
+        finally:
+            binlog_stream.MAX_PACKET = saved
+        self.assertEqual(seen, [small, large[1:]])
+
+
+if __name__ == '__main__':
+    unittest.main()
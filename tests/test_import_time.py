@@ -0,0 +1,65 @@
+"""Startup import budget for the toolkit CLI
+
+Runs `python -X importtime toolkit.py <command>` in a fresh interpreter and
+checks that only the selected command's module is imported and that the
+cumulative import time stays within budget.
+
+    python -m unittest discover tests
+
+TOOLKIT_IMPORT_BUDGET_US overrides the budget on slow machines.
+"""
+import os
+import re
+import subprocess
+import sys
+import unittest
+
+TOOLKIT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'toolkit', 'toolkit.py')
+
+# Importing every command costs well over 100ms; the lazy registry keeps
+# help / status around half of that
+IMPORT_BUDGET_US = int(os.environ.get('TOOLKIT_IMPORT_BUDGET_US', 80000))
+RUNS = 3
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$')
+
+
+def import_times(command):
+    """[(module, cumulative_us, depth)] from -X importtime for one toolkit call"""
+    env = dict(os.environ, TOOLKIT_NO_DAEMON='1', TOOLKIT_RUN_RECORDS='off')
+    proc = subprocess.run([sys.executable, '-X', 'importtime', TOOLKIT, command],
+                          stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                          stderr=subprocess.PIPE, text=True, env=env, timeout=60)
+    modules = []
+    for line in proc.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            modules.append((match.group(4), int(match.group(2)), (len(match.group(3)) - 1) // 2))
+    return modules
+
+
+def total_us(modules):
+    """Cumulative time of top-level imports (nested ones are included in them)"""
+    return sum(us for _, us, depth in modules if depth == 0)
+
+
+class ImportTimeTest(unittest.TestCase):
+
+    def check(self, command, expected):
+        runs = [import_times(command) for _ in range(RUNS)]
+        commands = {name for name, _, _ in runs[0] if name.startswith('commands.')}
+        self.assertEqual(commands, expected,
+                         f"'toolkit {command}' should import only {expected or 'no command module'}")
+        best = min(total_us(modules) for modules in runs)
+        self.assertLessEqual(best, IMPORT_BUDGET_US,
+                             f"'toolkit {command}' imports took {best}us (budget {IMPORT_BUDGET_US}us)")
+
+    def test_help(self):
+        self.check('help', set())
+
+    def test_status(self):
+        self.check('status', {'commands.status'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+"""Fault timeline ordering and validation
+
+    python -m unittest discover tests
+"""
+import contextlib
+import io
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'toolkit'))
+
+from utils.timeline import Timeline  # noqa: E402
+
+
+def recording_actions(calls):
+    return {'x': (lambda p: calls.append(('start', p['n'])), lambda p: calls.append(('end', p['n'])))}
+
+
+class TimelineTest(unittest.TestCase):
+
+    def test_zero_duration_fault_starts_before_it_ends(self):
+        calls = []
+        timeline = Timeline([{'at': 0, 'action': 'x', 'duration': 0, 'params': {'n': 1}}],
+                            recording_actions(calls))
+        with contextlib.redirect_stdout(io.StringIO()):
+            timeline.run()
+        self.assertEqual(calls, [('start', 1), ('end', 1)])
+        self.assertFalse([entry for entry in timeline.log if entry['error']])
+
+    def test_earlier_fault_ends_before_next_starts(self):
+        timeline = Timeline([{'at': 1, 'action': 'x', 'duration': 1, 'params': {'n': 2}},
+                             {'at': 0, 'action': 'x', 'duration': 1, 'params': {'n': 1}}],
+                            recording_actions([]))
+        order = [(offset, kind, fault['params']['n']) for offset, kind, fault in timeline.transitions()]
+        self.assertEqual(order, [(0, 'start', 1), (1, 'end', 1), (1, 'start', 2), (2, 'end', 2)])
+
+    def test_negative_duration_rejected(self):
+        with self.assertRaises(ValueError):
+            Timeline([{'at': 0, 'action': 'x', 'duration': -1}], recording_actions([]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,314 @@
+"""Write path benchmark command"""
+import argparse
+import json
+import os
+import platform
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from commands.generate import generate_record, insert_batch_sql
+from commands.transaction import generate_random_text
+from utils.metrics import latency_summary, format_latency
+from utils.mysql_client import (
+    MySQLSession, execute_sql, get_binlog_status, binlog_bytes_between,
+)
+from utils.profiling import timed
+from utils.run_record import bind_run
+
+BENCH_TABLE = 'bench_rows'
+BENCH_LARGE_TABLE = 'bench_large'
+METHODS = ['single', 'multi', 'prepared', 'load-data', 'large-data']
+SESSION_MODES = ['pinned', 'per-statement']
+MAX_STATEMENT_BYTES = 32 * 1024 * 1024
+TOOLKIT_VERSION = '1.0.0'
+
+
+def parse_list(value, cast=int):
+    """'1,10,100' -> [1, 10, 100]"""
+    return [cast(v) for v in str(value).split(',') if v.strip()]
+
+
+# ============== Statements ==============
+
+@timed('bench.prepared_batch_sql')
+def prepared_batch_sql(count):
+    """count EXECUTEs of the bench_insert prepared statement in one transaction"""
+    statements = ['START TRANSACTION']
+    for name, email, status in (generate_record() for _ in range(count)):
+        statements.append(f"SET @n = '{name}', @e = '{email}', @s = '{status}'")
+        statements.append("EXECUTE bench_insert USING @n, @e, @s")
+    statements.append('COMMIT')
+    return ';\n'.join(statements) + ';'
+
+
+class LoadDataFile:
+    """TSV file in the LOAD DATA directory rewritten before each LOAD DATA INFILE"""
+
+    def __init__(self, directory, worker):
+        self.path = os.path.join(directory, f'toolkit-bench-{os.getpid()}-{worker}.tsv')
+
+    def statement(self, count):
+        """Write count rows; return the LOAD DATA statement and the file's size in bytes"""
+        with open(self.path, 'wb') as f:
+            for name, email, status in (generate_record() for _ in range(count)):
+                f.write(f"{name}\t{email}\t{status}\n".encode())
+            size = f.tell()
+        os.chmod(self.path, 0o644)
+        return (f"LOAD DATA INFILE '{self.path}' INTO TABLE {BENCH_TABLE} "
+                f"(name, email, status);"), size
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def secure_file_dir():
+    """Directory LOAD DATA INFILE may read from, or None if it is disabled"""
+    value = execute_sql("SELECT @@secure_file_priv;", raw=True)
+    if value == 'NULL':
+        return None
+    if value == '':
+        # Empty means unrestricted: any file mysqld can read
+        return tempfile.gettempdir()
+    return value.rstrip('/')
+
+
+# ============== Cases ==============
+
+def case_name(case):
+    name = f"{case['method']} batch={case['batch']} c={case['concurrency']} {case['session']}"
+    if case['method'] == 'large-data':
+        name += f" payload={case['payload_kb']}KB"
+    return name
+
+
+def build_cases(methods, batches, concurrency, sessions, payloads):
+    """Expand the benchmark matrix; single always uses batch 1"""
+    cases = []
+    for method in methods:
+        method_batches = [1] if method == 'single' else batches
+        method_payloads = payloads if method == 'large-data' else [None]
+        for payload_kb in method_payloads:
+            for batch in method_batches:
+                for workers in concurrency:
+                    for session in sessions:
+                        cases.append({'method': method, 'batch': batch, 'concurrency': workers,
+                                      'session': session, 'payload_kb': payload_kb})
+    return cases
+
+
+def make_statement(case, payload, load_file):
+    """Return a function producing one round trip's (SQL, bytes loaded from a file) for a case"""
+    method, batch = case['method'], case['batch']
+    if method == 'single':
+        return lambda: (insert_batch_sql(1, BENCH_TABLE), 0)
+    if method == 'multi':
+        return lambda: (insert_batch_sql(batch, BENCH_TABLE), 0)
+    if method == 'prepared':
+        return lambda: (prepared_batch_sql(batch), 0)
+    if method == 'load-data':
+        return lambda: load_file.statement(batch)
+    values = ','.join([f"('{payload}')"] * batch)
+    sql = f"INSERT INTO {BENCH_LARGE_TABLE} (data_text) VALUES {values};"
+    return lambda: (sql, 0)
+
+
+def bench_worker(case, worker, deadline, max_ops, payload, secure_dir, result, lock):
+    """Issue round trips until the deadline; record latency and volume"""
+    load_file = LoadDataFile(secure_dir, worker) if case['method'] == 'load-data' else None
+    statement = make_statement(case, payload, load_file)
+    setup = (f"PREPARE bench_insert FROM 'INSERT INTO {BENCH_TABLE} (name, email, status) "
+             f"VALUES (?, ?, ?)'") if case['method'] == 'prepared' else None
+    pinned = MySQLSession() if case['session'] == 'pinned' else None
+    latencies = []
+    sql_bytes = 0
+    try:
+        if pinned and setup:
+            pinned.execute(setup)
+        while time.perf_counter() < deadline and (not max_ops or len(latencies) < max_ops):
+            sql, file_bytes = statement()
+            start = time.perf_counter()
+            if pinned:
+                pinned.execute(sql)
+            else:
+                # Per-statement: connection setup is part of every round trip
+                with MySQLSession() as session:
+                    if setup:
+                        session.execute(setup)
+                    session.execute(sql)
+            latencies.append(time.perf_counter() - start)
+            # LOAD DATA's rows are in the file, not the statement text
+            sql_bytes += len(sql) + file_bytes
+    except Exception as e:
+        with lock:
+            result['errors'].append(str(e))
+    finally:
+        if pinned:
+            pinned.close()
+        if load_file:
+            load_file.remove()
+    with lock:
+        result['latencies'].extend(latencies)
+        result['sql_bytes'] += sql_bytes
+
+
+def reset_tables():
+    execute_sql(f"CREATE TABLE IF NOT EXISTS {BENCH_TABLE} LIKE users; "
+                f"CREATE TABLE IF NOT EXISTS {BENCH_LARGE_TABLE} ("
+                f"id INT AUTO_INCREMENT PRIMARY KEY, data_text LONGTEXT); "
+                f"TRUNCATE TABLE {BENCH_TABLE}; TRUNCATE TABLE {BENCH_LARGE_TABLE};")
+
+
+def run_case(case, duration, max_ops, secure_dir):
+    """Run one benchmark case and return its measurements"""
+    reset_tables()
+    payload = generate_random_text(case['payload_kb']) if case['method'] == 'large-data' else None
+    result = {'latencies': [], 'sql_bytes': 0, 'errors': []}
+    lock = threading.Lock()
+    before = get_binlog_status()
+    start = time.perf_counter()
+    deadline = start + duration
+    threads = [threading.Thread(target=bind_run(bench_worker),
+                                args=(case, w, deadline, max_ops, payload, secure_dir, result, lock))
+               for w in range(case['concurrency'])]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    after = get_binlog_status()
+
+    ops = len(result['latencies'])
+    rows = ops * case['batch']
+    binlog_bytes = binlog_bytes_between(before, after) if before and after else None
+    return dict(
+        case,
+        name=case_name(case),
+        elapsed_s=round(elapsed, 3),
+        ops=ops,
+        rows=rows,
+        rows_per_s=round(rows / elapsed, 1),
+        ops_per_s=round(ops / elapsed, 1),
+        sql_bytes=result['sql_bytes'],
+        sql_bytes_per_s=round(result['sql_bytes'] / elapsed, 1),
+        binlog_bytes=binlog_bytes,
+        binlog_bytes_per_s=round(binlog_bytes / elapsed, 1) if binlog_bytes is not None else None,
+        latency=latency_summary(result['latencies']),
+        errors=result['errors'][:5],
+    )
+
+
+# ============== Reporting ==============
+
+def format_rate(value, unit):
+    for scale, prefix in ((1e9, 'G'), (1e6, 'M'), (1e3, 'k')):
+        if value >= scale:
+            return f"{value / scale:.1f}{prefix}{unit}"
+    return f"{value:.0f}{unit}"
+
+
+def print_result(result, baseline=None):
+    """One line per case, with the change against a baseline run if given"""
+    line = (f"  {result['name']:54s} {format_rate(result['rows_per_s'], ' rows/s'):>14s} "
+            f"{format_rate(result['sql_bytes_per_s'], 'B/s'):>10s}  "
+            f"p50 {result['latency']['p50_ms']:.2f}ms  p99 {result['latency']['p99_ms']:.2f}ms")
+    if baseline and baseline.get('rows_per_s'):
+        change = (result['rows_per_s'] - baseline['rows_per_s']) / baseline['rows_per_s']
+        line += f"  ({change:+.1%} vs baseline)"
+    print(line)
+    if result['errors']:
+        print(f"    errors: {result['errors'][0]}")
+
+
+def print_fastest(results):
+    """Fastest case per method by rows/s"""
+    print("-" * 60)
+    print("Fastest per method:")
+    for method in METHODS:
+        candidates = [r for r in results if r['method'] == method and not r['errors']]
+        if candidates:
+            best = max(candidates, key=lambda r: r['rows_per_s'])
+            print(f"  {method:12s} {best['name']:54s} {best['rows_per_s']:.0f} rows/s")
+            print(f"  {'':12s} {format_latency(best['latency'])}")
+
+
+def run(args):
+    """Run write path benchmarks"""
+    parser = argparse.ArgumentParser(description='Benchmark the toolkit write paths')
+    parser.add_argument('--methods', default=','.join(METHODS),
+                        help=f'Comma-separated methods (default: {",".join(METHODS)})')
+    parser.add_argument('--batch', default='1,10,100,1000',
+                        help='Rows per round trip, comma-separated (default: 1,10,100,1000)')
+    parser.add_argument('--concurrency', default='1,4',
+                        help='Concurrent sessions, comma-separated (default: 1,4)')
+    parser.add_argument('--sessions', default='pinned',
+                        help='pinned, per-statement or both (default: pinned)')
+    parser.add_argument('--payload-kb', default='1,16,256',
+                        help='large-data row sizes in KB (default: 1,16,256)')
+    parser.add_argument('--duration', type=float, default=5, help='Seconds per case (default: 5)')
+    parser.add_argument('--ops', type=int, default=0, help='Stop each worker after N round trips')
+    parser.add_argument('--output', help='Write results as JSON to FILE')
+    parser.add_argument('--compare', help='Show changes against a previous --output file')
+    parser.add_argument('--keep', action='store_true', help='Keep the bench tables')
+    parser.add_argument('--json', action='store_true', help='Output as JSON')
+    opts = parser.parse_args(args)
+
+    methods = parse_list(opts.methods, str)
+    sessions = SESSION_MODES if opts.sessions == 'both' else parse_list(opts.sessions, str)
+    for value, allowed in ((methods, METHODS), (sessions, SESSION_MODES)):
+        unknown = set(value) - set(allowed)
+        if unknown:
+            parser.error(f"unknown value(s) {', '.join(sorted(unknown))} (choose from {', '.join(allowed)})")
+
+    secure_dir = None
+    if 'load-data' in methods:
+        secure_dir = secure_file_dir()
+        if not secure_dir:
+            print("Skipping load-data: secure_file_priv disables LOAD DATA INFILE")
+            methods.remove('load-data')
+
+    cases = build_cases(methods, parse_list(opts.batch), parse_list(opts.concurrency),
+                        sessions, parse_list(opts.payload_kb))
+    cases = [c for c in cases
+             if not c['payload_kb'] or c['payload_kb'] * 1024 * c['batch'] <= MAX_STATEMENT_BYTES]
+
+    baseline = {}
+    if opts.compare:
+        with open(opts.compare) as f:
+            baseline = {r['name']: r for r in json.load(f)['results']}
+
+    report = {
+        'toolkit_version': TOOLKIT_VERSION,
+        'mysql_version': execute_sql("SELECT VERSION();", raw=True),
+        'host': platform.node(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'duration_per_case_s': opts.duration,
+        'results': [],
+    }
+    if not opts.json:
+        print(f"Benchmarking {len(cases)} case(s), {opts.duration}s each "
+              f"(MySQL {report['mysql_version']})")
+        print("-" * 60)
+    try:
+        for case in cases:
+            result = run_case(case, opts.duration, opts.ops, secure_dir)
+            report['results'].append(result)
+            if not opts.json:
+                print_result(result, baseline.get(result['name']))
+    except KeyboardInterrupt:
+        print("\nBenchmark interrupted, reporting completed cases")
+    finally:
+        if not opts.keep:
+            execute_sql(f"DROP TABLE IF EXISTS {BENCH_TABLE}, {BENCH_LARGE_TABLE};")
+
+    if opts.output:
+        with open(opts.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if opts.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_fastest(report['results'])
+        if opts.output:
+            print(f"Results written to {opts.output}")
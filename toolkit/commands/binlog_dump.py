@@ -0,0 +1,220 @@
+"""Binlog streaming throughput command (registers as a replica)"""
+import argparse
+import json
+import random
+import sys
+import time
+import uuid
+
+from utils.binlog import (
+    HEADER_LEN, ROTATE_EVENT, GTID_EVENT, FORMAT_DESCRIPTION_EVENT, CHECKSUM_CRC32,
+    event_name, parse_gtid, parse_format_description,
+)
+from utils.binlog_stream import (
+    ReplicationConnection, ProtocolError, HEARTBEAT_EVENT, stream_events, rotate_target,
+)
+from utils.mysql_client import MYSQL_USER, MYSQL_PASSWORD, execute_sql
+from utils.mysqld import MYSQLD_SOCKET
+from utils.replica import gtid_set_intervals
+from utils.run_record import record_counts
+
+
+class DumpCounter:
+    """Per-event callback: counts events and bytes, applies the processing cost
+
+    Kept to integer updates on preallocated state so the consumer side adds
+    as little as possible to what the server and socket cost.
+    """
+
+    def __init__(self, limit=0, deadline=None, cost_us=0, progress=0):
+        self.limit = limit
+        self.deadline = deadline
+        self.cost = cost_us / 1e6
+        self.progress = progress
+        self.events = 0
+        self.bytes = 0
+        self.heartbeats = 0
+        self.transactions = 0
+        self.types = [0] * 256
+        self.last_gtid = bytearray(HEADER_LEN + 25)
+        self.rotations = []
+        self.checksums = True
+        self.start = time.perf_counter()
+        self.next_report = self.start + progress if progress else None
+        self.last_report = (self.start, 0, 0)
+
+    def __call__(self, event, type_code, timestamp, length, next_position):
+        now = time.perf_counter()
+        if type_code == HEARTBEAT_EVENT:
+            self.heartbeats += 1
+        else:
+            self.events += 1
+            self.bytes += length
+            self.types[type_code] += 1
+            if type_code == GTID_EVENT:
+                self.transactions += 1
+                self.last_gtid[:] = event[:HEADER_LEN + 25]
+            elif type_code == ROTATE_EVENT:
+                self.rotations.append(rotate_target(event[:length], self.checksums))
+            elif type_code == FORMAT_DESCRIPTION_EVENT:
+                self.checksums = parse_format_description(event, 0, length)[0] == CHECKSUM_CRC32
+            if self.cost:
+                # Busy-wait: a consumer doing per-event work, not sleeping
+                end = now + self.cost
+                while time.perf_counter() < end:
+                    pass
+        if self.next_report and now >= self.next_report:
+            self.report_progress(now)
+        if self.limit and self.events >= self.limit:
+            return False
+        if self.deadline and now >= self.deadline:
+            return False
+        return True
+
+    def report_progress(self, now):
+        since, events, size = self.last_report
+        elapsed = max(now - since, 1e-9)
+        print(f"  {now - self.start:7.1f}s  {self.events:>10d} events  "
+              f"{(self.events - events) / elapsed:>10.0f} ev/s  "
+              f"{(self.bytes - size) / elapsed / 1024 / 1024:>8.2f} MB/s", file=sys.stderr)
+        self.last_report = (now, self.events, self.bytes)
+        self.next_report = now + self.progress
+
+    def summary(self, elapsed):
+        elapsed = max(elapsed, 1e-9)
+        return {
+            'elapsed_s': round(elapsed, 3),
+            'events': self.events,
+            'bytes': self.bytes,
+            'transactions': self.transactions,
+            'heartbeats': self.heartbeats,
+            'events_per_s': round(self.events / elapsed, 1),
+            'mb_per_s': round(self.bytes / elapsed / 1024 / 1024, 3),
+            'last_gtid': parse_gtid(self.last_gtid, 0) if self.transactions else None,
+            'rotations': [f"{name}:{pos}" for name, pos in self.rotations],
+            'event_types': {event_name(code): count
+                            for code, count in enumerate(self.types) if count},
+        }
+
+
+def connect(opts):
+    """Open a replication connection over TCP if --host is given, else the local socket"""
+    if opts.host:
+        return ReplicationConnection(opts.user, opts.password, host=opts.host, port=opts.port)
+    return ReplicationConnection(opts.user, opts.password, unix_socket=opts.socket)
+
+
+def start_dump(conn, opts, gtid_set):
+    """Prepare the session, register as a replica and send COM_BINLOG_DUMP_GTID"""
+    # The server only sends checksummed events to replicas that announce they
+    # understand them; both variable names cover 8.0 and 8.4
+    conn.query("SET @master_binlog_checksum = @@global.binlog_checksum, "
+               "@source_binlog_checksum = @@global.binlog_checksum")
+    replica_uuid = str(uuid.uuid4())
+    conn.query(f"SET @slave_uuid = '{replica_uuid}', @replica_uuid = '{replica_uuid}'")
+    if opts.follow and opts.heartbeat:
+        conn.query(f"SET @master_heartbeat_period = {int(opts.heartbeat * 1e9)}")
+    conn.register_replica(opts.server_id)
+    conn.binlog_dump_gtid(opts.server_id, gtid_set_intervals(gtid_set), block=opts.follow)
+
+
+def print_report(result):
+    print("-" * 60)
+    print(f"Events:        {result['events']} ({result['transactions']} transactions)")
+    print(f"Bytes:         {result['bytes']} ({result['bytes'] / 1024 / 1024:.1f} MB)")
+    print(f"Elapsed:       {result['elapsed_s']:.3f}s")
+    print(f"Throughput:    {result['events_per_s']:.0f} events/s, {result['mb_per_s']:.2f} MB/s")
+    if result['cost_us']:
+        print(f"Cost ceiling:  {1e6 / result['cost_us']:.0f} events/s at {result['cost_us']}us/event")
+    if result['checksum_failures']:
+        print(f"Checksums:     {result['checksum_failures']} event(s) failed CRC32")
+    if result['last_gtid']:
+        print(f"Last GTID:     {result['last_gtid']}")
+    if result['rotations']:
+        print(f"Rotations:     {', '.join(result['rotations'][-5:])}")
+    print("Event types:")
+    for name, count in sorted(result['event_types'].items(), key=lambda kv: -kv[1]):
+        print(f"  {name:24s} {count:>10d}")
+
+
+def run(args):
+    """Stream binlog events as a replica and report throughput"""
+    parser = argparse.ArgumentParser(
+        description='Stream binlog events with COM_BINLOG_DUMP_GTID and report events/s and MB/s')
+    parser.add_argument('--gtid-set', default='',
+                        help='Start after this GTID set (default: empty, stream everything retained)')
+    parser.add_argument('--from-current', action='store_true',
+                        help="Start after the server's current gtid_executed (use with --follow)")
+    parser.add_argument('--follow', action='store_true',
+                        help='Keep streaming new events instead of stopping at the end of the binlog')
+    parser.add_argument('--limit', type=int, default=0, help='Stop after N events')
+    parser.add_argument('--duration', type=float, default=0, help='Stop after N seconds')
+    parser.add_argument('--cost-us', type=float, default=0,
+                        help='Artificial per-event processing cost in microseconds (busy-wait)')
+    parser.add_argument('--verify-checksums', action='store_true',
+                        help='Check the CRC32 of every event while streaming')
+    parser.add_argument('--server-id', type=int, default=None,
+                        help='Replica server_id to register with (default: random)')
+    parser.add_argument('--heartbeat', type=float, default=1,
+                        help='Heartbeat period in seconds with --follow (default: 1)')
+    parser.add_argument('--progress', type=float, default=0,
+                        help='Print throughput to stderr every N seconds')
+    parser.add_argument('--host', help='Connect over TCP instead of the local socket')
+    parser.add_argument('--port', type=int, default=3306, help='TCP port (default: 3306)')
+    parser.add_argument('--socket', default=MYSQLD_SOCKET,
+                        help=f'Unix socket (default: {MYSQLD_SOCKET})')
+    parser.add_argument('--user', default=MYSQL_USER, help='User with REPLICATION SLAVE')
+    parser.add_argument('--password', default=MYSQL_PASSWORD)
+    parser.add_argument('--json', action='store_true', help='Output as JSON')
+    opts = parser.parse_args(args)
+
+    if opts.server_id is None:
+        opts.server_id = random.randint(100000, 2 ** 31)
+    gtid_set = opts.gtid_set
+    if opts.from_current:
+        gtid_set = execute_sql("SELECT @@GLOBAL.gtid_executed;", raw=True)
+
+    try:
+        conn = connect(opts)
+    except (OSError, ProtocolError) as e:
+        print(f"Error: could not connect: {e}")
+        sys.exit(1)
+
+    if not opts.json:
+        where = f"{opts.host}:{opts.port}" if opts.host else opts.socket
+        print(f"Streaming binlog from MySQL {conn.server_version} at {where} "
+              f"as server_id {opts.server_id}")
+        print(f"Starting after GTID set: {gtid_set or '(empty)'}")
+
+    error = None
+    counter = None
+    checksum_failures = 0
+    try:
+        start_dump(conn, opts, gtid_set)
+        deadline = time.perf_counter() + opts.duration if opts.duration else None
+        counter = DumpCounter(opts.limit, deadline, opts.cost_us, opts.progress)
+        _, checksum_failures = stream_events(conn, counter, opts.verify_checksums)
+    except KeyboardInterrupt:
+        pass
+    except (OSError, ProtocolError) as e:
+        error = str(e)
+    finally:
+        elapsed = time.perf_counter() - counter.start if counter else 0
+        conn.close()
+
+    if counter is None:
+        print(f"Error: {error}")
+        sys.exit(1)
+    result = counter.summary(elapsed)
+    result.update(server_id=opts.server_id, gtid_set=gtid_set, cost_us=opts.cost_us,
+                  checksum_failures=checksum_failures, error=error)
+    record_counts(events=result['events'], bytes=result['bytes'])
+
+    if opts.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+        if error:
+            print(f"Stream ended with error: {error}")
+    if error or checksum_failures:
+        sys.exit(1)
@@ -0,0 +1,143 @@
+"""Chunked source/destination table checksum command"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.checksum import (
+    MySQLBackend, open_backend, list_tables, plan_chunks, compare_chunk, diff_rows,
+    describe_chunk,
+)
+from utils.mysql_client import MYSQL_DATABASE
+from utils.run_record import bind_run, record_counts
+
+
+def compare_tables(source, destination, tables, chunk_size, workers, recheck, recheck_wait,
+                   rows=False, verbose=True):
+    """Checksum every chunk of tables on both sides; return per-table results"""
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for table in tables:
+            start = time.perf_counter()
+            chunks = plan_chunks(table, source, chunk_size)
+            compare = bind_run(lambda c: compare_chunk(source, destination, table, c))
+            compared = list(pool.map(compare, chunks))
+            # Chunks touched by in-flight changes (replication / CDC lag) settle on recheck
+            for _ in range(recheck):
+                pending = [c for c in compared if not c['match']]
+                if not pending:
+                    break
+                time.sleep(recheck_wait)
+                rechecked = {c['index']: c for c in pool.map(compare, pending)}
+                compared = [rechecked.get(c['index'], c) for c in compared]
+
+            mismatched = [c for c in compared if not c['match']]
+            if rows and table['key']:
+                for chunk in mismatched:
+                    if chunk['destination'] is not None:
+                        chunk['rows'] = diff_rows(source, destination, table, chunk)
+            row_count = sum(c['source'][0] for c in compared)
+            result = {
+                'table': table['name'],
+                'chunked_by': table['key'][0] if table['chunked'] else None,
+                'chunks': len(compared),
+                'rows': row_count,
+                'elapsed_s': round(time.perf_counter() - start, 3),
+                'mismatched': mismatched,
+            }
+            results.append(result)
+            record_counts(rows=row_count)
+            if verbose:
+                print_table(result, table)
+    return results
+
+
+def print_table(result, table):
+    state = 'OK' if not result['mismatched'] else f"{len(result['mismatched'])} MISMATCH"
+    rate = result['rows'] / max(result['elapsed_s'], 1e-6)
+    print(f"  {result['table']:28s} {result['chunks']:>6d} chunks {result['rows']:>12d} rows "
+          f"{result['elapsed_s']:>8.2f}s {rate:>10.0f} rows/s  {state}")
+    for chunk in result['mismatched']:
+        source = chunk['source']
+        dest = chunk['destination']
+        if dest is None:
+            detail = f"destination error: {chunk.get('error')}"
+        else:
+            detail = f"rows {source[0]} vs {dest[0]}, crc {source[1]:08x} vs {dest[1]:08x}"
+        print(f"      {describe_chunk(table, chunk):36s} {detail}")
+        rows = chunk.get('rows')
+        if rows:
+            for kind in ('missing', 'extra', 'changed'):
+                if rows[kind]:
+                    more = rows['counts'][kind] - len(rows[kind])
+                    suffix = f" (+{more} more)" if more > 0 else ''
+                    print(f"        {kind:8s} {', '.join(rows[kind])}{suffix}")
+
+
+def run(args):
+    """Compare tables between the source and a destination chunk by chunk"""
+    parser = argparse.ArgumentParser(
+        description='Checksum tables in primary-key chunks on the source and a destination '
+                    'and report mismatching chunks')
+    parser.add_argument('--dest', default='replica',
+                        help='Destination: replica, sqlite:///FILE, mysql://HOST:PORT/DB or '
+                             'mysql:///DB?socket=PATH (default: replica)')
+    parser.add_argument('--database', default=MYSQL_DATABASE,
+                        help=f'Source database (default: {MYSQL_DATABASE})')
+    parser.add_argument('--tables', help='Comma-separated tables (default: all base tables)')
+    parser.add_argument('--chunk-size', type=int, default=10000,
+                        help='Primary-key values per chunk (default: 10000)')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Parallel sessions per side (default: 4)')
+    parser.add_argument('--recheck', type=int, default=0,
+                        help='Re-compare mismatching chunks up to N times (for lagging destinations)')
+    parser.add_argument('--recheck-wait', type=float, default=2,
+                        help='Seconds between rechecks (default: 2)')
+    parser.add_argument('--rows', action='store_true',
+                        help='List missing/extra/changed keys in mismatching chunks')
+    parser.add_argument('--json', action='store_true', help='Output as JSON')
+    opts = parser.parse_args(args)
+    if opts.chunk_size < 1 or opts.workers < 1:
+        parser.error('--chunk-size and --workers must be at least 1')
+
+    try:
+        destination = open_backend(opts.dest, opts.database)
+    except ValueError as e:
+        parser.error(str(e))
+    names = [t.strip() for t in opts.tables.split(',') if t.strip()] if opts.tables else None
+    tables = list_tables(opts.database, names)
+    source = MySQLBackend(opts.database)
+
+    if not opts.json:
+        print(f"Checksumming {len(tables)} table(s) of {opts.database} against {destination.label} "
+              f"({opts.workers} workers, {opts.chunk_size} keys/chunk)")
+        print("-" * 60)
+    start = time.perf_counter()
+    try:
+        results = compare_tables(source, destination, tables, opts.chunk_size, opts.workers,
+                                 opts.recheck, opts.recheck_wait, opts.rows, not opts.json)
+    finally:
+        source.close()
+        destination.close()
+    elapsed = time.perf_counter() - start
+
+    total_rows = sum(r['rows'] for r in results)
+    mismatched = sum(len(r['mismatched']) for r in results)
+    if opts.json:
+        print(json.dumps({
+            'database': opts.database,
+            'destination': destination.label,
+            'elapsed_s': round(elapsed, 3),
+            'rows': total_rows,
+            'mismatched_chunks': mismatched,
+            'tables': results,
+        }, indent=2))
+    else:
+        print("-" * 60)
+        print(f"Compared {total_rows} rows in {elapsed:.2f}s "
+              f"({total_rows / max(elapsed, 1e-6):.0f} rows/s)")
+        print("Source and destination match" if not mismatched
+              else f"{mismatched} mismatching chunk(s)")
+    if mismatched:
+        sys.exit(1)
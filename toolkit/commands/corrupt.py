@@ -2,34 +2,51 @@
 import argparse
 import os
 import random
-import shutil
 from datetime import datetime
 
 from utils.mysql_client import get_binlog_status, get_current_binlog_path, BINLOG_DIR
+from utils.binlog import (
+    EVENT_TYPES, ROWS_EVENTS, TABLE_MAP_EVENT, HEADER_LEN, CHECKSUM_LEN,
+    build_event_index, open_binlog, parse_gtid, parse_table_map,
+    write_event_checksum,
+)
+from utils.backups import BACKUP_DIR, DeltaBackup, delta_size
+from utils.gtid_index import resolve_gtid
 
-BACKUP_DIR = '/opt/backups'
+EVENT_TYPE_CHOICES = sorted(EVENT_TYPES)
 
-
-def ensure_backup_dir():
-    """Ensure backup directory exists"""
-    os.makedirs(BACKUP_DIR, exist_ok=True)
+# Column type codes 0x15-0xf4 are unassigned (0xf5-0xff are JSON, NEWDECIMAL,
+# ..., GEOMETRY), so a decoder must reject this one
+INVALID_COLUMN_TYPE = 0x80
 
 
 def backup_binlog(binlog_path):
-    """Create backup of binlog file"""
-    ensure_backup_dir()
-    filename = os.path.basename(binlog_path)
-    backup_path = f"{BACKUP_DIR}/{filename}.backup"
-    shutil.copy2(binlog_path, backup_path)
-    print(f"Backup created: {backup_path}")
-    return backup_path
+    """Start a delta backup of a binlog file
+
+    Corruption functions record the ranges they touch on the returned
+    DeltaBackup; call finish_backup() once the corruption is applied.
+    """
+    return DeltaBackup(binlog_path, BACKUP_DIR)
+
 
+def finish_backup(backup):
+    """Write the delta backup and report its size"""
+    path = backup.commit()
+    if path:
+        print(f"Backup created: {path} ({delta_size(path)} bytes)")
+        if backup.tail_clone:
+            print(f"  Tail stored as reflink clone: {backup.tail_clone}")
+    return path
 
-def corrupt_truncate(binlog_path, percentage=50):
+
+def corrupt_truncate(binlog_path, percentage=50, backup=None):
     """Truncate binlog file at given percentage"""
     file_size = os.path.getsize(binlog_path)
     truncate_size = int(file_size * percentage / 100)
 
+    if backup:
+        backup.save_tail(truncate_size)
+
     with open(binlog_path, 'r+b') as f:
         f.truncate(truncate_size)
 
@@ -38,7 +55,7 @@ def corrupt_truncate(binlog_path, percentage=50):
     print(f"  New size: {truncate_size} bytes ({percentage}%)")
 
 
-def corrupt_random_bytes(binlog_path, num_corruptions=10):
+def corrupt_random_bytes(binlog_path, num_corruptions=10, backup=None):
     """Inject random bytes at random positions"""
     file_size = os.path.getsize(binlog_path)
 
@@ -52,8 +69,8 @@ def corrupt_random_bytes(binlog_path, num_corruptions=10):
         positions = []
         for _ in range(num_corruptions):
             pos = random.randint(min_pos, file_size - 1)
-            f.seek(pos)
-            original = f.read(1)
+            if backup:
+                backup.save_range(pos, 1)
             f.seek(pos)
             # Write random byte (different from original)
             new_byte = bytes([random.randint(0, 255)])
@@ -65,9 +82,11 @@ def corrupt_random_bytes(binlog_path, num_corruptions=10):
         print(f"  - {p}")
 
 
-def corrupt_magic_number(binlog_path):
+def corrupt_magic_number(binlog_path, backup=None):
     """Corrupt the magic number (first 4 bytes)"""
     # MySQL binlog magic number is: 0xfe 0x62 0x69 0x6e (þbin)
+    if backup:
+        backup.save_range(0, 4)
     with open(binlog_path, 'r+b') as f:
         original = f.read(4)
         f.seek(0)
@@ -79,23 +98,221 @@ def corrupt_magic_number(binlog_path):
     print(f"  New: 00000000")
 
 
+# ============== Event-aware corruption ==============
+
+def truncate_file(binlog_path, size):
+    """Truncate file to size bytes"""
+    with open(binlog_path, 'r+b') as f:
+        f.truncate(size)
+
+
+def describe_event(index, n):
+    """One-line description of an indexed event"""
+    ev = index.event(n)
+    return f"#{n} {ev['type_name']} @ {ev['offset']} (length {ev['length']})"
+
+
+def locate_event_cut(index, event_type, nth=1, start=0):
+    """Return (offset, description) for a cut in the middle of the nth event of a type"""
+    n = index.find_by_type(EVENT_TYPES[event_type], nth, start)
+    if n is None:
+        print(f"No {event_type} event #{nth} found")
+        return None
+
+    ev = index.event(n)
+    return ev['offset'] + ev['length'] // 2, f"Truncated inside {describe_event(index, n)}"
+
+
+def corrupt_checksum(index, buf, event_type, nth=1, backup=None, start=0):
+    """Break the CRC32 trailer of the nth event of a type"""
+    if not index.has_checksums:
+        print("Binlog has no event checksums (binlog_checksum=NONE)")
+        return False
+
+    n = index.find_by_type(EVENT_TYPES[event_type], nth, start)
+    if n is None:
+        print(f"No {event_type} event #{nth} found")
+        return False
+
+    ev = index.event(n)
+    crc_pos = ev['end'] - CHECKSUM_LEN
+    if backup:
+        backup.save_range(crc_pos, CHECKSUM_LEN)
+    original = bytes(buf[crc_pos:ev['end']])
+    buf[crc_pos] ^= 0xff
+
+    print(f"Broke checksum of {describe_event(index, n)}")
+    print(f"  CRC32 @ {crc_pos}: {original.hex()} -> {bytes(buf[crc_pos:ev['end']]).hex()}")
+    return True
+
+
+def corrupt_table_map(index, buf, table, nth=1, fix_checksum=False, backup=None, start=0):
+    """Write an invalid column type into the nth TABLE_MAP event for a table"""
+    n = index.find_table_event(buf, table, (TABLE_MAP_EVENT,), nth, start=start)
+    if n is None:
+        print(f"No TABLE_MAP event #{nth} found for table '{table}'")
+        return False
+
+    ev = index.event(n)
+    post_header = index.post_header_len(TABLE_MAP_EVENT, 8)
+    _, db, _, types_pos = parse_table_map(buf, ev['offset'], post_header)
+    if backup:
+        backup.save_range(types_pos, 1)
+        if fix_checksum and index.has_checksums:
+            backup.save_range(ev['end'] - CHECKSUM_LEN, CHECKSUM_LEN)
+    original = buf[types_pos]
+    buf[types_pos] = INVALID_COLUMN_TYPE
+
+    if fix_checksum and index.has_checksums:
+        write_event_checksum(buf, ev['offset'], ev['length'])
+
+    print(f"Corrupted {describe_event(index, n)} for {db}.{table}")
+    print(f"  Column type @ {types_pos}: {original:#04x} -> {INVALID_COLUMN_TYPE:#04x} (unassigned)")
+    print(f"  Checksum: {'recomputed' if fix_checksum else 'left stale'}")
+    return True
+
+
+def corrupt_rows_event(index, buf, table, nth=1, fix_checksum=False, num_bytes=8,
+                       backup=None, start=0):
+    """Flip bytes in the row image of the nth ROWS event for a table"""
+    n = index.find_table_event(buf, table, ROWS_EVENTS, nth, start=start)
+    if n is None:
+        print(f"No ROWS event #{nth} found for table '{table}'")
+        return False
+
+    ev = index.event(n)
+    body_start = ev['offset'] + HEADER_LEN + index.post_header_len(ev['type'], 10)
+    body_end = ev['end'] - (CHECKSUM_LEN if index.has_checksums else 0)
+    # Middle of the row image, clear of the table id / column bitmap
+    start = max(body_start, (body_start + body_end) // 2 - num_bytes // 2)
+    end = min(body_end, start + num_bytes)
+    if backup:
+        backup.save_range(start, end - start)
+        if fix_checksum and index.has_checksums:
+            backup.save_range(ev['end'] - CHECKSUM_LEN, CHECKSUM_LEN)
+    for pos in range(start, end):
+        buf[pos] ^= 0xff
+
+    if fix_checksum and index.has_checksums:
+        write_event_checksum(buf, ev['offset'], ev['length'])
+
+    print(f"Corrupted {describe_event(index, n)} for table {table}")
+    print(f"  Flipped bytes {start}-{end - 1}")
+    print(f"  Checksum: {'recomputed' if fix_checksum else 'left stale'}")
+    return True
+
+
+def locate_gtid_cut(index, buf, nth=1):
+    """Return (offset, description) for a cut right before the nth GTID event"""
+    if nth < 1 or nth > len(index.gtids):
+        print(f"No GTID event #{nth} found ({len(index.gtids)} in file)")
+        return None
+
+    ev = index.event(index.gtids[nth - 1])
+    gtid = parse_gtid(buf, ev['offset'])
+    return ev['offset'], f"Cut before GTID #{nth} ({gtid}) @ {ev['offset']}"
+
+
+def print_index(index):
+    """Print a summary of the event index"""
+    print(f"Events: {len(index)}")
+    print(f"Checksums: {'CRC32' if index.has_checksums else 'none'}")
+    if index.truncated_at is not None:
+        print(f"Truncated at: {index.truncated_at}")
+    for name, count in sorted(index.count_by_type().items()):
+        print(f"  {name:20s} {count:>8d}")
+    if index.tables:
+        print("Tables:")
+        for db, table in sorted(set(index.tables.values())):
+            print(f"  {db}.{table}")
+
+
+def apply_event_corruption(binlog_path, opts, backup=None, anchor=None):
+    """Index the binlog via mmap and apply an event-aware corruption
+
+    With an anchor (a GTID index entry) event searches start at that
+    transaction and gtid-cut cuts right before it.
+    """
+    with open_binlog(binlog_path, writable=True) as buf:
+        index = build_event_index(binlog_path, buf)
+        print(f"Indexed {len(index)} events")
+        start = index.event_at(anchor['start']) if anchor else 0
+
+        if opts.type == 'bad-checksum':
+            return corrupt_checksum(index, buf, opts.event_type, opts.nth, backup, start)
+        if opts.type == 'table-map':
+            return corrupt_table_map(index, buf, opts.table,
+                                     opts.nth, opts.fix_checksum, backup, start)
+        if opts.type == 'rows-event':
+            return corrupt_rows_event(index, buf, opts.table,
+                                      opts.nth, opts.fix_checksum, backup=backup, start=start)
+        if opts.type == 'truncate-event':
+            cut = locate_event_cut(index, opts.event_type, opts.nth, start)
+        elif anchor:
+            cut = anchor['start'], f"Cut before GTID {anchor['gtid']} @ {anchor['start']}"
+        else:  # gtid-cut
+            cut = locate_gtid_cut(index, buf, opts.nth)
+
+    if cut is None:
+        return False
+
+    # Truncation has to happen after the mapping is closed
+    truncate_at, message = cut
+    if backup:
+        backup.save_tail(truncate_at)
+    truncate_file(binlog_path, truncate_at)
+    print(message)
+    print(f"  Original size: {index.file_size} bytes")
+    print(f"  New size: {truncate_at} bytes")
+    return True
+
+
 def run(args):
     """Run corruption"""
     parser = argparse.ArgumentParser(description='Corrupt binlog for testing')
-    parser.add_argument('--type', required=True,
-                        choices=['truncate', 'random-bytes', 'magic-number'],
+    parser.add_argument('--type',
+                        choices=['truncate', 'random-bytes', 'magic-number',
+                                 'truncate-event', 'bad-checksum', 'table-map',
+                                 'rows-event', 'gtid-cut'],
                         help='Type of corruption')
     parser.add_argument('--file', help='Specific binlog file (default: current)')
+    parser.add_argument('--gtid', help='Target the transaction with this GTID (uuid:N) '
+                                       'via the binlog index')
     parser.add_argument('--percentage', type=int, default=50,
                         help='Truncate percentage (for truncate type)')
     parser.add_argument('--count', type=int, default=10,
                         help='Number of corruptions (for random-bytes type)')
+    parser.add_argument('--event-type', choices=EVENT_TYPE_CHOICES, default='write-rows',
+                        help='Event type (for truncate-event / bad-checksum)')
+    parser.add_argument('--nth', type=int, default=1,
+                        help='Which matching event to target, 1-based (default: 1)')
+    parser.add_argument('--table', help='Table name (for table-map / rows-event)')
+    parser.add_argument('--fix-checksum', action='store_true',
+                        help='Recompute CRC32 after corrupting an event body')
+    parser.add_argument('--inspect', action='store_true',
+                        help='Print the event index of the binlog and exit')
     parser.add_argument('--no-backup', action='store_true',
                         help='Skip creating backup')
     opts = parser.parse_args(args)
 
+    if not opts.type and not opts.inspect:
+        parser.error('--type is required')
+    if opts.type in ('table-map', 'rows-event') and not opts.table:
+        parser.error(f'--table is required for {opts.type}')
+
     # Get binlog path
-    if opts.file:
+    anchor = None
+    if opts.gtid:
+        anchor = resolve_gtid(opts.gtid)
+        if not anchor:
+            print(f"Error: GTID not found in binlog index: {opts.gtid}")
+            return
+        if anchor['stale']:
+            print(f"Error: GTID {opts.gtid} is past the end of {anchor['file']} (already cut)")
+            return
+        binlog_path = f"{BINLOG_DIR}/{anchor['file']}"
+        print(f"GTID {anchor['gtid']} -> {anchor['file']} @ {anchor['start']}-{anchor['end']}")
+    elif opts.file:
         binlog_path = f"{BINLOG_DIR}/{opts.file}"
     else:
         binlog_path = get_current_binlog_path()
@@ -104,24 +321,36 @@ def run(args):
         print(f"Error: Binlog file not found: {binlog_path}")
         return
 
+    if opts.inspect:
+        print(f"Binlog: {binlog_path}")
+        print("-" * 40)
+        print_index(build_event_index(binlog_path))
+        return
+
     print(f"Target: {binlog_path}")
     print(f"Corruption type: {opts.type}")
     print("-" * 40)
 
-    # Create backup unless disabled
-    if not opts.no_backup:
-        backup_binlog(binlog_path)
+    # Record a delta backup unless disabled
+    backup = None if opts.no_backup else backup_binlog(binlog_path)
 
     # Apply corruption
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     print(f"[{timestamp}] Applying corruption...")
 
     if opts.type == 'truncate':
-        corrupt_truncate(binlog_path, opts.percentage)
+        corrupt_truncate(binlog_path, opts.percentage, backup)
     elif opts.type == 'random-bytes':
-        corrupt_random_bytes(binlog_path, opts.count)
+        corrupt_random_bytes(binlog_path, opts.count, backup)
     elif opts.type == 'magic-number':
-        corrupt_magic_number(binlog_path)
+        corrupt_magic_number(binlog_path, backup)
+    elif not apply_event_corruption(binlog_path, opts, backup, anchor):
+        print("-" * 40)
+        print("No corruption applied")
+        return
+
+    if backup:
+        finish_backup(backup)
 
     print("-" * 40)
     print("Corruption complete!")
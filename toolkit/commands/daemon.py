@@ -0,0 +1,115 @@
+"""Toolkit daemon command"""
+import argparse
+import importlib
+import json
+import os
+import pkgutil
+import signal
+import subprocess
+import sys
+import time
+
+from utils.daemon import (
+    DAEMON_SOCKET, DAEMON_PIDFILE, DAEMON_LOG, ToolkitDaemon, daemon_request, daemon_pid,
+)
+from utils.mysql_client import enable_session_pool
+
+
+def warm_commands():
+    """Import every command module up front so forwarded calls never pay for it"""
+    import commands
+    for module in pkgutil.iter_modules(commands.__path__):
+        importlib.import_module(f"commands.{module.name}")
+
+
+def run_foreground(dispatch, pool_size):
+    """Run the daemon in this process until interrupted"""
+    warm_commands()
+    pool = enable_session_pool(pool_size)
+    with open(DAEMON_PIDFILE, 'w') as f:
+        f.write(str(os.getpid()))
+    try:
+        ToolkitDaemon(dispatch, DAEMON_SOCKET, pool).serve()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if os.path.exists(DAEMON_PIDFILE):
+            os.unlink(DAEMON_PIDFILE)
+
+
+def start_background(pool_size):
+    """Start the daemon as a detached process and wait for its socket"""
+    if daemon_pid():
+        print("Toolkit daemon is already running")
+        return
+    cmd = [sys.executable, os.path.abspath(sys.argv[0]), 'daemon', '--foreground',
+           '--pool-size', str(pool_size)]
+    with open(DAEMON_LOG, 'a') as log:
+        subprocess.Popen(cmd, stdout=log, stderr=log, stdin=subprocess.DEVNULL,
+                         start_new_session=True)
+    for _ in range(500):
+        if os.path.exists(DAEMON_SOCKET):
+            print(f"Toolkit daemon started ({DAEMON_SOCKET})")
+            return
+        time.sleep(0.01)
+    print(f"Toolkit daemon did not start, see {DAEMON_LOG}")
+
+
+def stop_daemon():
+    """Stop the background daemon"""
+    pid = daemon_pid()
+    if not pid:
+        print("Toolkit daemon is not running")
+        return
+    os.kill(pid, signal.SIGINT)
+    for _ in range(500):
+        if not daemon_pid():
+            break
+        time.sleep(0.01)
+    print("Toolkit daemon stopped")
+
+
+def print_status(status):
+    """Print daemon status"""
+    stats = status['stats']
+    pool = status['pool']
+    print(f"Toolkit daemon: pid {status['pid']}, up {status['uptime_s']}s, "
+          f"{status['modules']} modules loaded")
+    print(f"  Requests:   {stats['requests']} served, {status['active']} active, "
+          f"{stats['fallbacks']} sent back to the CLI, {stats['errors']} failed")
+    print(f"  MySQL pool: {pool['idle']} idle session(s), "
+          f"{pool['stats'].get('spawned', 0)} spawned, {pool['stats'].get('reused', 0)} reused, "
+          f"{pool['stats'].get('dropped', 0)} dropped")
+
+
+def run(args, dispatch=None):
+    """Run toolkit daemon control"""
+    parser = argparse.ArgumentParser(
+        description='Keep a warm toolkit process that the CLI forwards commands to')
+    parser.add_argument('--start', action='store_true', help='Start the daemon in the background')
+    parser.add_argument('--foreground', action='store_true', help='Run the daemon in this process')
+    parser.add_argument('--stop', action='store_true', help='Stop the daemon')
+    parser.add_argument('--status', action='store_true', help='Show daemon status')
+    parser.add_argument('--pool-size', type=int, default=4,
+                        help='Idle mysql sessions kept per connection target (default: 4)')
+    parser.add_argument('--json', action='store_true', help='Output as JSON')
+    opts = parser.parse_args(args)
+
+    if opts.foreground:
+        run_foreground(dispatch, opts.pool_size)
+        return
+    if opts.start:
+        start_background(opts.pool_size)
+        return
+    if opts.stop:
+        stop_daemon()
+        return
+
+    if not daemon_pid() or not os.path.exists(DAEMON_SOCKET):
+        print("Toolkit daemon is not running. Start it with: toolkit daemon --start")
+        sys.exit(1)
+    status = daemon_request({'status': True})
+    if opts.json:
+        print(json.dumps(status, indent=2))
+    else:
+        print_status(status)
@@ -5,6 +5,8 @@ import argparse
 from datetime import datetime
 
 from utils.mysql_client import execute_sql, get_record_count
+from utils.run_record import record_counts
+from utils.profiling import timed
 
 FIRST_NAMES = [
     "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda",
@@ -35,15 +37,22 @@ def generate_record():
     return name, email, status
 
 
-def insert_batch(count, table='users'):
-    """Insert a batch of records"""
+@timed('generate.insert_batch_sql')
+def insert_batch_sql(count, table='users'):
+    """Build a multi-row INSERT of random records"""
     values = []
     for _ in range(count):
         name, email, status = generate_record()
         values.append(f"('{name}', '{email}', '{status}')")
 
-    sql = f"INSERT INTO {table} (name, email, status) VALUES {','.join(values)};"
+    return f"INSERT INTO {table} (name, email, status) VALUES {','.join(values)};"
+
+
+def insert_batch(count, table='users'):
+    """Insert a batch of records"""
+    sql = insert_batch_sql(count, table)
     execute_sql(sql)
+    record_counts(rows=count, bytes=len(sql))
 
 
 def run(args):
@@ -0,0 +1,66 @@
+"""Schema version history command"""
+import argparse
+import json
+import sys
+from datetime import datetime
+
+from utils.schema_history import HISTORY_DB, SchemaHistory
+
+
+def print_versions(versions):
+    """Print recorded schema versions, newest first"""
+    for v in versions:
+        when = datetime.fromtimestamp(v['timestamp']).strftime("%Y-%m-%d %H:%M:%S")
+        ddl = ' '.join(v['ddl'].split())
+        print(f"  v{v['version']:<6d} {v['file']}:{v['position']:<10d} {v['gtid'] or '-'}")
+        print(f"          [{when}] {ddl[:100]}")
+
+
+def run(args):
+    """Run schema history lookup"""
+    parser = argparse.ArgumentParser(description='Schema versions keyed by binlog position / GTID')
+    parser.add_argument('--table', help='Table to look up (name or db.name)')
+    parser.add_argument('--gtid', help='Schema of --table as of this GTID')
+    parser.add_argument('--position', help='Schema of --table as of FILE:OFFSET')
+    parser.add_argument('--limit', type=int, default=20,
+                        help='Versions to list (default: 20)')
+    parser.add_argument('--db', default=HISTORY_DB, help=f'History database (default: {HISTORY_DB})')
+    parser.add_argument('--json', action='store_true', help='Output as JSON')
+    opts = parser.parse_args(args)
+
+    if (opts.gtid or opts.position) and not opts.table:
+        parser.error("--gtid/--position require --table")
+
+    with SchemaHistory(opts.db) as history:
+        if not (opts.gtid or opts.position):
+            versions = history.versions(opts.table, opts.limit)
+            if opts.json:
+                print(json.dumps(versions, indent=2))
+            else:
+                print(f"Schema history: {history.path}")
+                print("-" * 60)
+                print_versions(versions)
+            return
+
+        if opts.gtid:
+            version = history.version_at_gtid(opts.gtid)
+            where = opts.gtid
+        else:
+            name, _, offset = opts.position.rpartition(':')
+            version = history.version_at_position(name, int(offset))
+            where = opts.position
+        columns = history.table_at(opts.table, version)
+
+    if opts.json:
+        print(json.dumps({'table': opts.table, 'at': where, 'version': version,
+                          'columns': columns}, indent=2))
+    elif columns is None:
+        print(f"No schema recorded for {opts.table} at {where}")
+        if opts.gtid and version is None:
+            print("  (if the GTID is newer than the binlog index, run 'toolkit binlog-index' first)")
+    else:
+        print(f"{opts.table} at {where} (schema version {version}):")
+        for column in columns:
+            print(f"  {column}")
+    if columns is None:
+        sys.exit(1)
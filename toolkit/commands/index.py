@@ -0,0 +1,106 @@
+"""Binlog GTID / position / timestamp index command"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+
+from utils.gtid_index import GtidIndex, INDEX_DB
+
+
+def print_entry(entry, as_json=False):
+    """Print a single index lookup result"""
+    if as_json:
+        print(json.dumps(entry, indent=2))
+        return
+    if not entry:
+        print("Not found in index")
+        return
+    print(f"GTID:      {entry['gtid']}")
+    print(f"File:      {entry['file']}")
+    print(f"Start:     {entry['start']}")
+    print(f"End:       {entry['end']}")
+    print(f"Timestamp: {entry['time']} ({entry['timestamp']})")
+
+
+def print_stats(index):
+    """Print per-file index statistics"""
+    print(f"Index: {index.path}")
+    print("-" * 60)
+    total = 0
+    for s in index.stats():
+        total += s['gtids']
+        first = datetime.fromtimestamp(s['first_ts']).strftime("%H:%M:%S") if s['first_ts'] else '-'
+        last = datetime.fromtimestamp(s['last_ts']).strftime("%H:%M:%S") if s['last_ts'] else '-'
+        print(f"  {s['file']:20s} {s['gtids']:>9d} GTIDs  {first} - {last}  "
+              f"indexed to {s['indexed_to']}")
+    print("-" * 60)
+    print(f"Total: {total} GTIDs")
+
+
+def follow(index, interval):
+    """Keep the index up to date as binlogs are written"""
+    print(f"Following binlogs every {interval}s (Ctrl+C to stop)...")
+    try:
+        while True:
+            start = time.time()
+            added = index.update()
+            if added:
+                timestamp = datetime.now().strftime("%H:%M:%S")
+                summary = ', '.join(f"{name} +{count}" for name, count in added.items())
+                print(f"[{timestamp}] Indexed {sum(added.values())} GTID(s) "
+                      f"in {(time.time() - start) * 1000:.1f}ms: {summary}")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\nIndex follow stopped.")
+
+
+def run(args):
+    """Run binlog index"""
+    parser = argparse.ArgumentParser(description='GTID / position / timestamp index of binlogs')
+    parser.add_argument('--gtid', help='Look up file/offset of a GTID (uuid:N)')
+    parser.add_argument('--time', help='Look up first transaction at/after a time '
+                                       '(epoch or "YYYY-MM-DD HH:MM:SS")')
+    parser.add_argument('--position', help='Look up the transaction at FILE:OFFSET')
+    parser.add_argument('--follow', action='store_true',
+                        help='Keep updating the index as binlogs are written')
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help='Follow poll interval in seconds (default: 1)')
+    parser.add_argument('--rebuild', action='store_true', help='Drop and rebuild the index')
+    parser.add_argument('--db', default=INDEX_DB, help=f'Index database (default: {INDEX_DB})')
+    parser.add_argument('--json', action='store_true', help='Output as JSON')
+    opts = parser.parse_args(args)
+
+    with GtidIndex(opts.db) as index:
+        if opts.rebuild:
+            with index.conn:
+                index.conn.execute("DELETE FROM gtids")
+                index.conn.execute("DELETE FROM files")
+
+        start = time.time()
+        added = index.update()
+        elapsed = time.time() - start
+        if not opts.json:
+            print(f"Index updated: {sum(added.values())} new GTID(s) in {elapsed:.2f}s")
+
+        if opts.follow:
+            follow(index, opts.interval)
+            return
+
+        if opts.gtid:
+            entry = index.lookup_gtid(opts.gtid)
+        elif opts.time:
+            entry = index.lookup_time(opts.time)
+        elif opts.position:
+            name, _, offset = opts.position.rpartition(':')
+            entry = index.lookup_position(name, int(offset))
+        else:
+            if opts.json:
+                print(json.dumps(index.stats(), indent=2))
+            else:
+                print_stats(index)
+            return
+
+        print_entry(entry, opts.json)
+        if not entry:
+            sys.exit(1)
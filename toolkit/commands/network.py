@@ -5,59 +5,46 @@ import time
 import os
 from datetime import datetime
 
+from utils.timeline import Timeline, load_plan
+from utils.mysqld import MYSQLD_LOG, read_pid, mysqld_start, mysqld_stop, format_timing
+from utils.fault_proxy import DEFAULT_CONFIG, proxy_request
+
 
 # ============== MySQL Service Control ==============
 
 def mysql_is_running():
-    """Check if MySQL is running"""
-    result = subprocess.run(['ps', 'aux'], capture_output=True, text=True)
-    return 'mysqld' in result.stdout
+    """Check if MySQL is running (pidfile + live mysqld process)"""
+    return read_pid() is not None
 
 
-def mysql_stop():
-    """Stop MySQL service"""
+def mysql_stop(crash=False):
+    """Stop MySQL service (SIGTERM clean shutdown, or SIGKILL to simulate a crash)"""
     if not mysql_is_running():
         print("MySQL is already stopped")
-        return
-
-    print("Stopping MySQL...")
-    subprocess.run(['mysqladmin', '-uroot', '-prootpassword', 'shutdown'],
-                   capture_output=True, stderr=subprocess.DEVNULL)
-    time.sleep(2)
+        return None
 
-    if not mysql_is_running():
-        print("MySQL stopped successfully")
+    print("Crashing MySQL (SIGKILL)..." if crash else "Stopping MySQL...")
+    result = mysqld_stop(crash=crash)
+    if result.get('forced'):
+        print(f"MySQL force stopped ({format_timing(result)})")
     else:
-        # Force kill if graceful shutdown failed
-        subprocess.run(['pkill', '-9', 'mysqld'], capture_output=True)
-        print("MySQL force stopped")
+        print(f"MySQL {'killed' if crash else 'stopped successfully'} ({format_timing(result)})")
+    return result
 
 
 def mysql_start():
-    """Start MySQL service"""
+    """Start MySQL service and report time to first accepted connection"""
     if mysql_is_running():
         print("MySQL is already running")
-        return
+        return None
 
     print("Starting MySQL...")
-    subprocess.Popen(
-        ['mysqld', '--user=mysql'],
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL
-    )
-
-    # Wait for MySQL to be ready
-    for _ in range(30):
-        time.sleep(1)
-        result = subprocess.run(
-            ['mysqladmin', '-uroot', '-prootpassword', 'ping'],
-            capture_output=True
-        )
-        if result.returncode == 0:
-            print("MySQL started successfully")
-            return
-
-    print("Warning: MySQL may not be fully ready")
+    result = mysqld_start()
+    if result['ready']:
+        print(f"MySQL started successfully ({format_timing(result)})")
+    else:
+        print(f"Warning: MySQL may not be fully ready, see {MYSQLD_LOG}")
+    return result
 
 
 # ============== Firewall Control (iptables) ==============
@@ -80,6 +67,15 @@ def firewall_drop(port=3306):
     print(f"Firewall: Port {port} blocked (timeout/drop)")
 
 
+def firewall_remove(target, port=3306):
+    """Remove one REJECT/DROP rule added by firewall_reject/firewall_drop"""
+    rule = ['INPUT', '-p', 'tcp', '--dport', str(port), '-j', target]
+    if target == 'REJECT':
+        rule += ['--reject-with', 'tcp-reset']
+    subprocess.run(['iptables', '-D', *rule], capture_output=True)
+    print(f"Firewall: Port {port} {target} rule removed")
+
+
 def firewall_clear():
     """Clear all iptables rules"""
     subprocess.run(['iptables', '-F'], capture_output=True)
@@ -109,83 +105,155 @@ def get_default_interface():
     return 'eth0'
 
 
-def add_latency(latency_ms):
-    """Add latency to network traffic"""
+# Named link profiles for port-scoped shaping
+SHAPE_PROFILES = {
+    'cross-region': {'rate': '50mbit', 'delay_ms': 80, 'jitter_ms': 10,
+                     'distribution': 'normal', 'loss': 0.1},
+    'lossy-wifi': {'rate': '20mbit', 'delay_ms': 15, 'jitter_ms': 30,
+                   'distribution': 'pareto', 'loss': 3, 'loss_correlation': 25,
+                   'reorder': 1, 'reorder_correlation': 50},
+    'saturated-vpn': {'rate': '2mbit', 'delay_ms': 40, 'jitter_ms': 20,
+                      'distribution': 'paretonormal', 'loss': 0.5, 'loss_correlation': 10},
+    'satellite': {'rate': '5mbit', 'delay_ms': 600, 'jitter_ms': 50,
+                  'distribution': 'normal', 'loss': 1},
+}
+UNSHAPED_RATE = '10gbit'
+
+
+def netem_args(spec):
+    """Build netem options from a shaping spec"""
+    args = []
+    delay = spec.get('delay_ms', 0)
+    jitter = spec.get('jitter_ms', 0)
+    if delay or jitter or spec.get('reorder'):
+        args += ['delay', f'{delay}ms']
+        if jitter:
+            args.append(f'{jitter}ms')
+            if spec.get('delay_correlation'):
+                args.append(f"{spec['delay_correlation']}%")
+            if spec.get('distribution'):
+                args += ['distribution', spec['distribution']]
+    if spec.get('loss'):
+        args += ['loss', f"{spec['loss']}%"]
+        if spec.get('loss_correlation'):
+            args.append(f"{spec['loss_correlation']}%")
+    if spec.get('reorder'):
+        args += ['reorder', f"{spec['reorder']}%"]
+        if spec.get('reorder_correlation'):
+            args.append(f"{spec['reorder_correlation']}%")
+    return args
+
+
+def tc(*args):
+    """Run a tc command; raise with its stderr on failure"""
+    result = subprocess.run(['tc', *args], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"tc {' '.join(args)}: {result.stderr.strip()}")
+
+
+def clear_shaping(interface):
+    """Remove port filters, shaping classes and the root qdisc (whatever exists)"""
+    for args in (('filter', 'del', 'dev', interface, 'parent', '1:'),
+                 ('qdisc', 'del', 'dev', interface, 'parent', '1:10', 'handle', '10:'),
+                 ('class', 'del', 'dev', interface, 'classid', '1:10'),
+                 ('class', 'del', 'dev', interface, 'classid', '1:1'),
+                 ('qdisc', 'del', 'dev', interface, 'root')):
+        subprocess.run(['tc', *args], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def shape_port(spec, port=3306):
+    """Shape only traffic to/from a TCP port (htb rate + netem child)
+
+    Unmatched traffic goes to an unshaped default class, so other tools in
+    the container are unaffected. tc acts on egress, so this shapes what
+    MySQL sends (result sets, the binlog stream) and what local clients
+    send to the port.
+    """
     interface = get_default_interface()
+    clear_shaping(interface)
+    rate = spec.get('rate') or UNSHAPED_RATE
+    tc('qdisc', 'add', 'dev', interface, 'root', 'handle', '1:', 'htb', 'default', '1')
+    tc('class', 'add', 'dev', interface, 'parent', '1:', 'classid', '1:1',
+       'htb', 'rate', UNSHAPED_RATE)
+    tc('class', 'add', 'dev', interface, 'parent', '1:', 'classid', '1:10',
+       'htb', 'rate', rate, 'ceil', rate)
+    netem = netem_args(spec)
+    if netem:
+        tc('qdisc', 'add', 'dev', interface, 'parent', '1:10', 'handle', '10:', 'netem', *netem)
+    for match in ('sport', 'dport'):
+        tc('filter', 'add', 'dev', interface, 'protocol', 'ip', 'parent', '1:', 'prio', '1',
+           'u32', 'match', 'ip', match, str(port), '0xffff', 'flowid', '1:10')
+
+    details = ' '.join(netem) or 'no netem'
+    print(f"Shaping: port {port} on {interface}: rate {rate}, {details}")
+
+
+def add_latency(latency_ms, port=3306):
+    """Add latency to traffic on the MySQL port"""
+    try:
+        shape_port({'delay_ms': latency_ms}, port)
+    except Exception as e:
+        print(f"Error adding latency: {e}")
 
-    # Remove existing qdisc first
-    subprocess.run(
-        ['tc', 'qdisc', 'del', 'dev', interface, 'root'],
-        capture_output=True, stderr=subprocess.DEVNULL
-    )
 
-    # Add latency
-    result = subprocess.run([
-        'tc', 'qdisc', 'add', 'dev', interface, 'root', 'netem',
-        'delay', f'{latency_ms}ms'
-    ], capture_output=True, text=True)
+def remove_latency():
+    """Remove port shaping / latency"""
+    interface = get_default_interface()
+    clear_shaping(interface)
+    print(f"Latency: Removed shaping on {interface}")
 
-    if result.returncode == 0:
-        print(f"Latency: Added {latency_ms}ms delay on {interface}")
-    else:
-        print(f"Error adding latency: {result.stderr}")
 
+# ============== Fault Timeline ==============
+
+def proxy_set(params):
+    proxy_request({'set': params})
+
+
+def proxy_unset(params):
+    proxy_request({'set': {k: DEFAULT_CONFIG[k] for k in params}})
+
+
+# action -> (start, end); end is None for instant actions
+TIMELINE_ACTIONS = {
+    'service': (lambda p: mysql_stop(), lambda p: mysql_start()),
+    'crash': (lambda p: mysql_stop(crash=True), lambda p: mysql_start()),
+    'reject': (lambda p: firewall_reject(p.get('port', 3306)),
+               lambda p: firewall_remove('REJECT', p.get('port', 3306))),
+    'timeout': (lambda p: firewall_drop(p.get('port', 3306)),
+                lambda p: firewall_remove('DROP', p.get('port', 3306))),
+    'shape': (lambda p: shape_port(SHAPE_PROFILES.get(p.get('profile'), p), p.get('port', 3306)),
+              lambda p: remove_latency()),
+    'proxy': (proxy_set, proxy_unset),
+    'proxy-stall': (lambda p: proxy_request({'stall': p.get('seconds', 1)}), None),
+    'proxy-reset': (lambda p: proxy_request({'reset': p.get('connection')}), None),
+    'proxy-half-open': (lambda p: proxy_request({'half_open': p.get('connection')}), None),
+}
 
-def remove_latency():
-    """Remove latency from network traffic"""
-    interface = get_default_interface()
-    subprocess.run(
-        ['tc', 'qdisc', 'del', 'dev', interface, 'root'],
-        capture_output=True, stderr=subprocess.DEVNULL
-    )
-    print(f"Latency: Removed delay on {interface}")
+
+def run_plan(faults):
+    """Run a declarative fault plan (see utils/timeline.py)"""
+    Timeline(faults, TIMELINE_ACTIONS).run()
 
 
 # ============== Flapping Mode ==============
 
 def flap_connection(failure_type, interval, duration):
-    """Toggle connection up/down at intervals"""
+    """Toggle connection up/down at fixed slots of a monotonic timeline
+
+    Each down phase lasts interval seconds and starts every 2 * interval,
+    so a slow mysqld start/stop never shifts the following toggles.
+    """
     print(f"Starting flapping mode: {failure_type} every {interval}s for {duration}s")
     print("Press Ctrl+C to stop")
     print("-" * 40)
 
-    start_time = time.time()
-    is_down = False
-
-    try:
-        while (time.time() - start_time) < duration:
-            timestamp = datetime.now().strftime("%H:%M:%S")
-
-            if is_down:
-                # Bring up
-                if failure_type == 'service':
-                    mysql_start()
-                else:
-                    firewall_clear()
-                print(f"[{timestamp}] Connection UP")
-            else:
-                # Bring down
-                if failure_type == 'service':
-                    mysql_stop()
-                elif failure_type == 'reject':
-                    firewall_reject()
-                elif failure_type == 'timeout':
-                    firewall_drop()
-                print(f"[{timestamp}] Connection DOWN ({failure_type})")
-
-            is_down = not is_down
-            time.sleep(interval)
-
-    except KeyboardInterrupt:
-        print("\nFlapping stopped by user")
-
-    finally:
-        # Restore connectivity
-        if failure_type == 'service':
-            mysql_start()
-        else:
-            firewall_clear()
-        print("Connection restored")
+    faults = []
+    at = 0.0
+    while at < duration:
+        faults.append({'at': at, 'action': failure_type, 'duration': min(interval, duration - at)})
+        at += 2 * interval
+    run_plan(faults)
+    print("Connection restored")
 
 
 # ============== Status ==============
@@ -214,18 +282,24 @@ def show_status():
     else:
         print("  Status: Open (no blocks)")
 
-    # Latency status
-    print("\nLatency (tc):")
+    # Latency / shaping status
+    print("\nShaping (tc):")
     interface = get_default_interface()
     result = subprocess.run(
         ['tc', 'qdisc', 'show', 'dev', interface],
         capture_output=True, text=True
     )
-    if 'netem' in result.stdout and 'delay' in result.stdout:
+    if 'netem' in result.stdout or 'htb' in result.stdout:
         print(f"  Status: ACTIVE")
-        print(f"    {result.stdout.strip()}")
+        for line in result.stdout.strip().split('\n'):
+            print(f"    {line}")
+        classes = subprocess.run(['tc', 'class', 'show', 'dev', interface],
+                                 capture_output=True, text=True)
+        for line in classes.stdout.strip().split('\n'):
+            if line:
+                print(f"    {line}")
     else:
-        print("  Status: No latency added")
+        print("  Status: No shaping")
 
     print("=" * 50)
 
@@ -237,17 +311,29 @@ def run(args):
     parser = argparse.ArgumentParser(description='Network simulation for ETL testing')
     parser.add_argument('--down', action='store_true', help='Bring connection down')
     parser.add_argument('--up', action='store_true', help='Bring connection up (restore)')
-    parser.add_argument('--type', choices=['service', 'reject', 'timeout'],
+    parser.add_argument('--type', choices=['service', 'crash', 'reject', 'timeout'],
                         default='reject', help='Type of failure (default: reject)')
-    parser.add_argument('--duration', type=int, help='Auto-restore after N seconds')
+    parser.add_argument('--duration', type=float, help='Auto-restore after N seconds')
     parser.add_argument('--flap', action='store_true', help='Flapping mode (toggle up/down)')
-    parser.add_argument('--interval', type=int, default=30,
+    parser.add_argument('--interval', type=float, default=30,
                         help='Flapping interval in seconds (default: 30)')
     parser.add_argument('--slow', action='store_true', help='Enable latency injection')
     parser.add_argument('--latency', type=int, default=2000,
                         help='Latency in milliseconds (default: 2000)')
     parser.add_argument('--off', action='store_true', help='Disable latency')
+    parser.add_argument('--profile', choices=list(SHAPE_PROFILES),
+                        help='Slow: named link profile for the MySQL port')
+    parser.add_argument('--port', type=int, default=3306,
+                        help='Slow: port to shape (default: 3306)')
+    parser.add_argument('--rate', help='Slow: bandwidth limit, e.g. 2mbit, 512kbit')
+    parser.add_argument('--jitter', type=int, help='Slow: delay jitter in ms')
+    parser.add_argument('--distribution', choices=['uniform', 'normal', 'pareto', 'paretonormal'],
+                        help='Slow: jitter distribution')
+    parser.add_argument('--loss', type=float, help='Slow: packet loss percent')
+    parser.add_argument('--loss-correlation', type=float, help='Slow: loss correlation percent')
+    parser.add_argument('--reorder', type=float, help='Slow: reorder percent (needs delay)')
     parser.add_argument('--status', action='store_true', help='Show network status')
+    parser.add_argument('--plan', help='Run a fault timeline from a JSON plan file')
     opts = parser.parse_args(args)
 
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -266,12 +352,29 @@ def run(args):
         print("All connections restored")
         return
 
-    # Latency control
+    # Latency / shaping control
     if opts.slow:
         if opts.off:
             remove_latency()
-        else:
-            add_latency(opts.latency)
+            return
+        spec = dict(SHAPE_PROFILES[opts.profile]) if opts.profile else {'delay_ms': opts.latency}
+        overrides = {
+            'rate': opts.rate, 'jitter_ms': opts.jitter, 'distribution': opts.distribution,
+            'loss': opts.loss, 'loss_correlation': opts.loss_correlation,
+            'reorder': opts.reorder,
+        }
+        spec.update((k, v) for k, v in overrides.items() if v is not None)
+        if spec.get('distribution') == 'uniform':
+            del spec['distribution']
+        try:
+            shape_port(spec, opts.port)
+        except Exception as e:
+            print(f"Error applying shaping: {e}")
+        return
+
+    # Fault timeline
+    if opts.plan:
+        run_plan(load_plan(opts.plan))
         return
 
     # Flapping mode
@@ -286,6 +389,8 @@ def run(args):
 
         if opts.type == 'service':
             mysql_stop()
+        elif opts.type == 'crash':
+            mysql_stop(crash=True)
         elif opts.type == 'reject':
             firewall_reject()
         elif opts.type == 'timeout':
@@ -296,10 +401,10 @@ def run(args):
             print(f"Will auto-restore in {opts.duration} seconds...")
             time.sleep(opts.duration)
             print("Auto-restoring...")
-            if opts.type == 'service':
+            if opts.type in ('service', 'crash'):
                 mysql_start()
             else:
-                firewall_clear()
+                firewall_remove('REJECT' if opts.type == 'reject' else 'DROP')
             print("Connection restored")
 
         return
@@ -309,9 +414,12 @@ def run(args):
     print("  toolkit network --down --type reject     # Block with connection refused")
     print("  toolkit network --down --type timeout    # Block with timeout")
     print("  toolkit network --down --type service    # Stop MySQL")
+    print("  toolkit network --down --type crash      # SIGKILL MySQL (crash recovery on start)")
     print("  toolkit network --down --duration 60     # Auto-restore after 60s")
     print("  toolkit network --flap --interval 30     # Flapping mode")
-    print("  toolkit network --slow --latency 2000    # Add 2s latency")
+    print("  toolkit network --slow --latency 2000    # Add 2s latency on port 3306")
+    print("  toolkit network --slow --profile lossy-wifi  # Named link profile")
     print("  toolkit network --slow --off             # Remove latency")
+    print("  toolkit network --plan faults.json       # Run a fault timeline")
     print("  toolkit network --up                     # Restore all")
     print("  toolkit network --status                 # Show status")
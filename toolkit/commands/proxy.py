@@ -0,0 +1,167 @@
+"""Fault-injection TCP proxy command"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from utils.fault_proxy import (
+    PROXY_PORT, UPSTREAM_HOST, UPSTREAM_PORT, CONTROL_SOCKET, PROXY_PIDFILE, PROXY_LOG,
+    DEFAULT_CONFIG, FaultProxy, proxy_request, proxy_pid,
+)
+
+
+def parse_settings(pairs):
+    """['latency_ms=200', ...] -> {'latency_ms': '200', ...}"""
+    settings = {}
+    for pair in pairs or []:
+        key, sep, value = pair.partition('=')
+        if not sep or key not in DEFAULT_CONFIG:
+            raise ValueError(f"Invalid setting '{pair}' (keys: {', '.join(DEFAULT_CONFIG)})")
+        settings[key] = value
+    return settings
+
+
+def parse_target(value):
+    """'all' -> None (every connection), otherwise a connection id"""
+    return None if value == 'all' else int(value)
+
+
+def run_foreground(listen_port, upstream, settings):
+    """Run the proxy in this process until interrupted"""
+    host, _, port = upstream.rpartition(':')
+    config = {k: type(DEFAULT_CONFIG[k])(v) for k, v in settings.items()}
+    proxy = FaultProxy(listen_port, host or UPSTREAM_HOST, int(port), config)
+    with open(PROXY_PIDFILE, 'w') as f:
+        f.write(str(os.getpid()))
+    try:
+        asyncio.run(proxy.serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for path in (PROXY_PIDFILE, CONTROL_SOCKET):
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+def start_background(listen_port, upstream, settings):
+    """Start the proxy as a detached process and wait for its control socket"""
+    if proxy_pid():
+        print("Fault proxy is already running")
+        return
+    cmd = [sys.executable, os.path.abspath(sys.argv[0]), 'proxy', '--foreground',
+           '--listen', str(listen_port), '--upstream', upstream]
+    for key, value in settings.items():
+        cmd += ['--set', f"{key}={value}"]
+    with open(PROXY_LOG, 'a') as log:
+        subprocess.Popen(cmd, stdout=log, stderr=log, stdin=subprocess.DEVNULL,
+                         start_new_session=True)
+    for _ in range(200):
+        if os.path.exists(CONTROL_SOCKET):
+            print(f"Fault proxy started: port {listen_port} -> {upstream}")
+            return
+        time.sleep(0.01)
+    print(f"Fault proxy did not start, see {PROXY_LOG}")
+
+
+def stop_proxy():
+    """Stop the background proxy"""
+    pid = proxy_pid()
+    if not pid:
+        print("Fault proxy is not running")
+        return
+    os.kill(pid, signal.SIGINT)
+    for _ in range(200):
+        if not proxy_pid():
+            break
+        time.sleep(0.01)
+    print("Fault proxy stopped")
+
+
+def print_status(status):
+    """Print proxy status"""
+    print(f"Fault proxy: :{status['listen_port']} -> {status['upstream']}")
+    print(f"  Active connections: {status['active']}  "
+          f"(accepted {status['stats']['accepted']}, resets {status['stats']['resets']}, "
+          f"half-open {status['stats']['half_open']}, "
+          f"upstream errors {status['stats']['upstream_errors']})")
+    print(f"  Stalled: {'yes' if status['stalled'] else 'no'}")
+    for key, value in status['config'].items():
+        print(f"  {key:16s} {value}")
+
+
+def run(args):
+    """Run fault proxy control"""
+    parser = argparse.ArgumentParser(description='Userspace TCP fault-injection proxy for MySQL')
+    parser.add_argument('--start', action='store_true', help='Start the proxy in the background')
+    parser.add_argument('--foreground', action='store_true', help='Run the proxy in this process')
+    parser.add_argument('--stop', action='store_true', help='Stop the proxy')
+    parser.add_argument('--listen', type=int, default=PROXY_PORT,
+                        help=f'Listen port (default: {PROXY_PORT})')
+    parser.add_argument('--upstream', default=f'{UPSTREAM_HOST}:{UPSTREAM_PORT}',
+                        help=f'Upstream HOST:PORT (default: {UPSTREAM_HOST}:{UPSTREAM_PORT})')
+    parser.add_argument('--set', action='append', metavar='KEY=VALUE',
+                        help=f'Fault setting, repeatable ({", ".join(DEFAULT_CONFIG)})')
+    parser.add_argument('--clear', action='store_true', help='Reset all fault settings')
+    parser.add_argument('--stall', type=float, metavar='SECONDS',
+                        help='Pause all forwarding for N seconds')
+    parser.add_argument('--reset', metavar='ID|all', help='Send RST on a connection or all')
+    parser.add_argument('--half-open', metavar='ID|all',
+                        help='Drop the server side but keep the client socket open')
+    parser.add_argument('--connections', action='store_true', help='List proxied connections')
+    parser.add_argument('--status', action='store_true', help='Show proxy status')
+    parser.add_argument('--json', action='store_true', help='Output as JSON')
+    opts = parser.parse_args(args)
+
+    try:
+        settings = parse_settings(opts.set)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if opts.foreground:
+        run_foreground(opts.listen, opts.upstream, settings)
+        return
+    if opts.start:
+        start_background(opts.listen, opts.upstream, settings)
+        return
+    if opts.stop:
+        stop_proxy()
+        return
+
+    if not proxy_pid():
+        print("Fault proxy is not running. Start it with: toolkit proxy --start")
+        sys.exit(1)
+
+    request = {}
+    if opts.clear:
+        request['clear'] = True
+    if settings:
+        request['set'] = settings
+    if opts.stall:
+        request['stall'] = opts.stall
+    if opts.reset:
+        request['reset'] = parse_target(opts.reset)
+    if opts.half_open:
+        request['half_open'] = parse_target(opts.half_open)
+    if opts.connections:
+        request['connections'] = True
+
+    response = proxy_request(request)
+    if opts.json:
+        print(json.dumps(response, indent=2))
+    elif not response.get('ok'):
+        print(f"Error: {response.get('error')}")
+        sys.exit(1)
+    elif 'connections' in response:
+        for c in response['connections']:
+            print(f"  #{c['id']:<6d} {c['peer'] or '-':22s} {c['state']:10s} "
+                  f"up {c['bytes_up']:>12d}  down {c['bytes_down']:>12d}  {c['age_seconds']}s")
+    elif 'reset' in response:
+        print(f"Reset {response['reset']} connection(s)")
+    elif 'half_open' in response:
+        print(f"Half-opened {response['half_open']} connection(s)")
+    else:
+        print_status(response)
@@ -0,0 +1,80 @@
+"""Local replica management command"""
+import argparse
+
+from utils.replica import (
+    REPLICA_PORT, replica_start, replica_stop, replica_seed, replica_configure,
+    replica_set_delay, replica_set_workers, replica_status, replica_is_running,
+    replica_sql,
+)
+
+
+def show_status():
+    """Print replica status"""
+    print("=" * 50)
+    print("Local Replica Status")
+    print("=" * 50)
+    if not replica_is_running():
+        print("  Status: STOPPED")
+        print("=" * 50)
+        return
+
+    print(f"  Status: Running (port {REPLICA_PORT})")
+    status = replica_status()
+    if not status:
+        print("  Replication: Not configured")
+    else:
+        print(f"  IO thread:            {status.get('Replica_IO_Running')}")
+        print(f"  SQL thread:           {status.get('Replica_SQL_Running')}")
+        print(f"  Seconds behind:       {status.get('Seconds_Behind_Source')}")
+        print(f"  SOURCE_DELAY:         {status.get('SQL_Delay')}")
+        print(f"  Retrieved GTIDs:      {status.get('Retrieved_Gtid_Set')}")
+        print(f"  Executed GTIDs:       {status.get('Executed_Gtid_Set')}")
+        if status.get('Last_Error'):
+            print(f"  Last error:           {status.get('Last_Error')}")
+    print("=" * 50)
+
+
+def run(args):
+    """Run replica management"""
+    parser = argparse.ArgumentParser(description='Manage the in-container GTID replica')
+    parser.add_argument('--start', action='store_true',
+                        help='Start the replica (initializes and seeds on first use)')
+    parser.add_argument('--stop', action='store_true', help='Stop the replica')
+    parser.add_argument('--reseed', action='store_true',
+                        help='Reload testdb from the source and restart replication')
+    parser.add_argument('--delay', type=int, help='Set SOURCE_DELAY in seconds')
+    parser.add_argument('--workers', type=int, help='Set replica_parallel_workers')
+    parser.add_argument('--status', action='store_true', help='Show replica status')
+    opts = parser.parse_args(args)
+
+    actions = (opts.start, opts.stop, opts.reseed, opts.delay is not None, opts.workers is not None)
+    if opts.status or not any(actions):
+        show_status()
+        return
+
+    if opts.stop:
+        replica_stop()
+        return
+
+    if opts.start:
+        replica_start(opts.workers if opts.workers is not None else 4)
+
+    if not replica_is_running():
+        print("Replica is not running. Start it with: toolkit replica --start")
+        return
+
+    if opts.reseed or not replica_status():
+        replica_seed()
+        replica_configure(opts.delay or 0, opts.workers)
+    else:
+        if opts.start:
+            # Started with --skip-replica-start so restarts are explicit
+            replica_sql("START REPLICA;")
+        if opts.delay is not None:
+            replica_set_delay(opts.delay)
+            print(f"SOURCE_DELAY set to {opts.delay}s")
+        if opts.workers is not None and not opts.start:
+            replica_set_workers(opts.workers)
+            print(f"replica_parallel_workers set to {opts.workers}")
+
+    show_status()
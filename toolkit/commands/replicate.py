@@ -1,10 +1,23 @@
 """Replication simulation command"""
 import argparse
+import threading
 import time
 import random
 from datetime import datetime
+from uuid import uuid4
 
-from utils.mysql_client import execute_sql, get_binlog_status, flush_binary_logs
+from utils.mysql_client import (
+    MySQLSession, execute_sql, get_binlog_status, get_binlog_files, flush_binary_logs,
+)
+from utils.gtid_index import resolve_gtid
+from utils.replica import (
+    REPLICA, replica_is_running, replica_status, replica_set_delay,
+    replica_set_workers, source_uuid, executed_count, gtid_set_intervals, gtid_set_count,
+)
+from utils.metrics import latency_summary, format_latency
+from utils.run_record import bind_run
+from utils.load import PROFILES, parse_profile, run_profile, profile_summary
+from commands.generate import generate_record, insert_batch, insert_batch_sql
 
 
 def simulate_lag(duration=60, min_delay=1, max_delay=5):
@@ -31,6 +44,134 @@ def simulate_lag(duration=60, min_delay=1, max_delay=5):
     print(f"Completed {operation-1} operations with simulated lag")
 
 
+def write_load(stop, stats, batch_size):
+    """Insert batches on the primary as fast as possible until stopped"""
+    while not stop.is_set():
+        insert_batch(batch_size)
+        stats['rows'] += batch_size
+        stats['batches'] += 1
+
+
+def single_row_insert():
+    """One single-row INSERT (one transaction per op for shaped load)"""
+    return insert_batch_sql(1)
+
+
+def simulate_shaped_lag(profile, duration=60):
+    """Drive single-row INSERTs at a shaped rate and log actual vs intended"""
+    print(f"Shaped load for {duration} seconds: {profile}")
+    print("-" * 40)
+    try:
+        stats = run_profile(parse_profile(profile), duration, single_row_insert)
+    except KeyboardInterrupt:
+        print("\nLoad stopped by user")
+        return
+    print("-" * 40)
+    profile_summary(stats)
+
+
+def measure_replica_lag(duration=60, source_delay=None, parallel_workers=None,
+                        batch_size=500, interval=1.0, catchup_timeout=300, profile=None):
+    """Run write load on the primary and sample real lag on the local replica
+
+    Without a profile the load is back-to-back INSERT batches; with one it is
+    single-row INSERTs at the profile's rate (see utils/load.py).
+    """
+    if not replica_is_running() or not replica_status():
+        print("Local replica is not running. Start it with: toolkit replica --start")
+        return
+
+    if source_delay is not None:
+        replica_set_delay(source_delay)
+    if parallel_workers is not None:
+        replica_set_workers(parallel_workers)
+
+    status = replica_status()
+    print(f"Measuring replica lag for {duration} seconds...")
+    if profile:
+        print(f"Load: single-row INSERTs, profile {profile}")
+    else:
+        print(f"Load: INSERT batches of {batch_size} rows, back to back")
+    print(f"SOURCE_DELAY: {status.get('SQL_Delay')}s")
+    print("-" * 40)
+
+    uuid = source_uuid()
+    stop = threading.Event()
+    stats = {'rows': 0, 'batches': 0}
+    if profile:
+        loader = threading.Thread(
+            target=bind_run(run_profile), args=(parse_profile(profile), duration, single_row_insert),
+            kwargs={'stats': stats, 'stop': stop, 'quiet': True}, daemon=True)
+    else:
+        loader = threading.Thread(target=bind_run(write_load), args=(stop, stats, batch_size), daemon=True)
+
+    samples = []
+    start_time = time.time()
+    prev_time = start_time
+    prev_source = executed_count(uuid)
+    prev_applied = executed_count(uuid, **REPLICA)
+    loader.start()
+
+    try:
+        while True:
+            time.sleep(interval)
+            now = time.time()
+            loading = (now - start_time) < duration
+            if not loading and not stop.is_set():
+                stop.set()
+                load_end = now
+                print("Load stopped, waiting for replica to catch up...")
+
+            status = replica_status() or {}
+            source = executed_count(uuid)
+            applied = executed_count(uuid, **REPLICA)
+            elapsed = now - prev_time
+            lag = status.get('Seconds_Behind_Source') or 'NULL'
+            sample = {
+                'elapsed': now - start_time,
+                'lag': int(lag) if lag.isdigit() else None,
+                'source_tps': (source - prev_source) / elapsed,
+                'applier_tps': (applied - prev_applied) / elapsed,
+                'backlog': source - applied,
+            }
+            samples.append(sample)
+            prev_time, prev_source, prev_applied = now, source, applied
+
+            timestamp = datetime.now().strftime("%H:%M:%S")
+            offered = ''
+            if profile and stats.get('intervals') and loading:
+                last = stats['intervals'][-1]
+                offered = (f"  offered={last['actual_rate']:.0f}/"
+                           f"{last['intended_rate']:.0f} ops/s")
+            print(f"[{timestamp}] lag={lag:>4}s  source={sample['source_tps']:8.1f} tx/s  "
+                  f"applier={sample['applier_tps']:8.1f} tx/s  backlog={sample['backlog']} tx"
+                  f"{offered}")
+
+            if not loading and (sample['backlog'] <= 0 or now - load_end > catchup_timeout):
+                break
+    except KeyboardInterrupt:
+        print("\nMeasurement stopped by user")
+        load_end = time.time()
+    finally:
+        stop.set()
+        loader.join()
+
+    lags = [s['lag'] for s in samples if s['lag'] is not None]
+    applier = [s['applier_tps'] for s in samples if s['applier_tps'] > 0]
+    print("-" * 40)
+    if profile:
+        profile_summary(stats)
+    else:
+        print(f"Rows written:        {stats['rows']} in {stats['batches']} transactions")
+    if lags:
+        print(f"Seconds_Behind_Source: max {max(lags)}s, avg {sum(lags) / len(lags):.1f}s")
+    if applier:
+        print(f"Applier throughput:  avg {sum(applier) / len(applier):.1f} tx/s, "
+              f"peak {max(applier):.1f} tx/s")
+    if samples and samples[-1]['backlog'] <= 0:
+        print(f"Catch-up time:       {samples[-1]['elapsed'] - (load_end - start_time):.1f}s")
+
+
 def simulate_disconnect():
     """Simulate connection disconnect by creating gaps"""
     print("Simulating connection disconnect...")
@@ -56,51 +197,232 @@ def simulate_disconnect():
     print("Created binlog gap - replica would need to handle file transition")
 
 
-def simulate_gtid_gap():
-    """Create gaps in GTID sequence"""
-    print("Simulating GTID gap...")
+def write_until(session, target_size, row_bytes):
+    """Insert rows until the current binlog reaches target_size; return (rows, row_bytes)"""
+    rows = 0
+    position = int(session.execute("SHOW MASTER STATUS;")[0][1])
+    while position < target_size:
+        count = max(1, min(1000, (target_size - position) // row_bytes))
+        status = session.execute(insert_batch_sql(count) + "\nSHOW MASTER STATUS;")
+        new_position = int(status[-1][1])
+        row_bytes = max(1, (new_position - position) // count)
+        position = new_position
+        rows += count
+    return rows, row_bytes
+
+
+def time_show_binary_logs(session):
+    """Return (file_count, seconds) for one SHOW BINARY LOGS"""
+    start = time.perf_counter()
+    count = len(session.execute("SHOW BINARY LOGS;"))
+    return count, time.perf_counter() - start
+
+
+def simulate_rotation_storm(files=1000, file_size=65536, rate=None, checkpoints=10):
+    """Create many small binlogs by interleaving writes with FLUSH BINARY LOGS
+
+    Each file is filled to about file_size bytes before rotating. With rate
+    set, rotations are scheduled at fixed slots on a monotonic clock instead
+    of back to back. FLUSH latency and SHOW BINARY LOGS cost are sampled as
+    the file count grows.
+    """
+    print(f"Rotation storm: {files} file(s) of ~{file_size} bytes"
+          + (f" at {rate} rotation(s)/s" if rate else ", rotating as fast as possible"))
     print("-" * 40)
 
-    before = get_binlog_status()
-    print(f"GTID before: {before['gtid']}")
+    flush_times = []
+    scaling = []
+    total_rows = 0
+    row_bytes = 150
+    every = max(1, files // max(1, checkpoints))
 
-    # Reset GTID (this would cause issues for replicas)
-    # Note: This is a simulation - actual GTID manipulation requires SUPER privilege
-    try:
-        # Insert some records
-        for i in range(3):
-            execute_sql(f"INSERT INTO users (name, email) VALUES ('GTID Test {i}', 'gtid{i}@test.com');")
+    with MySQLSession() as session:
+        count, elapsed = time_show_binary_logs(session)
+        scaling.append((count, elapsed))
+        first_file = session.execute("SHOW MASTER STATUS;")[0][0]
+        start = time.perf_counter()
 
-        # Flush binary logs to create new file
-        flush_binary_logs()
+        try:
+            for i in range(files):
+                rows, row_bytes = write_until(session, file_size, row_bytes)
+                total_rows += rows
+
+                if rate:
+                    delay = start + (i + 1) / rate - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+
+                flush_start = time.perf_counter()
+                session.execute("FLUSH BINARY LOGS;")
+                flush_times.append(time.perf_counter() - flush_start)
+
+                if (i + 1) % every == 0 or i + 1 == files:
+                    count, elapsed = time_show_binary_logs(session)
+                    scaling.append((count, elapsed))
+                    wall = time.perf_counter() - start
+                    print(f"  {i + 1}/{files} rotations  {(i + 1) / wall:.1f} files/s  "
+                          f"FLUSH p50 {latency_summary(flush_times)['p50_ms']:.2f}ms  "
+                          f"SHOW BINARY LOGS ({count} files) {elapsed * 1000:.2f}ms")
+        except KeyboardInterrupt:
+            print("\nRotation storm stopped by user")
+
+        wall = time.perf_counter() - start
+        last_file = session.execute("SHOW MASTER STATUS;")[0][0]
+
+    print("-" * 40)
+    print(f"Files created:   {len(flush_times)} ({first_file} .. {last_file})")
+    print(f"Rows written:    {total_rows} (~{row_bytes} binlog bytes/row)")
+    print(f"Elapsed:         {wall:.2f}s ({len(flush_times) / max(wall, 1e-6):.1f} rotations/s)")
+    print(f"FLUSH BINARY LOGS: {format_latency(latency_summary(flush_times))}")
+    print("SHOW BINARY LOGS scaling:")
+    for count, elapsed in scaling:
+        print(f"  {count:>8d} files  {elapsed * 1000:9.2f}ms  "
+              f"({elapsed / max(count, 1) * 1e6:.2f}us/file)")
+    print(f"Purge them (and all older binlogs) with: PURGE BINARY LOGS TO '{last_file}';")
+
+
+def gtid_set_summary(gtid_set):
+    """Return (uuids, intervals, transactions) of a GTID set"""
+    intervals = gtid_set_intervals(gtid_set)
+    return (len(intervals), sum(len(r) for r in intervals.values()),
+            gtid_set_count(gtid_set))
+
+
+def pinned_transaction(gtid, write=False):
+    """Statements for one transaction pinned to a GTID (empty unless write)"""
+    if write:
+        name, email, status = generate_record()
+        return [f"SET gtid_next='{gtid}'",
+                f"INSERT INTO users (name, email, status) VALUES ('{name}', '{email}', '{status}')"]
+    return [f"SET gtid_next='{gtid}'", "BEGIN", "COMMIT"]
 
-        after = get_binlog_status()
-        print(f"GTID after: {after['gtid']}")
-        print("-" * 40)
-        print("GTID sequence advanced - check for gaps in replica")
 
-    except Exception as e:
-        print(f"Error: {e}")
-        print("Note: Some GTID operations require elevated privileges")
+def simulate_gtid_gap(fragments=1000, foreign_uuids=10, stride=2, own_gaps=0,
+                      write_ratio=0.0, batch=500):
+    """Fragment gtid_executed with empty, skipped and foreign-UUID transactions
+
+    All transactions are pinned with gtid_next over one persistent session,
+    batch transactions per round trip. Each foreign UUID advances its GNO by
+    stride, so stride > 1 leaves a hole after every transaction. Holes in
+    the server's own UUID are refilled by later AUTOMATIC transactions.
+    """
+    print("Simulating GTID gaps...")
+    print(f"Fragments: {fragments} over {foreign_uuids} foreign UUID(s), stride {stride}; "
+          f"own-UUID gaps: {own_gaps}; write ratio: {write_ratio:.0%}")
+    print("-" * 40)
+
+    with MySQLSession() as session:
+        own_uuid = session.value("SELECT @@server_uuid;").lower()
+        before = session.value("SELECT @@GLOBAL.gtid_executed;") or ''
+        uuids, intervals, count = gtid_set_summary(before)
+        print(f"gtid_executed before: {uuids} UUID(s), {intervals} interval(s), "
+              f"{count} transaction(s), {len(before)} bytes")
+
+        own_max = max((end for _, end in gtid_set_intervals(before).get(own_uuid, [])), default=0)
+        plan = [f"{own_uuid}:{own_max + 1 + (i + 1) * stride}" for i in range(own_gaps)]
+        next_gno = {str(uuid4()): random.randint(1, 1000) for _ in range(foreign_uuids)}
+        sids = list(next_gno)
+        for i in range(fragments if sids else 0):
+            sid = sids[i % len(sids)]
+            plan.append(f"{sid}:{next_gno[sid]}")
+            next_gno[sid] += stride
+
+        start = time.perf_counter()
+        for offset in range(0, len(plan), batch):
+            statements = []
+            for gtid in plan[offset:offset + batch]:
+                statements += pinned_transaction(gtid, random.random() < write_ratio)
+            statements.append("SET gtid_next='AUTOMATIC'")
+            session.execute_many(statements)
+            done = min(offset + batch, len(plan))
+            elapsed = time.perf_counter() - start
+            print(f"  {done}/{len(plan)} transactions ({done / max(elapsed, 1e-6):.0f} tx/s)")
+        elapsed = time.perf_counter() - start
+
+        after = session.value("SELECT @@GLOBAL.gtid_executed;") or ''
+
+    uuids, intervals, count = gtid_set_summary(after)
+    print(f"gtid_executed after:  {uuids} UUID(s), {intervals} interval(s), "
+          f"{count} transaction(s), {len(after)} bytes")
+    print(f"Injected {len(plan)} transactions in {elapsed:.2f}s "
+          f"({len(plan) / max(elapsed, 1e-6):.0f} tx/s)")
+
+    # Start a new binlog so its Previous_gtids event carries the fragmented set
+    flush_binary_logs()
+    print(f"Rotated to {get_binlog_status()['file']} (Previous_gtids holds the fragmented set)")
+
+
+def report_resume_point(gtid):
+    """Show where a consumer that has applied a GTID resumes reading"""
+    entry = resolve_gtid(gtid)
+    if not entry:
+        print(f"GTID not found in binlog index: {gtid}")
+        return
+
+    files = [f['name'] for f in get_binlog_files() if f['name'] >= entry['file']]
+    print(f"Resume after {entry['gtid']}: {entry['file']} @ {entry['end']} ({entry['time']})")
+    print(f"Consumer must read {len(files)} binlog file(s): {', '.join(files)}")
 
 
 def run(args):
     """Run replication simulation"""
     parser = argparse.ArgumentParser(description='Simulate replication scenarios')
     parser.add_argument('--scenario', required=True,
-                        choices=['lag', 'disconnect', 'gtid-gap'],
+                        choices=['lag', 'disconnect', 'gtid-gap', 'rotation-storm'],
                         help='Scenario to simulate')
     parser.add_argument('--duration', type=int, default=60,
                         help='Duration in seconds (for lag scenario)')
+    parser.add_argument('--replica', action='store_true',
+                        help='Lag: measure real lag on the local replica (toolkit replica)')
+    parser.add_argument('--source-delay', type=int,
+                        help='Lag: set SOURCE_DELAY on the replica before measuring')
+    parser.add_argument('--parallel-workers', type=int,
+                        help='Lag: set replica_parallel_workers before measuring')
+    parser.add_argument('--profile',
+                        help=f'Lag: shaped load NAME[:key=value,...] '
+                             f'({"|".join(PROFILES)}), e.g. sine:base=2000,amplitude=1500,period=60')
+    parser.add_argument('--batch', type=int, default=500,
+                        help='Rows per INSERT with lag --replica, transactions per round '
+                             'trip with gtid-gap (default: 500)')
+    parser.add_argument('--fragments', type=int, default=1000,
+                        help='GTID gap: foreign-UUID transactions to inject (default: 1000)')
+    parser.add_argument('--uuids', type=int, default=10,
+                        help='GTID gap: number of foreign server UUIDs (default: 10)')
+    parser.add_argument('--stride', type=int, default=2,
+                        help='GTID gap: GNO step per transaction, >1 leaves holes (default: 2)')
+    parser.add_argument('--own-gaps', type=int, default=0,
+                        help='GTID gap: skipped ranges to open in the server\'s own UUID')
+    parser.add_argument('--write-ratio', type=float, default=0.0,
+                        help='GTID gap: fraction of injected transactions that insert a row')
+    parser.add_argument('--files', type=int, default=1000,
+                        help='Rotation storm: binlog files to create (default: 1000)')
+    parser.add_argument('--file-size', type=int, default=65536,
+                        help='Rotation storm: target bytes per file (default: 65536)')
+    parser.add_argument('--rate', type=float,
+                        help='Rotation storm: rotations per second (default: unthrottled)')
+    parser.add_argument('--gtid',
+                        help='Report the binlog resume position for a consumer at this GTID')
     opts = parser.parse_args(args)
 
     print("=" * 50)
     print(f"Replication Scenario: {opts.scenario}")
     print("=" * 50)
 
-    if opts.scenario == 'lag':
+    if opts.scenario == 'lag' and opts.replica:
+        measure_replica_lag(opts.duration, opts.source_delay, opts.parallel_workers, opts.batch,
+                            profile=opts.profile)
+    elif opts.scenario == 'lag' and opts.profile:
+        simulate_shaped_lag(opts.profile, opts.duration)
+    elif opts.scenario == 'lag':
         simulate_lag(opts.duration)
     elif opts.scenario == 'disconnect':
         simulate_disconnect()
     elif opts.scenario == 'gtid-gap':
-        simulate_gtid_gap()
+        simulate_gtid_gap(opts.fragments, opts.uuids, opts.stride, opts.own_gaps,
+                          opts.write_ratio, opts.batch)
+    elif opts.scenario == 'rotation-storm':
+        simulate_rotation_storm(opts.files, opts.file_size, opts.rate)
+
+    if opts.gtid:
+        print("-" * 40)
+        report_resume_point(opts.gtid)
@@ -2,44 +2,211 @@
 import argparse
 import os
 import shutil
+import sys
 import glob
+import time
 
-from utils.mysql_client import BINLOG_DIR, flush_binary_logs
-
-BACKUP_DIR = '/opt/backups'
+from utils.mysql_client import BINLOG_DIR, flush_binary_logs, get_binlog_files
+from utils.backups import (
+    BACKUP_DIR, CODECS, BackupStore, apply_delta, delta_size, read_delta,
+    remove_delta, run_parallel,
+)
+from utils.binlog import gtid_range
+from utils.gtid_index import resolve_gtid
+from commands.verify import verify_paths
 
 
 def list_backups():
-    """List available backups"""
+    """List available backups (full copies and deltas)"""
     if not os.path.exists(BACKUP_DIR):
         return []
 
-    backups = glob.glob(f"{BACKUP_DIR}/*.backup")
+    backups = glob.glob(f"{BACKUP_DIR}/*.backup") + glob.glob(f"{BACKUP_DIR}/*.delta")
     return sorted(backups)
 
 
+def backup_target(backup_path):
+    """Binlog filename a backup restores"""
+    if backup_path.endswith('.delta'):
+        return read_delta(backup_path)[0]['filename']
+    return os.path.basename(backup_path).replace('.backup', '')
+
+
+def backup_size(backup_path):
+    """Bytes used by a backup"""
+    if backup_path.endswith('.delta'):
+        return delta_size(backup_path)
+    return os.path.getsize(backup_path)
+
+
+def restore_order(backups):
+    """Full copies first, then deltas newest first so each undo sees its own output"""
+    full = [b for b in backups if not b.endswith('.delta')]
+    deltas = sorted((b for b in backups if b.endswith('.delta')), reverse=True)
+    return full + deltas
+
+
 def restore_binlog(backup_path, target_path):
     """Restore a binlog from backup"""
     if not os.path.exists(backup_path):
         raise FileNotFoundError(f"Backup not found: {backup_path}")
 
-    shutil.copy2(backup_path, target_path)
+    if backup_path.endswith('.delta'):
+        # A delta is an undo record; once applied it is spent
+        apply_delta(backup_path, target_path)
+        remove_delta(backup_path)
+    else:
+        shutil.copy2(backup_path, target_path)
     print(f"Restored: {backup_path} -> {target_path}")
 
 
+def restore_all(backups, workers=None):
+    """Restore backups with one worker per target binlog"""
+    groups = {}
+    for backup in backups:
+        groups.setdefault(backup_target(backup), []).append(backup)
+
+    def restore_group(filename):
+        target = f"{BINLOG_DIR}/{filename}"
+        for backup in restore_order(groups[filename]):
+            restore_binlog(backup, target)
+
+    restored = []
+    for filename, _, error in run_parallel(restore_group, sorted(groups), workers):
+        if error:
+            print(f"Failed to restore {filename}: {error}")
+        else:
+            restored.append(f"{BINLOG_DIR}/{filename}")
+    return restored
+
+
+# ============== Content-addressed store ==============
+
+def safe_gtid_range(path):
+    """GTID range of a binlog, or (None, None) if it cannot be parsed"""
+    try:
+        return gtid_range(path)
+    except (ValueError, OSError):
+        return None, None
+
+
+def format_mb_rate(total_bytes, elapsed):
+    """Format a throughput figure in MB/s"""
+    return f"{total_bytes / 1024 / 1024 / max(elapsed, 1e-6):.1f} MB/s"
+
+
+def snapshot_binlogs(filenames, codec='zlib', workers=None):
+    """Snapshot binlogs into the content-addressed store in parallel"""
+    store = BackupStore(codec=codec)
+    store.ensure_dirs()
+
+    def snapshot_one(filename):
+        path = f"{BINLOG_DIR}/{filename}"
+        return store.snapshot(path, safe_gtid_range(path))
+
+    print(f"Snapshotting {len(filenames)} binlog(s) into {store.root} ({codec})...")
+    start = time.time()
+    total = stored = 0
+    for filename, manifest, error in run_parallel(snapshot_one, filenames, workers):
+        if error:
+            print(f"  {filename:30s} FAILED: {error}")
+            continue
+        total += manifest['size']
+        stored += manifest['stored_bytes']
+        print(f"  {filename:30s} {manifest['size']:>12d} bytes, "
+              f"{manifest['stored_bytes']:>12d} new")
+    elapsed = time.time() - start
+    print(f"Stored {stored} new bytes for {total} bytes of binlog "
+          f"in {elapsed:.2f}s ({format_mb_rate(total, elapsed)})")
+
+
+def restore_from_store(filenames=None, workers=None):
+    """Restore binlogs from store manifests in parallel"""
+    store = BackupStore()
+    manifests = store.manifests()
+    if filenames:
+        manifests = [m for m in manifests if m['filename'] in filenames]
+    if not manifests:
+        print("No matching snapshots in store")
+        return []
+
+    def restore_one(manifest):
+        return store.restore(manifest, f"{BINLOG_DIR}/{manifest['filename']}")
+
+    print(f"Restoring {len(manifests)} binlog(s) from store...")
+    start = time.time()
+    total = 0
+    restored = []
+    for manifest, size, error in run_parallel(restore_one, manifests, workers):
+        if error:
+            print(f"  {manifest['filename']:30s} FAILED: {error}")
+            continue
+        total += size
+        restored.append(f"{BINLOG_DIR}/{manifest['filename']}")
+        print(f"  {manifest['filename']:30s} {size:>12d} bytes (sha256 verified)")
+    elapsed = time.time() - start
+    print(f"Restored {total} bytes in {elapsed:.2f}s ({format_mb_rate(total, elapsed)})")
+    return restored
+
+
+def list_store():
+    """Print snapshots held in the store"""
+    manifests = BackupStore().manifests()
+    if not manifests:
+        return
+    print("")
+    print("Store snapshots:")
+    print("-" * 40)
+    for m in manifests:
+        gtids = f"{m['gtid_first']} .. {m['gtid_last']}" if m['gtid_first'] else 'no GTIDs'
+        print(f"  {m['filename']:30s} {m['size']:>12d} bytes  {gtids}")
+
+
 def run(args):
     """Run restore"""
     parser = argparse.ArgumentParser(description='Restore binlog from backup')
     parser.add_argument('--file', help='Specific backup file to restore')
+    parser.add_argument('--gtid', help='Restore the binlog containing this GTID (uuid:N)')
     parser.add_argument('--list', action='store_true', help='List available backups')
     parser.add_argument('--all', action='store_true', help='Restore all backups')
     parser.add_argument('--flush', action='store_true',
                         help='Flush to new binlog after restore')
+    parser.add_argument('--snapshot', action='store_true',
+                        help='Store binlogs in the deduplicated backup store')
+    parser.add_argument('--from-store', action='store_true',
+                        help='Restore from the backup store instead of backups')
+    parser.add_argument('--compression', choices=sorted(CODECS), default='zlib',
+                        help='Store compression codec (default: zlib)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Parallel workers (default: CPU count)')
+    parser.add_argument('--verify', action='store_true',
+                        help='Verify restored binlogs (events, positions, CRC32)')
     opts = parser.parse_args(args)
 
+    if opts.gtid:
+        entry = resolve_gtid(opts.gtid)
+        if not entry:
+            print(f"GTID not found in binlog index: {opts.gtid}")
+            sys.exit(1)
+        state = ' (no longer in the file)' if entry['stale'] else ''
+        print(f"GTID {entry['gtid']} is in {entry['file']} @ {entry['start']}{state}")
+        opts.file = entry['file']
+
+    if opts.snapshot:
+        if opts.file:
+            filenames = [opts.file]
+        else:
+            filenames = [f['name'] for f in get_binlog_files()]
+        snapshot_binlogs(filenames, opts.compression, opts.workers)
+        return
+
     backups = list_backups()
+    restored = []
+
+    if opts.from_store:
+        restored = restore_from_store([opts.file] if opts.file else None, opts.workers)
 
-    if opts.list or (not opts.file and not opts.all):
+    elif opts.list or (not opts.file and not opts.all):
         print("Available backups:")
         print("-" * 40)
         if not backups:
@@ -47,20 +214,18 @@ def run(args):
             print("  Backups are created automatically when using 'toolkit corrupt'")
         else:
             for b in backups:
-                size = os.path.getsize(b)
-                print(f"  {os.path.basename(b):30s} {size:>10d} bytes")
+                size = backup_size(b)
+                print(f"  {os.path.basename(b):45s} {size:>10d} bytes")
+        list_store()
         return
 
-    if opts.all:
+    elif opts.all:
         if not backups:
             print("No backups to restore")
             return
 
         print(f"Restoring {len(backups)} backup(s)...")
-        for backup in backups:
-            filename = os.path.basename(backup).replace('.backup', '')
-            target = f"{BINLOG_DIR}/{filename}"
-            restore_binlog(backup, target)
+        restored = restore_all(backups, opts.workers)
 
     elif opts.file:
         # Find the backup
@@ -82,9 +247,17 @@ def run(args):
             print("Use --list to see available backups")
             return
 
-        filename = os.path.basename(backup_path).replace('.backup', '')
+        filename = backup_target(backup_path)
         target = f"{BINLOG_DIR}/{filename}"
-        restore_binlog(backup_path, target)
+        if backup_path.endswith('.delta'):
+            # Undo every corruption recorded for this binlog, newest first
+            deltas = [b for b in backups
+                      if b.endswith('.delta') and backup_target(b) == filename]
+            for delta in restore_order(deltas):
+                restore_binlog(delta, target)
+        else:
+            restore_binlog(backup_path, target)
+        restored = [target]
 
     if opts.flush:
         print("Flushing binary logs...")
@@ -93,3 +266,7 @@ def run(args):
 
     print("-" * 40)
     print("Restore complete!")
+
+    if opts.verify and restored:
+        print("")
+        verify_paths(restored, opts.workers)
@@ -0,0 +1,215 @@
+"""Binlog retention command (byte / age budgets, consumer-aware purging)"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+
+from commands.monitor import format_size
+from commands.restore import safe_gtid_range
+from utils.backups import CODECS, BackupStore
+from utils.mysql_client import BINLOG_DIR
+from utils.retention import (
+    parse_size, parse_duration, load_consumers, register_consumer, unregister_consumer,
+    binlog_inventory, consumer_floor, plan_purge, purge_before,
+)
+from utils.run_record import record_counts
+
+
+def format_age(seconds):
+    if seconds is None:
+        return '?'
+    for unit, size in (('d', 86400), ('h', 3600), ('m', 60)):
+        if seconds >= size:
+            return f"{seconds / size:.1f}{unit}"
+    return f"{seconds:.0f}s"
+
+
+def archive_files(files, codec):
+    """Snapshot files into the backup store; return the ones archived before the first failure"""
+    store = BackupStore(codec=codec)
+    archived = []
+    for f in files:
+        path = f"{BINLOG_DIR}/{f['name']}"
+        try:
+            store.snapshot(path, safe_gtid_range(path))
+        except Exception as e:
+            print(f"  Archive of {f['name']} failed, not purging it or later files: {e}")
+            break
+        archived.append(f)
+    return archived
+
+
+def enforce(max_bytes, max_age, archive=None, dry_run=False, force=False):
+    """Apply the budgets once and return a report"""
+    files = binlog_inventory()
+    floor, holders, blocked = consumer_floor(files, force=force)
+    if blocked:
+        purge, stopped_by = [], 'blocked'
+    else:
+        purge, stopped_by = plan_purge(files, max_bytes, max_age, floor)
+    if purge and archive and not dry_run:
+        archived = archive_files(purge, archive)
+        if len(archived) < len(purge):
+            purge, stopped_by = archived, 'archive'
+    if purge and not dry_run:
+        purge_before(files[len(purge)]['name'])
+        record_counts(purged_files=len(purge), purged_bytes=sum(f['size'] for f in purge))
+
+    total = sum(f['size'] for f in files)
+    purged_bytes = sum(f['size'] for f in purge)
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'dry_run': dry_run,
+        'max_bytes': max_bytes,
+        'max_age_s': max_age,
+        'files': len(files),
+        'bytes_before': total,
+        'bytes_after': total - purged_bytes,
+        'purged': [f['name'] for f in purge],
+        'purged_bytes': purged_bytes,
+        'archived': bool(archive and purge and not dry_run),
+        'floor': floor,
+        'holders': holders,
+        'stopped_by': stopped_by,
+        'blocked': blocked,
+        'over_budget': max_bytes is not None and total - purged_bytes > max_bytes,
+    }
+
+
+def print_report(report):
+    verb = 'Would purge' if report['dry_run'] else 'Purged'
+    budget = []
+    if report['max_bytes'] is not None:
+        budget.append(f"max {format_size(report['max_bytes'])}")
+    if report['max_age_s'] is not None:
+        budget.append(f"max age {format_age(report['max_age_s'])}")
+    print(f"[{report['timestamp']}] {report['files']} binlog(s), "
+          f"{format_size(report['bytes_before'])} ({', '.join(budget)})")
+    if report['purged']:
+        archived = ' after archiving' if report['archived'] else ''
+        names = report['purged'][0] if len(report['purged']) == 1 else \
+            f"{report['purged'][0]} .. {report['purged'][-1]}"
+        print(f"  {verb} {len(report['purged'])} file(s), {format_size(report['purged_bytes'])}"
+              f"{archived}: {names}")
+    if report['blocked']:
+        print(f"  Not purging: {report['blocked']}")
+    elif report['stopped_by'] == 'consumer':
+        needed = ', '.join(h['consumer'] for h in report['holders'] if h['file'] == report['floor'])
+        print(f"  Stopped at {report['floor']}: still needed by {needed}")
+    elif report['stopped_by'] == 'active':
+        print("  Stopped at the active binlog (FLUSH BINARY LOGS to rotate it)")
+    if report['over_budget']:
+        print(f"  Still over budget: {format_size(report['bytes_after'])}")
+
+
+def print_status(max_bytes, max_age, force=False):
+    """Files with size, age and purge eligibility; registered consumers"""
+    files = binlog_inventory()
+    floor, holders, blocked = consumer_floor(files, force=force)
+    purge, _ = plan_purge(files, max_bytes, max_age, floor) if not blocked else ([], None)
+    eligible = {f['name'] for f in purge}
+    held = {}
+    for h in holders:
+        held.setdefault(h['file'], []).append(h['consumer'])
+    now = time.time()
+
+    print("Binlog files (oldest first):")
+    print("-" * 60)
+    for i, f in enumerate(files):
+        age = now - f['mtime'] if f['mtime'] else None
+        marks = []
+        if f['name'] == floor:
+            marks.append('floor')
+        if f['name'] in held:
+            marks.append(f"needed by {', '.join(held[f['name']])}")
+        if i == len(files) - 1:
+            marks.append('active')
+        if f['name'] in eligible:
+            marks.append('purge')
+        print(f"  {f['name']:24s} {format_size(f['size']):>10s} {format_age(age):>7s}  "
+              f"{'; '.join(marks)}".rstrip())
+    print("-" * 60)
+    print(f"Total: {format_size(sum(f['size'] for f in files))}")
+    if blocked:
+        print(f"Purging blocked: {blocked}")
+
+    consumers = load_consumers()
+    print("")
+    print("Registered consumers:")
+    if not consumers:
+        print("  (none)")
+    for name, entry in sorted(consumers.items()):
+        where = f"{entry['file']}:{entry['position']}" if entry.get('file') else entry.get('gtid')
+        note = next((h.get('note') for h in holders if h['consumer'] == name and h.get('note')), '')
+        print(f"  {name:20s} {where}  (updated {entry['updated']}) {note}".rstrip())
+
+
+def run(args):
+    """Enforce binlog byte/age budgets without purging what consumers need"""
+    parser = argparse.ArgumentParser(
+        description='Purge binlogs to a byte / age budget, never past what a consumer still needs')
+    parser.add_argument('--max-bytes', help='Total binlog budget, e.g. 500M, 2G')
+    parser.add_argument('--max-age', help='Purge binlogs last written longer ago, e.g. 30m, 6h, 2d')
+    parser.add_argument('--archive', nargs='?', const='zlib', choices=list(CODECS),
+                        help='Snapshot files into the backup store before purging (default codec: zlib)')
+    parser.add_argument('--dry-run', action='store_true', help='Show what would be purged')
+    parser.add_argument('--watch', action='store_true', help='Keep enforcing every --interval seconds')
+    parser.add_argument('--interval', type=float, default=60,
+                        help='Seconds between checks with --watch (default: 60)')
+    parser.add_argument('--status', action='store_true',
+                        help='Show binlogs, consumer floor and what the budget would purge')
+    parser.add_argument('--register', metavar='NAME',
+                        help='Register or advance a consumer (with --position or --gtid)')
+    parser.add_argument('--position', metavar='FILE:POS', help='Position processed up to')
+    parser.add_argument('--gtid', help='Last GTID processed')
+    parser.add_argument('--unregister', metavar='NAME', help='Forget a registered consumer')
+    parser.add_argument('--force', action='store_true',
+                        help="Purge even if a registered consumer's GTID cannot be resolved")
+    parser.add_argument('--json', action='store_true', help='Output as JSON')
+    opts = parser.parse_args(args)
+
+    try:
+        max_bytes = parse_size(opts.max_bytes) if opts.max_bytes else None
+        max_age = parse_duration(opts.max_age) if opts.max_age else None
+    except ValueError as e:
+        parser.error(str(e))
+
+    if opts.register:
+        try:
+            entry = register_consumer(opts.register, opts.position, opts.gtid)
+        except ValueError as e:
+            parser.error(str(e))
+        where = f"{entry['file']}:{entry['position']}" if entry.get('file') else entry['gtid']
+        print(f"Registered consumer {opts.register} at {where}")
+        return
+    if opts.unregister:
+        if not unregister_consumer(opts.unregister):
+            print(f"Consumer {opts.unregister} is not registered")
+            sys.exit(1)
+        print(f"Unregistered consumer {opts.unregister}")
+        return
+    if opts.status:
+        print_status(max_bytes, max_age, opts.force)
+        return
+    if max_bytes is None and max_age is None:
+        parser.error('give --max-bytes and/or --max-age (or --status / --register / --unregister)')
+
+    while True:
+        try:
+            report = enforce(max_bytes, max_age, opts.archive, opts.dry_run, opts.force)
+        except Exception as e:
+            if not opts.watch:
+                raise
+            # A soak run outlives MySQL restarts; try again next interval
+            print(f"[{datetime.now().isoformat(timespec='seconds')}] Retention check failed: {e}")
+            time.sleep(opts.interval)
+            continue
+        if opts.json:
+            print(json.dumps(report, indent=2 if not opts.watch else None), flush=True)
+        else:
+            print_report(report)
+            sys.stdout.flush()
+        if not opts.watch:
+            break
+        time.sleep(opts.interval)
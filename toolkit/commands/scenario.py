@@ -0,0 +1,82 @@
+"""Scenario orchestrator command"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+from commands.generate import insert_batch_sql
+from commands.network import TIMELINE_ACTIONS
+from utils.mysql_client import enable_session_pool
+from utils.scenario import SCENARIO_DIR, EventStream, Scenario, load_scenario
+
+
+def print_plan(plan):
+    """Print the phases and steps of a validated scenario"""
+    print(f"Scenario {plan['name']}: {len(plan['phases'])} phase(s)")
+    for phase in plan['phases']:
+        print(f"  {phase['name']}")
+        for step in phase['steps']:
+            target = ' '.join([str(step[step['kind']])] + [str(a) for a in step.get('args', [])])
+            timing = f"+{float(step.get('at', 0)):.1f}s"
+            if 'duration' in step:
+                timing += f" for {step['duration']}s"
+            if step.get('after'):
+                timing += f" after {','.join(step['after'])}"
+            print(f"    {step['id']:20s} {step['kind']:8s} {timing:24s} {target[:60]}")
+        for assertion in phase['assert']:
+            print(f"    assert {assertion.get('metric') or assertion.get('sql')} "
+                  f"{assertion.get('op', '==')} {assertion['value']!r}")
+
+
+def print_report(report):
+    """Print the end-of-run report"""
+    print("=" * 60)
+    print(f"Scenario {report['name']}: {'PASSED' if report['passed'] else 'FAILED'} "
+          f"in {report['duration_s']:.1f}s" + (" (interrupted)" if report['interrupted'] else ''))
+    for phase in report['phases']:
+        failed_steps = [sid for sid, s in phase['steps'].items() if not s.get('ok')]
+        failed_asserts = [a for a in phase['assertions'] if not a['passed']]
+        print(f"  {phase['name']:20s} {'ok' if phase['passed'] else 'FAILED':7s} "
+              f"{phase['duration_s']:8.1f}s  steps {len(phase['steps']) - len(failed_steps)}/"
+              f"{len(phase['steps'])}  assertions "
+              f"{len(phase['assertions']) - len(failed_asserts)}/{len(phase['assertions'])}")
+        for sid in failed_steps:
+            print(f"    step {sid}: {phase['steps'][sid].get('error')}")
+        for a in failed_asserts:
+            print(f"    assert {a.get('metric') or a.get('sql')} {a['op']} {a['expected']!r}: "
+                  f"actual {a['actual']!r}")
+
+
+def run(args):
+    """Run scenario orchestration"""
+    parser = argparse.ArgumentParser(
+        description='Run phased, concurrent workloads and faults from a scenario file')
+    parser.add_argument('action', choices=['run', 'validate'], help='Run or only check the plan')
+    parser.add_argument('plan', help='Scenario JSON file')
+    parser.add_argument('--events', help=f'NDJSON event stream (default: {SCENARIO_DIR}/NAME-TIME.ndjson)')
+    parser.add_argument('--verbose', action='store_true', help='Echo command step output')
+    parser.add_argument('--json', action='store_true', help='Print the final report as JSON')
+    opts = parser.parse_args(args)
+
+    plan = load_scenario(opts.plan)
+    if opts.action == 'validate':
+        Scenario(plan, None, TIMELINE_ACTIONS, None)
+        print_plan(plan)
+        return
+
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    events = EventStream(opts.events or os.path.join(SCENARIO_DIR, f"{plan['name']}-{stamp}.ndjson"))
+    enable_session_pool()
+    try:
+        report = Scenario(plan, events, TIMELINE_ACTIONS, insert_batch_sql, opts.verbose).run()
+    finally:
+        events.close()
+
+    if opts.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+        print(f"Events: {events.path}")
+    if not report['passed']:
+        sys.exit(1)
@@ -2,9 +2,25 @@
 import argparse
 import random
 import string
+import sys
+import threading
+import time
 from datetime import datetime
 
-from utils.mysql_client import execute_sql
+from utils.mysql_client import (
+    MySQLSession, execute_sql, get_binlog_status, binlog_bytes_between,
+)
+from utils.metrics import latency_summary, format_latency
+from utils.run_record import bind_run
+from utils.schema_history import qualify, record_ddl
+from commands.generate import generate_record, insert_batch_sql
+
+
+def run_ddl(sql):
+    """Execute DDL and record the resulting schema version"""
+    before = get_binlog_status()
+    execute_sql(sql)
+    record_ddl([sql], before)
 
 
 def random_column_name():
@@ -26,7 +42,7 @@ def add_column(table='users'):
     col_type = random.choice(col_types)
 
     sql = f"ALTER TABLE {table} ADD COLUMN {col_name} {col_type};"
-    execute_sql(sql)
+    run_ddl(sql)
 
     print(f"Added column: {col_name} ({col_type}) to {table}")
     return col_name
@@ -52,7 +68,7 @@ def drop_column(table='users'):
 
     col_to_drop = random.choice(columns)
     sql = f"ALTER TABLE {table} DROP COLUMN {col_to_drop};"
-    execute_sql(sql)
+    run_ddl(sql)
 
     print(f"Dropped column: {col_to_drop} from {table}")
     return col_to_drop
@@ -64,15 +80,24 @@ def alter_column(table='users'):
 
     # First add a column, then modify it
     sql = f"ALTER TABLE {table} ADD COLUMN {col_name} VARCHAR(50);"
-    execute_sql(sql)
+    run_ddl(sql)
 
     sql = f"ALTER TABLE {table} MODIFY COLUMN {col_name} VARCHAR(200);"
-    execute_sql(sql)
+    run_ddl(sql)
 
     print(f"Added and modified column: {col_name} (VARCHAR(50) -> VARCHAR(200))")
     return col_name
 
 
+def add_index(table='users'):
+    """Add a secondary index on email"""
+    index_name = 'idx_' + ''.join(random.choices(string.ascii_lowercase, k=6))
+    run_ddl(f"ALTER TABLE {table} ADD INDEX {index_name} (email);")
+
+    print(f"Added index: {index_name} on {table}(email)")
+    return index_name
+
+
 def create_table():
     """Create a new test table"""
     table_name = 'test_' + ''.join(random.choices(string.ascii_lowercase, k=6))
@@ -84,11 +109,11 @@ def create_table():
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     );
     """
-    execute_sql(sql)
+    run_ddl(sql)
 
     # Insert a few records
-    for i in range(3):
-        execute_sql(f"INSERT INTO {table_name} (data) VALUES ('test data {i}');")
+    values = ', '.join(f"('test data {i}')" for i in range(3))
+    execute_sql(f"INSERT INTO {table_name} (data) VALUES {values};")
 
     print(f"Created table: {table_name} with 3 records")
     return table_name
@@ -111,23 +136,427 @@ def drop_table():
         return None
 
     table_to_drop = random.choice(tables)
-    execute_sql(f"DROP TABLE {table_to_drop};")
+    run_ddl(f"DROP TABLE {table_to_drop};")
 
     print(f"Dropped table: {table_to_drop}")
     return table_to_drop
 
 
+# ============== Online DDL Under Load ==============
+
+ALGORITHMS = ['INSTANT', 'INPLACE', 'COPY']
+LOCKS = ['DEFAULT', 'NONE', 'SHARED', 'EXCLUSIVE']
+MDL_WAIT_STATE = 'Waiting for table metadata lock'
+
+
+def ddl_plan(change_type, table):
+    """Return (setup, ddl_clause, revert, undo_setup) statements for a measured DDL
+
+    revert restores the table after a successful DDL, undo_setup after a
+    rejected one.
+    """
+    col_name = random_column_name()
+    drop = f"ALTER TABLE {table} DROP COLUMN {col_name};"
+    if change_type == 'add-column':
+        return None, f"ADD COLUMN {col_name} VARCHAR(100)", drop, None
+    if change_type == 'drop-column':
+        return (f"ALTER TABLE {table} ADD COLUMN {col_name} VARCHAR(100);",
+                f"DROP COLUMN {col_name}", None, drop)
+    if change_type == 'alter-column':
+        return (f"ALTER TABLE {table} ADD COLUMN {col_name} VARCHAR(50);",
+                f"MODIFY COLUMN {col_name} VARCHAR(200)", drop, drop)
+    if change_type == 'add-index':
+        return (None, f"ADD INDEX idx_{col_name} (email)",
+                f"ALTER TABLE {table} DROP INDEX idx_{col_name};", None)
+    raise ValueError(f"--under-load does not support {change_type}")
+
+
+def ensure_rows(table, rows, batch=5000):
+    """Grow a table to at least `rows` rows"""
+    current = int(execute_sql(f"SELECT COUNT(*) FROM {table};", raw=True) or 0)
+    if current >= rows:
+        return current
+    print(f"Filling {table}: {current} -> {rows} rows...")
+    start = time.time()
+    with MySQLSession() as session:
+        while current < rows:
+            count = min(batch, rows - current)
+            session.execute(insert_batch_sql(count, table))
+            current += count
+            if current % (batch * 100) == 0 or current == rows:
+                print(f"  {current} rows ({current / (time.time() - start):.0f} rows/s)")
+    return current
+
+
+def dml_worker(table, id_range, stop, samples, errors):
+    """Run single-row UPDATEs by primary key, recording (start, latency)"""
+    with MySQLSession() as session:
+        while not stop.is_set():
+            name = generate_record()[0]
+            start = time.perf_counter()
+            try:
+                session.execute(f"UPDATE {table} SET name = '{name}' "
+                                f"WHERE id = {random.randint(*id_range)};")
+            except Exception as e:
+                errors.append(str(e))
+            samples.append((start, time.perf_counter() - start))
+
+
+def mdl_monitor(stop, samples, interval=0.05):
+    """Sample the number of sessions waiting for a metadata lock"""
+    with MySQLSession() as session:
+        while not stop.is_set():
+            waiting = session.value(
+                "SELECT COUNT(*) FROM information_schema.PROCESSLIST "
+                f"WHERE STATE = '{MDL_WAIT_STATE}';")
+            samples.append((time.perf_counter(), int(waiting or 0)))
+            stop.wait(interval)
+
+
+def split_phases(samples, ddl_start, ddl_end):
+    """Split DML samples into ops before, overlapping and after the DDL"""
+    before, during, after = [], [], []
+    for start, latency in samples:
+        if start + latency <= ddl_start:
+            before.append(latency)
+        elif start < ddl_end:
+            during.append(latency)
+        else:
+            after.append(latency)
+    return before, during, after
+
+
+def measure_online_ddl(table, change_type, algorithm, lock, workers=4,
+                       warmup=5.0, cooldown=5.0, mdl_interval=0.05):
+    """Run one ALTER with ALGORITHM/LOCK under concurrent DML and measure its impact"""
+    setup, clause, revert, undo_setup = ddl_plan(change_type, table)
+    ddl = f"ALTER TABLE {table} {clause}, ALGORITHM={algorithm}, LOCK={lock};"
+    if setup:
+        run_ddl(setup)
+    id_range = tuple(int(v) for v in execute_sql(
+        f"SELECT MIN(id), MAX(id) FROM {table};", raw=True).split('\t'))
+
+    stop = threading.Event()
+    samples, errors, mdl = [], [], []
+    threads = [threading.Thread(target=bind_run(dml_worker), args=(table, id_range, stop, samples, errors),
+                                daemon=True) for _ in range(workers)]
+    threads.append(threading.Thread(target=bind_run(mdl_monitor), args=(stop, mdl, mdl_interval),
+                                    daemon=True))
+    for t in threads:
+        t.start()
+
+    result = {'algorithm': algorithm, 'lock': lock, 'ddl': ddl, 'error': None}
+    try:
+        time.sleep(warmup)
+        before_status = get_binlog_status()
+        ddl_start = time.perf_counter()
+        try:
+            execute_sql(ddl)
+        except Exception as e:
+            result['error'] = str(e).strip().splitlines()[-1]
+        ddl_end = time.perf_counter()
+        after_status = get_binlog_status()
+        if not result['error']:
+            time.sleep(cooldown)
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+
+    if not result['error']:
+        record_ddl([ddl], before_status)
+    cleanup = undo_setup if result['error'] else revert
+    if cleanup:
+        run_ddl(cleanup)
+
+    before, during, after = split_phases(samples, ddl_start, ddl_end)
+    baseline = latency_summary(before)
+    waits = [(ts, n) for ts, n in mdl if ddl_start <= ts <= ddl_end + mdl_interval]
+    result.update({
+        'ddl_seconds': round(ddl_end - ddl_start, 3),
+        'binlog_bytes': binlog_bytes_between(before_status, after_status),
+        'baseline': baseline,
+        'during': latency_summary(during),
+        'after': latency_summary(after),
+        'throughput_before': len(before) / warmup if warmup else 0,
+        'throughput_during': len(during) / max(ddl_end - ddl_start, 1e-6),
+        'spikes': sum(1 for lat in during if lat * 1000 > 10 * max(baseline['p99_ms'], 0.1)),
+        'mdl_max_waiting': max((n for _, n in waits), default=0),
+        'mdl_wait_seconds': round(sum(n for _, n in waits) * mdl_interval, 3),
+        'dml_errors': len(errors),
+    })
+    return result
+
+
+def print_ddl_result(r):
+    """Print the measurements of one DDL variant"""
+    print(f"ALGORITHM={r['algorithm']}, LOCK={r['lock']}")
+    if r['error']:
+        print(f"  Rejected: {r['error']}")
+        return
+    print(f"  DDL duration:     {r['ddl_seconds']:.3f}s")
+    print(f"  Binlog bytes:     {r['binlog_bytes']} during DDL")
+    print(f"  DML before:       {r['throughput_before']:.0f} ops/s  {format_latency(r['baseline'])}")
+    print(f"  DML during:       {r['throughput_during']:.0f} ops/s  {format_latency(r['during'])}")
+    print(f"  DML after:        {format_latency(r['after'])}")
+    print(f"  Latency spikes:   {r['spikes']} op(s) > 10x baseline p99")
+    print(f"  MDL waits:        max {r['mdl_max_waiting']} session(s), "
+          f"{r['mdl_wait_seconds']:.2f} session-seconds")
+    if r['dml_errors']:
+        print(f"  DML errors:       {r['dml_errors']}")
+
+
+def compare_online_ddl(table, change_type, algorithms, lock, workers, rows, warmup, cooldown):
+    """Measure a DDL under load for each algorithm and print a comparison"""
+    if rows:
+        ensure_rows(table, rows)
+    results = []
+    for algorithm in algorithms:
+        result = measure_online_ddl(table, change_type, algorithm, lock, workers, warmup, cooldown)
+        print_ddl_result(result)
+        print("-" * 40)
+        results.append(result)
+
+    print(f"{'Algorithm':10s} {'Lock':10s} {'DDL s':>8s} {'p99 during':>12s} "
+          f"{'max ms':>10s} {'MDL s':>8s} {'binlog B':>10s}")
+    for r in results:
+        if r['error']:
+            print(f"{r['algorithm']:10s} {r['lock']:10s} {'rejected':>8s}")
+            continue
+        print(f"{r['algorithm']:10s} {r['lock']:10s} {r['ddl_seconds']:8.3f} "
+              f"{r['during']['p99_ms']:10.2f}ms {r['during']['max_ms']:10.2f} "
+              f"{r['mdl_wait_seconds']:8.2f} {r['binlog_bytes']:10d}")
+    return results
+
+
+# ============== DDL Storm ==============
+
+STORM_COLUMN_TYPES = ['INT', 'BIGINT', 'VARCHAR(64)', 'VARCHAR(255)', 'DATETIME', 'DECIMAL(10,2)']
+STORM_MAX_COLUMNS = 40
+
+
+def storm_table(name):
+    """Client-side state of a storm table, used to generate valid ALTERs"""
+    return {'name': name, 'columns': {}, 'indexes': {}, 'partitioned': False}
+
+
+def storm_columns(state):
+    """Column list of a storm table in schema history format"""
+    return ['id int', 'data varchar(255)'] + [
+        f"{col} {col_type.lower()}" for col, col_type in state['columns'].items()]
+
+
+def storm_clause(state, touched):
+    """Pick one ALTER clause compatible with the clauses already in the statement"""
+    columns, indexes = state['columns'], state['indexes']
+    free = [c for c in columns if c not in touched]
+    unindexed = [c for c in free if c not in indexes.values()]
+    ops = ['add'] if len(columns) < STORM_MAX_COLUMNS else []
+    if unindexed:
+        ops += ['drop', 'modify', 'index']
+    if free:
+        ops.append('rename')
+    if [i for i, c in indexes.items() if c not in touched]:
+        ops.append('drop-index')
+    if not ops:
+        return None, None
+
+    op = random.choice(ops)
+    if op == 'add':
+        col = random_column_name()
+        columns[col] = random.choice(STORM_COLUMN_TYPES)
+        touched.add(col)
+        return op, f"ADD COLUMN {col} {columns[col]}"
+    if op == 'drop':
+        col = random.choice(unindexed)
+        del columns[col]
+        touched.add(col)
+        return op, f"DROP COLUMN {col}"
+    if op == 'modify':
+        col = random.choice(unindexed)
+        columns[col] = random.choice([t for t in STORM_COLUMN_TYPES if t != columns[col]])
+        touched.add(col)
+        return op, f"MODIFY COLUMN {col} {columns[col]}"
+    if op == 'index':
+        col = random.choice(unindexed)
+        index = 'idx_' + col[4:]
+        indexes[index] = col
+        touched.add(col)
+        return op, f"ADD INDEX {index} ({col})"
+    if op == 'rename':
+        col = random.choice(free)
+        new = random_column_name()
+        # Rebuild to keep the column's position, as RENAME COLUMN does
+        state['columns'] = {(new if c == col else c): t for c, t in columns.items()}
+        for index, indexed in indexes.items():
+            if indexed == col:
+                indexes[index] = new
+        touched.update((col, new))
+        return op, f"RENAME COLUMN {col} TO {new}"
+    index = random.choice([i for i, c in indexes.items() if c not in touched])
+    touched.add(indexes.pop(index))
+    return op, f"DROP INDEX {index}"
+
+
+def storm_statement(state, max_clauses, partition_ratio):
+    """Build one ALTER for a storm table; return (ops, sql)"""
+    if random.random() < partition_ratio:
+        state['partitioned'] = not state['partitioned']
+        if state['partitioned']:
+            return ['partition'], (f"ALTER TABLE {state['name']} "
+                                   f"PARTITION BY HASH(id) PARTITIONS {random.randint(2, 8)};")
+        return ['unpartition'], f"ALTER TABLE {state['name']} REMOVE PARTITIONING;"
+
+    ops, clauses, touched = [], [], set()
+    for _ in range(random.randint(1, max_clauses)):
+        op, clause = storm_clause(state, touched)
+        if not clause:
+            break
+        ops.append(op)
+        clauses.append(clause)
+    return ops, f"ALTER TABLE {state['name']} {', '.join(clauses)};"
+
+
+def run_storm_batch(session, statements, snapshots, history):
+    """Execute a batch of storm DDL and record its schema versions"""
+    before = get_binlog_status() if history else None
+    session.execute('\n'.join(statements))
+    if history:
+        record_ddl(statements, before, snapshots)
+
+
+def ddl_storm(count, tables=4, max_clauses=1, batch=100, partition_ratio=0.02, keep=False,
+              history=True):
+    """Issue count ALTERs of mixed operations over one persistent session
+
+    Statements rotate over dedicated storm_* tables whose columns and
+    indexes are tracked client-side, so every generated ALTER is valid and
+    no round trip is spent on SHOW COLUMNS. batch statements are sent per
+    round trip; the tracked columns double as schema history snapshots.
+    """
+    suffix = ''.join(random.choices(string.ascii_lowercase, k=6))
+    states = [storm_table(f"storm_{suffix}_{i}") for i in range(tables)]
+    op_counts = {}
+    clauses = 0
+    done = 0
+    failed = False
+
+    with MySQLSession() as session:
+        start = time.perf_counter()
+        try:
+            run_storm_batch(
+                session,
+                [f"CREATE TABLE {t['name']} (id INT AUTO_INCREMENT PRIMARY KEY, data VARCHAR(255));"
+                 for t in states],
+                [{qualify(t['name']): storm_columns(t)} for t in states], history)
+            print(f"Created {tables} storm table(s): storm_{suffix}_0..{tables - 1}")
+
+            start = time.perf_counter()
+            last_report = start
+            while done < count:
+                statements, snapshots, batch_ops = [], [], []
+                for _ in range(min(batch, count - done)):
+                    state = states[(done + len(statements)) % tables]
+                    ops, sql = storm_statement(state, max_clauses, partition_ratio)
+                    batch_ops += ops
+                    statements.append(sql)
+                    snapshots.append({qualify(state['name']): storm_columns(state)})
+                run_storm_batch(session, statements, snapshots, history)
+                for op in batch_ops:
+                    op_counts[op] = op_counts.get(op, 0) + 1
+                clauses += len(batch_ops)
+                done += len(statements)
+
+                now = time.perf_counter()
+                if now - last_report >= 1.0 or done == count:
+                    last_report = now
+                    print(f"  {done}/{count} DDL statements  "
+                          f"{done / (now - start) * 60:.0f} DDL/min")
+        except KeyboardInterrupt:
+            print("\nDDL storm stopped by user")
+        except Exception as e:
+            # The session runs with --force, so the rest of the batch was
+            # applied; the tracked columns no longer match the server and the
+            # batch cannot be placed in schema history
+            print(f"DDL storm stopped: batch failed, its schema history was not recorded: {e}")
+            failed = True
+            if keep:
+                print(f"  storm_{suffix}_* tables kept; their columns may differ from the tracked state")
+        finally:
+            elapsed = time.perf_counter() - start
+            if not keep:
+                run_storm_batch(session, [f"DROP TABLE IF EXISTS {t['name']};" for t in states],
+                                [{qualify(t['name']): None} for t in states], history)
+
+    print("-" * 40)
+    print(f"DDL statements:  {done} ({clauses} clauses) in {elapsed:.2f}s")
+    print(f"Throughput:      {done / max(elapsed, 1e-6) * 60:.0f} DDL/min "
+          f"({done / max(elapsed, 1e-6):.1f}/s)")
+    print("Operations:      " + ', '.join(f"{op}={n}" for op, n in sorted(op_counts.items())))
+    if failed:
+        sys.exit(1)
+
+
 def run(args):
     """Run schema change"""
     parser = argparse.ArgumentParser(description='Generate schema changes (DDL)')
-    parser.add_argument('--type', required=True,
+    parser.add_argument('--type',
                         choices=['add-column', 'drop-column', 'alter-column',
-                                 'create-table', 'drop-table'],
+                                 'create-table', 'drop-table', 'add-index'],
                         help='Type of schema change')
     parser.add_argument('--table', default='users', help='Target table')
     parser.add_argument('--count', type=int, default=1, help='Number of changes')
+    parser.add_argument('--storm', action='store_true',
+                        help='DDL storm: --count mixed ALTERs over one session')
+    parser.add_argument('--combine', type=int, default=1,
+                        help='Storm: max clauses per ALTER (default: 1)')
+    parser.add_argument('--tables', type=int, default=4,
+                        help='Storm: number of storm tables (default: 4)')
+    parser.add_argument('--batch', type=int, default=100,
+                        help='Storm: statements per round trip (default: 100)')
+    parser.add_argument('--partition-ratio', type=float, default=0.02,
+                        help='Storm: fraction of ALTERs that (re)partition (default: 0.02)')
+    parser.add_argument('--keep', action='store_true',
+                        help='Storm: keep the storm tables afterwards')
+    parser.add_argument('--no-history', action='store_true',
+                        help='Storm: do not record schema history (raw DDL throughput)')
+    parser.add_argument('--under-load', action='store_true',
+                        help='Run the DDL while concurrent DML runs and measure its impact')
+    parser.add_argument('--algorithm', default='INSTANT,INPLACE,COPY',
+                        help='Under load: comma-separated ALGORITHM variants to compare')
+    parser.add_argument('--lock', default='DEFAULT', choices=LOCKS,
+                        help='Under load: LOCK clause (default: DEFAULT)')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Under load: concurrent DML sessions (default: 4)')
+    parser.add_argument('--rows', type=int, default=0,
+                        help='Under load: grow the table to at least N rows first')
+    parser.add_argument('--warmup', type=float, default=5.0,
+                        help='Under load: seconds of DML before the DDL (default: 5)')
+    parser.add_argument('--cooldown', type=float, default=5.0,
+                        help='Under load: seconds of DML after the DDL (default: 5)')
     opts = parser.parse_args(args)
 
+    if opts.storm:
+        print(f"DDL storm: {opts.count} ALTER(s), up to {opts.combine} clause(s) each, "
+              f"{opts.tables} table(s)")
+        print("-" * 40)
+        ddl_storm(opts.count, opts.tables, max(1, opts.combine), opts.batch,
+                  opts.partition_ratio, opts.keep, not opts.no_history)
+        return
+    if not opts.type:
+        parser.error("--type is required unless --storm is given")
+
+    if opts.under_load:
+        algorithms = [a.strip().upper() for a in opts.algorithm.split(',') if a.strip()]
+        for algorithm in algorithms:
+            if algorithm not in ALGORITHMS:
+                parser.error(f"unknown algorithm {algorithm} (choose from {', '.join(ALGORITHMS)})")
+        print(f"Online DDL under load: {opts.type} on {opts.table}, {opts.workers} DML session(s)")
+        print("-" * 40)
+        compare_online_ddl(opts.table, opts.type, algorithms, opts.lock, opts.workers,
+                           opts.rows, opts.warmup, opts.cooldown)
+        return
+
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     print(f"[{timestamp}] Generating {opts.count} schema change(s): {opts.type}")
     print("-" * 40)
@@ -143,6 +572,8 @@ def run(args):
             create_table()
         elif opts.type == 'drop-table':
             drop_table()
+        elif opts.type == 'add-index':
+            add_index(opts.table)
 
     print("-" * 40)
     print("Schema change(s) complete. Check binlog for DDL events.")
@@ -6,14 +6,18 @@ import time
 from datetime import datetime
 
 from utils.mysql_client import execute_sql, get_record_count
+from utils.run_record import record_counts
+from utils.profiling import timed
 
 
+@timed('transaction.generate_random_text')
 def generate_random_text(size_kb):
     """Generate random text of specified size in KB"""
     size_bytes = size_kb * 1024
     return ''.join(random.choices(string.ascii_letters + string.digits + ' ', k=size_bytes))
 
 
+@timed('transaction.generate_random_blob')
 def generate_random_blob(size_kb):
     """Generate random binary data of specified size in KB"""
     size_bytes = size_kb * 1024
@@ -59,6 +63,7 @@ def large_row_count_transaction(row_count, table='users'):
 
             sql = f"INSERT INTO {table} (name, email, status) VALUES {','.join(values)};"
             execute_sql(sql)
+            record_counts(rows=batch_count, bytes=len(sql))
             total_inserted += batch_count
             print(f"  Inserted {total_inserted}/{row_count} rows...")
 
@@ -92,6 +97,7 @@ def large_data_size_transaction(row_count, size_kb_per_row, data_type='text'):
                 sql = f"INSERT INTO large_data (data_blob) VALUES (UNHEX('{data}'));"
 
             execute_sql(sql)
+            record_counts(rows=1, bytes=len(sql))
 
             if (i + 1) % 10 == 0 or i == row_count - 1:
                 print(f"  Inserted {i + 1}/{row_count} rows...")
@@ -167,6 +173,7 @@ def mixed_large_transaction(row_count, size_kb, duration_seconds):
             data = generate_random_text(size_kb)
             sql = f"INSERT INTO large_data (data_text) VALUES ('{data}');"
             execute_sql(sql)
+            record_counts(rows=1, bytes=len(sql))
 
             if (i + 1) % 10 == 0:
                 print(f"  Inserted {i + 1}/{row_count} rows...")
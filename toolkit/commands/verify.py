@@ -0,0 +1,60 @@
+"""Binlog integrity verification command"""
+import argparse
+import json
+import sys
+import time
+
+from utils.mysql_client import BINLOG_DIR, get_binlog_files
+from utils.binlog import verify_binlogs
+
+
+def verify_paths(paths, workers=None, as_json=False):
+    """Verify binlog files in parallel and print a report; return True if all valid"""
+    start = time.time()
+    results = verify_binlogs(paths, workers)
+    elapsed = time.time() - start
+    total = sum(r['size'] for r in results)
+    all_ok = all(r['ok'] for r in results)
+
+    if as_json:
+        print(json.dumps({
+            'ok': all_ok,
+            'elapsed_seconds': round(elapsed, 3),
+            'bytes': total,
+            'files': results,
+        }, indent=2))
+        return all_ok
+
+    print(f"Verifying {len(results)} binlog file(s)...")
+    print("-" * 40)
+    for r in results:
+        if r['ok']:
+            crc = 'CRC32' if r['checksums'] else 'no checksums'
+            print(f"  OK   {r['file']:40s} {r['events']:>9d} events ({crc})")
+        else:
+            print(f"  BAD  {r['file']:40s} @ {r['first_bad_offset']}: {r['error']}")
+    print("-" * 40)
+    rate = total / 1024 / 1024 / max(elapsed, 1e-6)
+    print(f"Checked {total} bytes in {elapsed:.2f}s ({rate:.1f} MB/s)")
+    print("All binlogs valid" if all_ok else "Corruption detected")
+    return all_ok
+
+
+def run(args):
+    """Run binlog verification"""
+    parser = argparse.ArgumentParser(description='Verify binlog file integrity')
+    parser.add_argument('--file', action='append',
+                        help='Binlog file to verify (repeatable, default: all)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Parallel worker processes (default: CPU count)')
+    parser.add_argument('--json', action='store_true', help='Output as JSON')
+    opts = parser.parse_args(args)
+
+    if opts.file:
+        filenames = opts.file
+    else:
+        filenames = [f['name'] for f in get_binlog_files()]
+
+    paths = [f if f.startswith('/') else f"{BINLOG_DIR}/{f}" for f in filenames]
+    if not verify_paths(paths, opts.workers, opts.json):
+        sys.exit(1)
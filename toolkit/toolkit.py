@@ -3,7 +3,7 @@
 MySQL Testing Toolkit - CLI Entry Point
 
 Usage:
-    toolkit <command> [options]
+    toolkit [--profile[=FILE]] [--trace-memory[=N]] [--timing] <command> [options]
 
 Commands:
     status          Show system status
@@ -11,8 +11,19 @@ Commands:
     monitor         Monitor binlog position
     corrupt         Corrupt binlog for testing
     replicate       Simulate replication scenarios
+    replica         Manage the in-container GTID replica
     schema-change   Generate DDL events
     restore         Restore binlog from backup
+    verify          Verify binlog file integrity
+    binlog-index    GTID / position / timestamp index of binlogs
+    schema-history  Schema versions keyed by binlog position / GTID
+    proxy           Fault-injection TCP proxy in front of MySQL
+    scenario        Run phased, concurrent workloads and faults from a plan
+    bench           Benchmark the toolkit write paths
+    binlog-dump     Stream binlog events as a replica, report events/s and MB/s
+    checksum        Compare tables with a destination in checksummed chunks
+    retention       Purge binlogs to a size / age budget, consumer-aware
+    daemon          Warm toolkit process the CLI forwards commands to
     help            Show this help message
 """
 import sys
@@ -22,31 +33,60 @@ import os
 TOOLKIT_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, TOOLKIT_DIR)
 
-from commands import generate, monitor, corrupt, replicate, schema, restore, status, transaction, expose, tunnel, network
-
+from utils.daemon import forward
+from utils.profiling import parse_global_options
 
+# Command name -> module in commands/. Modules are imported on first use, so
+# a call only pays for the command it runs (and its dependencies)
 COMMANDS = {
-    'status': status.run,
-    'generate-data': generate.run,
-    'monitor': monitor.run,
-    'corrupt': corrupt.run,
-    'replicate': replicate.run,
-    'schema-change': schema.run,
-    'restore': restore.run,
-    'transaction': transaction.run,
-    'expose': expose.run,
-    'tunnel': tunnel.run,
-    'network': network.run,
+    'status': 'status',
+    'generate-data': 'generate',
+    'monitor': 'monitor',
+    'corrupt': 'corrupt',
+    'replicate': 'replicate',
+    'replica': 'replica',
+    'schema-change': 'schema',
+    'restore': 'restore',
+    'verify': 'verify',
+    'binlog-index': 'index',
+    'schema-history': 'history',
+    'transaction': 'transaction',
+    'expose': 'expose',
+    'tunnel': 'tunnel',
+    'network': 'network',
+    'proxy': 'proxy',
+    'scenario': 'scenario',
+    'bench': 'bench',
+    'binlog-dump': 'binlog_dump',
+    'checksum': 'checksum',
+    'retention': 'retention',
+    'daemon': 'daemon',
 }
 
 
+def load_command(command):
+    """Import the module implementing a command and return its entry point"""
+    # __import__ rather than importlib.import_module: -X importtime only
+    # reports imports that go through the import statement machinery
+    module = __import__(f"commands.{COMMANDS[command]}", fromlist=['run'])
+    if command == 'daemon':
+        return lambda args: module.run(args, dispatch=run_command)
+    return module.run
+
+
 def print_help():
     """Print help message"""
     print("""
 MySQL Testing Toolkit v1.0.0
 ============================
 
-Usage: toolkit <command> [options]
+Usage: toolkit [global options] <command> [options]
+
+Global options (before the command; reports go to stderr):
+  --profile[=FILE]      cProfile the command; print top functions, dump pstats
+  --trace-memory[=N]    tracemalloc: peak memory and top N allocation sites
+  --timing              Time execute_sql, sessions and payload generators;
+                        split wall time into Python, mysql client and waiting
 
 Commands:
   status            Show MySQL and binlog status
@@ -59,23 +99,95 @@ Commands:
                     --json          Output as JSON
 
   corrupt           Corrupt binlog for testing
-                    --type TYPE     truncate|random-bytes|magic-number
+                    --type TYPE     truncate|random-bytes|magic-number|
+                                    truncate-event|bad-checksum|table-map|
+                                    rows-event|gtid-cut
                     --percentage N  Truncate percentage (default: 50)
+                    --event-type T  Event type for truncate-event/bad-checksum
+                    --nth N         Target the Nth matching event (default: 1)
+                    --gtid G        Target the transaction with GTID G
+                    --table T       Table for table-map/rows-event
+                    --fix-checksum  Recompute CRC32 after body corruption
+                    --inspect       Show the binlog event index
                     --no-backup     Skip creating backup
 
   replicate         Simulate replication scenarios
-                    --scenario S    lag|disconnect|gtid-gap
+                    --scenario S    lag|disconnect|gtid-gap|rotation-storm
                     --duration N    Duration in seconds (for lag)
+                    --gtid G        Report consumer resume point for GTID G
+                    --profile P     Lag: shaped load, NAME[:key=value,...]
+                                    step|ramp|sine|burst|replay
+                    --replica       Lag: measure real lag on the local replica
+                    --source-delay N  Lag: set SOURCE_DELAY on the replica
+                    --parallel-workers N  Lag: set replica applier workers
+                    --batch N       Rows per INSERT (lag --replica) or
+                                    transactions per round trip (gtid-gap)
+                    --fragments N   GTID gap: foreign-UUID transactions
+                    --uuids N       GTID gap: number of foreign UUIDs
+                    --stride N      GTID gap: GNO step (>1 leaves holes)
+                    --own-gaps N    GTID gap: holes in the server's own UUID
+                    --write-ratio F GTID gap: fraction that insert a row
+                    --files N       Rotation storm: binlog files to create
+                    --file-size N   Rotation storm: target bytes per file
+                    --rate N        Rotation storm: rotations per second
+
+  replica           Local GTID replica (second mysqld, port 3307)
+                    --start         Start (initialize + seed on first use)
+                    --stop          Stop the replica
+                    --reseed        Reload testdb and restart replication
+                    --delay N       Set SOURCE_DELAY in seconds
+                    --workers N     Set replica_parallel_workers
+                    --status        Show replica status
 
   schema-change     Generate DDL events
                     --type TYPE     add-column|drop-column|alter-column|
-                                    create-table|drop-table
+                                    create-table|drop-table|add-index
                     --count N       Number of changes
+                    --storm         DDL storm: --count mixed ALTERs over one
+                                    session (add/drop/modify/rename/index/
+                                    partition)
+                    --combine N     Storm: max clauses per ALTER
+                    --tables N      Storm: number of storm tables
+                    --keep          Storm: keep the storm tables
+                    --no-history    Storm: skip schema history recording
+                    --under-load    Run the DDL under concurrent DML and
+                                    measure duration, latency, MDL waits
+                    --algorithm A   Under load: INSTANT,INPLACE,COPY (list)
+                    --lock L        Under load: DEFAULT|NONE|SHARED|EXCLUSIVE
+                    --workers N     Under load: DML sessions
+                    --rows N        Under load: grow the table to N rows
 
   restore           Restore binlog from backup
                     --list          List available backups
                     --file FILE     Specific backup to restore
                     --all           Restore all backups
+                    --gtid G        Restore the binlog containing GTID G
+                    --snapshot      Store binlogs in the dedup backup store
+                    --from-store    Restore from the backup store
+                    --compression C zlib|lzma|none (default: zlib)
+                    --workers N     Parallel workers (default: CPU count)
+                    --verify        Verify restored binlogs afterwards
+
+  verify            Verify binlog integrity (magic, lengths,
+                    next-position chaining, CRC32 checksums)
+                    --file FILE     Binlog to check (repeatable, default: all)
+                    --workers N     Parallel processes (default: CPU count)
+                    --json          Output as JSON
+
+  binlog-index      Index GTID -> (file, start, end, timestamp)
+                    --gtid G        Look up position of a GTID
+                    --time T        First transaction at/after a time
+                    --position F:N  Transaction containing FILE:OFFSET
+                    --follow        Keep indexing as binlogs are written
+                    --rebuild       Rebuild the index from scratch
+                    --json          Output as JSON
+
+  schema-history    Schema snapshots recorded by schema-change
+                    --table T       Table to look up
+                    --gtid G        Columns of T as of GTID G
+                    --position F:N  Columns of T as of FILE:OFFSET
+                    --limit N       Versions to list (default: 20)
+                    --json          Output as JSON
 
   transaction       Simulate large transactions
                     --type TYPE     many-rows|large-data|long-running|mixed
@@ -100,15 +212,106 @@ Commands:
   network           Simulate network failures for ETL testing
                     --down          Bring connection down
                     --up            Restore connection
-                    --type T        service|reject|timeout
-                    --duration N    Auto-restore after N seconds
+                    --type T        service|crash|reject|timeout
+                    --duration N    Auto-restore after N seconds (fractional)
                     --flap          Flapping mode (toggle up/down)
+                    --interval N    Flap interval, sub-second allowed
                     --slow          Enable latency injection
                     --latency N     Latency in ms (default: 2000)
+                    --profile P     cross-region|lossy-wifi|saturated-vpn|
+                                    satellite (port-scoped link profile)
+                    --rate R        Bandwidth limit (e.g. 2mbit)
+                    --jitter N      Delay jitter in ms
+                    --loss P        Packet loss % (--loss-correlation P)
+                    --reorder P     Reorder %
+                    --port N        Port to shape (default: 3306)
+                    --plan FILE     Run a JSON fault timeline (at/action/
+                                    duration/params, overlapping allowed)
                     --status        Show network status
 
+  proxy             Userspace fault-injection proxy (port 13306 -> 3306)
+                    --start/--stop  Run the proxy in the background
+                    --set K=V       latency_ms|jitter_ms|bandwidth_kbps|
+                                    direction|reset_ratio|half_open_ratio
+                    --clear         Reset all fault settings
+                    --stall N       Pause all forwarding for N seconds
+                    --reset ID|all  RST a connection or all of them
+                    --half-open ID|all  Drop server side, keep client open
+                    --connections   List proxied connections
+                    --status        Show proxy status
+
+  scenario          Declarative test scenario (JSON plan)
+                    run PLAN        Run phases of concurrent command/load/
+                                    fault/sql steps, assert after each phase
+                    validate PLAN   Check the plan and print its steps
+                    --events FILE   NDJSON event stream (default under
+                                    /opt/toolkit-data/scenarios)
+                    --verbose       Echo command step output
+                    --json          Print the final report as JSON
+
+  bench             Write path benchmarks (rows/s, bytes/s, latency)
+                    --methods M     single,multi,prepared,load-data,large-data
+                    --batch N,..    Rows per round trip (default: 1,10,100,1000)
+                    --concurrency N,..  Sessions (default: 1,4)
+                    --sessions S    pinned|per-statement|both
+                    --payload-kb N,..   large-data row sizes (default: 1,16,256)
+                    --duration N    Seconds per case (default: 5)
+                    --output FILE   Save results as JSON
+                    --compare FILE  Show change against a saved run
+                    --json          Output as JSON
+
+  binlog-dump       Register as a replica (COM_BINLOG_DUMP_GTID) and stream
+                    events; report events/s, MB/s and per-type counts
+                    --gtid-set SET  Start after this GTID set (default: all)
+                    --from-current  Start after the current gtid_executed
+                    --follow        Keep streaming new events
+                    --limit N       Stop after N events
+                    --duration N    Stop after N seconds
+                    --cost-us N     Artificial per-event processing cost
+                    --verify-checksums  CRC32-check every event
+                    --host H        Connect over TCP (default: local socket)
+                    --progress N    Print throughput every N seconds
+                    --json          Output as JSON
+
+  checksum          Chunked CRC32/BIT_XOR table checksums on the source and
+                    a destination; reports mismatching chunks only
+                    --dest D        replica|sqlite:///FILE|mysql://HOST:PORT/DB
+                    --tables T,..   Tables to compare (default: all)
+                    --chunk-size N  Primary-key values per chunk (default: 10000)
+                    --workers N     Parallel sessions per side (default: 4)
+                    --recheck N     Re-compare mismatches N times (lag)
+                    --rows          List differing keys in mismatching chunks
+                    --json          Output as JSON
+
+  retention         PURGE BINARY LOGS to a byte / age budget, never past the
+                    oldest file a dump thread or registered consumer needs
+                    --max-bytes S   Total binlog budget (e.g. 2G)
+                    --max-age A     Purge files older than A (e.g. 6h, 2d)
+                    --archive [C]   Snapshot into the backup store first
+                                    (zlib|lzma|none, default: zlib)
+                    --dry-run       Show what would be purged
+                    --watch         Enforce every --interval seconds (60)
+                    --status        Files, consumer floor, purge candidates
+                    --register NAME --position F:P | --gtid G
+                                    Register / advance a consumer
+                    --unregister NAME  Forget a consumer
+                    --force         Purge even if a consumer's GTID
+                                    does not resolve
+                    --json          Output as JSON
+
+  daemon            Keep a warm toolkit process; other commands are
+                    forwarded to it over a Unix socket when it runs
+                    (TOOLKIT_NO_DAEMON=1 forces in-process execution)
+                    --start/--stop  Run the daemon in the background
+                    --pool-size N   Idle mysql sessions per target (default: 4)
+                    --status        Show requests served and pool usage
+
   help              Show this help message
 
+Every run appends a JSON record (timing, statements, latency histogram,
+binlog position/GTID before and after, errors) to TOOLKIT_RUN_RECORDS
+(default: /opt/toolkit-data/runs.ndjson; a directory, *.json or 'off').
+
 Examples:
   toolkit status
   toolkit generate-data --count 100 --interval 60
@@ -119,31 +322,71 @@ Examples:
 """)
 
 
+def run_command(command, args):
+    """Run a command in this process and return its exit code"""
+    if command not in COMMANDS:
+        print(f"Unknown command: {command}")
+        print("Run 'toolkit help' for available commands")
+        return 1
+
+    # Imported here so forwarding to the daemon never loads mysql_client
+    from utils.run_record import start_run, finish_run
+
+    record = start_run(command, args) if command != 'daemon' else None
+    code, error = 0, None
+    try:
+        load_command(command)(args)
+    except KeyboardInterrupt:
+        print("\nOperation cancelled.")
+        code, error = 130, 'cancelled'
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        raise
+    except Exception as e:
+        print(f"Error: {e}")
+        code, error = 1, str(e)
+    finally:
+        finish_run(record, code, error)
+    return code
+
+
 def main():
-    if len(sys.argv) < 2:
+    try:
+        profiler, argv = parse_global_options(sys.argv[1:])
+    except ValueError as e:
+        print(f"Invalid option: {e}")
+        sys.exit(1)
+
+    if not argv:
         print_help()
         sys.exit(0)
 
-    command = sys.argv[1]
-    args = sys.argv[2:]
+    command = argv[0]
+    args = argv[1:]
 
     if command in ('help', '--help', '-h'):
         print_help()
         sys.exit(0)
 
-    if command not in COMMANDS:
-        print(f"Unknown command: {command}")
-        print("Run 'toolkit help' for available commands")
-        sys.exit(1)
+    # Hand the command to a running daemon; run it here if there is none.
+    # Profiled runs stay in-process so the report covers the real work
+    if command != 'daemon' and not profiler.enabled:
+        try:
+            code = forward(argv)
+        except KeyboardInterrupt:
+            print("\nOperation cancelled.")
+            sys.exit(130)
+        if code is not None:
+            sys.exit(code)
 
+    if not profiler.enabled:
+        sys.exit(run_command(command, args))
+    profiler.start()
     try:
-        COMMANDS[command](args)
-    except KeyboardInterrupt:
-        print("\nOperation cancelled.")
-        sys.exit(130)
-    except Exception as e:
-        print(f"Error: {e}")
-        sys.exit(1)
+        code = run_command(command, args)
+    finally:
+        profiler.stop()
+    sys.exit(code)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,422 @@
+"""Binlog file parsing helpers (event index over mmap)"""
+import mmap
+import os
+import struct
+import zlib
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+BINLOG_MAGIC = b'\xfebin'
+HEADER_LEN = 19
+CHECKSUM_LEN = 4
+
+# Event header: timestamp, type_code, server_id, event_length, next_position, flags
+HEADER_STRUCT = struct.Struct('<IBIIIH')
+
+CHECKSUM_OFF = 0
+CHECKSUM_CRC32 = 1
+
+# Event type codes (subset relevant for CDC testing)
+QUERY_EVENT = 2
+STOP_EVENT = 3
+ROTATE_EVENT = 4
+FORMAT_DESCRIPTION_EVENT = 15
+XID_EVENT = 16
+TABLE_MAP_EVENT = 19
+WRITE_ROWS_EVENT_V1 = 23
+UPDATE_ROWS_EVENT_V1 = 24
+DELETE_ROWS_EVENT_V1 = 25
+WRITE_ROWS_EVENT = 30
+UPDATE_ROWS_EVENT = 31
+DELETE_ROWS_EVENT = 32
+GTID_EVENT = 33
+ANONYMOUS_GTID_EVENT = 34
+PREVIOUS_GTIDS_EVENT = 35
+
+EVENT_TYPES = {
+    'query': QUERY_EVENT,
+    'stop': STOP_EVENT,
+    'rotate': ROTATE_EVENT,
+    'format-description': FORMAT_DESCRIPTION_EVENT,
+    'xid': XID_EVENT,
+    'table-map': TABLE_MAP_EVENT,
+    'write-rows': WRITE_ROWS_EVENT,
+    'update-rows': UPDATE_ROWS_EVENT,
+    'delete-rows': DELETE_ROWS_EVENT,
+    'gtid': GTID_EVENT,
+    'anonymous-gtid': ANONYMOUS_GTID_EVENT,
+    'previous-gtids': PREVIOUS_GTIDS_EVENT,
+}
+
+EVENT_NAMES = {code: name for name, code in EVENT_TYPES.items()}
+EVENT_NAMES.update({
+    WRITE_ROWS_EVENT_V1: 'write-rows-v1',
+    UPDATE_ROWS_EVENT_V1: 'update-rows-v1',
+    DELETE_ROWS_EVENT_V1: 'delete-rows-v1',
+})
+
+ROWS_EVENTS = (
+    WRITE_ROWS_EVENT, UPDATE_ROWS_EVENT, DELETE_ROWS_EVENT,
+    WRITE_ROWS_EVENT_V1, UPDATE_ROWS_EVENT_V1, DELETE_ROWS_EVENT_V1,
+)
+
+
+def event_name(type_code):
+    """Human readable name for an event type code"""
+    return EVENT_NAMES.get(type_code, f'unknown-{type_code}')
+
+
+@contextmanager
+def open_binlog(path, writable=False):
+    """Map a binlog file into memory (read-only unless writable)"""
+    mode = 'r+b' if writable else 'rb'
+    access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+    with open(path, mode) as f:
+        buf = mmap.mmap(f.fileno(), 0, access=access)
+        try:
+            yield buf
+        finally:
+            buf.close()
+
+
+def read_lenenc_int(buf, pos):
+    """Read a length-encoded integer, return (value, new_pos)"""
+    first = buf[pos]
+    if first < 0xfb:
+        return first, pos + 1
+    if first == 0xfc:
+        return struct.unpack_from('<H', buf, pos + 1)[0], pos + 3
+    if first == 0xfd:
+        return int.from_bytes(buf[pos + 1:pos + 4], 'little'), pos + 4
+    return struct.unpack_from('<Q', buf, pos + 1)[0], pos + 9
+
+
+def format_uuid(raw):
+    """Format 16 raw bytes as a server UUID string"""
+    h = bytes(raw).hex()
+    return f"{h[0:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:32]}"
+
+
+def parse_format_description(buf, offset, length):
+    """Return (checksum_alg, post_header_lengths) from a FORMAT_DESCRIPTION event"""
+    body = offset + HEADER_LEN
+    version = bytes(buf[body + 2:body + 52]).split(b'\x00', 1)[0].decode('ascii', 'replace')
+    checksum_alg = CHECKSUM_OFF
+    post_header_end = offset + length
+    try:
+        numbers = tuple(int(p) for p in version.split('-')[0].split('.')[:3])
+    except ValueError:
+        numbers = (0, 0, 0)
+    if numbers >= (5, 6, 1):
+        # Checksum algorithm byte + CRC32 trail every FDE since 5.6.1
+        checksum_alg = buf[offset + length - 5]
+        post_header_end = offset + length - 5
+    post_header_lengths = bytes(buf[body + 57:post_header_end])
+    return checksum_alg, post_header_lengths
+
+
+def parse_gtid(buf, offset):
+    """Return 'uuid:gno' for the GTID event at offset"""
+    body = offset + HEADER_LEN
+    sid = format_uuid(buf[body + 1:body + 17])
+    gno = struct.unpack_from('<Q', buf, body + 17)[0]
+    return f"{sid}:{gno}"
+
+
+def parse_query(buf, offset, length, checksums=True):
+    """Return (db, query) for a QUERY event"""
+    body = offset + HEADER_LEN
+    db_len = buf[body + 8]
+    status_len = int.from_bytes(buf[body + 11:body + 13], 'little')
+    db_start = body + 13 + status_len
+    end = offset + length - (CHECKSUM_LEN if checksums else 0)
+    db = bytes(buf[db_start:db_start + db_len]).decode('utf-8', 'replace')
+    query = bytes(buf[db_start + db_len + 1:end]).decode('utf-8', 'replace')
+    return db, query
+
+
+def parse_table_map(buf, offset, post_header_len=8):
+    """Return (table_id, db, table, column_types_offset) for a TABLE_MAP event"""
+    body = offset + HEADER_LEN
+    table_id = int.from_bytes(buf[body:body + 6], 'little')
+    pos = body + post_header_len
+    db_len = buf[pos]
+    db = bytes(buf[pos + 1:pos + 1 + db_len]).decode('utf-8', 'replace')
+    pos += 1 + db_len + 1
+    table_len = buf[pos]
+    table = bytes(buf[pos + 1:pos + 1 + table_len]).decode('utf-8', 'replace')
+    pos += 1 + table_len + 1
+    _, column_types_offset = read_lenenc_int(buf, pos)
+    return table_id, db, table, column_types_offset
+
+
+def rows_event_table_id(buf, offset):
+    """Return the table id referenced by a ROWS event"""
+    body = offset + HEADER_LEN
+    return int.from_bytes(buf[body:body + 6], 'little')
+
+
+def event_checksum_ok(buf, offset, length):
+    """Check the CRC32 trailer of an event"""
+    end = offset + length
+    expected = struct.unpack_from('<I', buf, end - CHECKSUM_LEN)[0]
+    return zlib.crc32(buf[offset:end - CHECKSUM_LEN]) & 0xffffffff == expected
+
+
+def write_event_checksum(buf, offset, length):
+    """Recompute and store the CRC32 trailer of an event"""
+    end = offset + length
+    crc = zlib.crc32(buf[offset:end - CHECKSUM_LEN]) & 0xffffffff
+    struct.pack_into('<I', buf, end - CHECKSUM_LEN, crc)
+
+
+def iter_events(buf, start=4):
+    """Yield (offset, type_code, length, timestamp) for complete events from start
+
+    Stops silently at the first event that is not fully written yet, which
+    makes it safe to call on the active binlog.
+    """
+    unpack = HEADER_STRUCT.unpack_from
+    size = len(buf)
+    pos = start
+    while pos + HEADER_LEN <= size:
+        timestamp, type_code, _, length, _, _ = unpack(buf, pos)
+        if length < HEADER_LEN or pos + length > size:
+            return
+        yield pos, type_code, length, timestamp
+        pos += length
+
+
+class EventIndex:
+    """Compact index of event boundaries in a single binlog file
+
+    Offsets, lengths, types and timestamps are kept in parallel arrays so
+    100MB+ files can be indexed in one pass over an mmap without building
+    per-event objects.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offsets = array('Q')
+        self.lengths = array('I')
+        self.timestamps = array('I')
+        self.types = bytearray()
+        self.checksum_alg = CHECKSUM_OFF
+        self.post_header_lengths = b''
+        self.file_size = 0
+        self.truncated_at = None
+        self.tables = {}        # table_id -> (db, table)
+        self.gtids = []         # event numbers of GTID events
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @property
+    def has_checksums(self):
+        return self.checksum_alg == CHECKSUM_CRC32
+
+    def post_header_len(self, type_code, default=0):
+        """Post-header length for an event type as declared by the FDE"""
+        if 0 < type_code <= len(self.post_header_lengths):
+            return self.post_header_lengths[type_code - 1]
+        return default
+
+    def event(self, n):
+        """Return a dict describing the n-th event (0-based)"""
+        return {
+            'index': n,
+            'offset': self.offsets[n],
+            'length': self.lengths[n],
+            'end': self.offsets[n] + self.lengths[n],
+            'type': self.types[n],
+            'type_name': event_name(self.types[n]),
+            'timestamp': self.timestamps[n],
+        }
+
+    def event_at(self, offset):
+        """Return the number of the first event starting at or after offset"""
+        return bisect_left(self.offsets, offset)
+
+    def find_by_type(self, type_code, nth=1, start=0):
+        """Return event number of the nth (1-based) event of a type, or None"""
+        needle = bytes([type_code])
+        pos = start - 1
+        for _ in range(nth):
+            pos = self.types.find(needle, pos + 1)
+            if pos < 0:
+                return None
+        return pos
+
+    def count_by_type(self):
+        """Return {type_name: count} for the indexed events"""
+        counts = {}
+        for code in set(self.types):
+            counts[event_name(code)] = self.types.count(code)
+        return counts
+
+    def find_table_event(self, buf, table, type_codes, nth=1, db=None, start=0):
+        """Return event number of the nth event of given types touching a table"""
+        table_ids = {tid for tid, (d, t) in self.tables.items()
+                     if t == table and (db is None or d == db)}
+        if not table_ids:
+            return None
+        seen = 0
+        for n in range(start, len(self.types)):
+            code = self.types[n]
+            if code not in type_codes:
+                continue
+            offset = self.offsets[n]
+            if code == TABLE_MAP_EVENT:
+                table_id = int.from_bytes(buf[offset + HEADER_LEN:offset + HEADER_LEN + 6], 'little')
+            else:
+                table_id = rows_event_table_id(buf, offset)
+            if table_id in table_ids:
+                seen += 1
+                if seen == nth:
+                    return n
+        return None
+
+
+def build_event_index(path, buf=None):
+    """Walk event headers of a binlog file and return an EventIndex
+
+    Stops at the first event whose header or length runs past the end of
+    the file; its offset is recorded in ``truncated_at``.
+    """
+    if buf is None:
+        with open_binlog(path) as mapped:
+            return build_event_index(path, mapped)
+
+    index = EventIndex(path)
+    size = len(buf)
+    index.file_size = size
+    if size < len(BINLOG_MAGIC) or buf[:4] != BINLOG_MAGIC:
+        raise ValueError(f"Not a binlog file (bad magic number): {path}")
+
+    unpack = HEADER_STRUCT.unpack_from
+    offsets, lengths, timestamps, types = index.offsets, index.lengths, index.timestamps, index.types
+    table_map_post_header = 8
+    pos = 4
+    while pos < size:
+        if pos + HEADER_LEN > size:
+            index.truncated_at = pos
+            break
+        timestamp, type_code, _, length, _, _ = unpack(buf, pos)
+        if length < HEADER_LEN or pos + length > size:
+            index.truncated_at = pos
+            break
+
+        offsets.append(pos)
+        lengths.append(length)
+        timestamps.append(timestamp)
+        types.append(type_code)
+
+        if type_code == FORMAT_DESCRIPTION_EVENT:
+            index.checksum_alg, index.post_header_lengths = parse_format_description(buf, pos, length)
+            table_map_post_header = index.post_header_len(TABLE_MAP_EVENT, 8)
+        elif type_code == TABLE_MAP_EVENT:
+            table_id, db, table, _ = parse_table_map(buf, pos, table_map_post_header)
+            index.tables[table_id] = (db, table)
+        elif type_code == GTID_EVENT:
+            index.gtids.append(len(offsets) - 1)
+
+        pos += length
+
+    return index
+
+
+def gtid_range(path):
+    """Return (first_gtid, last_gtid) of the GTID events in a binlog file"""
+    with open_binlog(path) as buf:
+        index = build_event_index(path, buf)
+        if not index.gtids:
+            return None, None
+        first = parse_gtid(buf, index.offsets[index.gtids[0]])
+        last = parse_gtid(buf, index.offsets[index.gtids[-1]])
+    return first, last
+
+
+# ============== Integrity verification ==============
+
+def verify_binlog(path):
+    """Walk every event of a binlog file and validate its structure
+
+    Checks the magic number, event lengths, next-position chaining and
+    CRC32 checksums (when the FDE enables them). Returns a dict with the
+    first bad offset and the reason, or ok=True.
+    """
+    result = {
+        'file': path,
+        'ok': False,
+        'size': 0,
+        'events': 0,
+        'checksums': False,
+        'first_bad_offset': None,
+        'error': None,
+    }
+
+    def fail(offset, error):
+        result['first_bad_offset'] = offset
+        result['error'] = error
+        return result
+
+    try:
+        size = os.path.getsize(path)
+    except OSError as e:
+        return fail(0, str(e))
+    result['size'] = size
+    if size < len(BINLOG_MAGIC):
+        return fail(0, 'file shorter than magic number')
+
+    with open_binlog(path) as buf:
+        if buf[:4] != BINLOG_MAGIC:
+            return fail(0, f'bad magic number {bytes(buf[:4]).hex()}')
+
+        view = memoryview(buf)
+        try:
+            unpack = HEADER_STRUCT.unpack_from
+            crc32 = zlib.crc32
+            checksums = False
+            events = 0
+            pos = 4
+            while pos < size:
+                if pos + HEADER_LEN > size:
+                    return fail(pos, 'truncated event header')
+                _, type_code, _, length, next_position, _ = unpack(buf, pos)
+                end = pos + length
+                if length < HEADER_LEN:
+                    return fail(pos, f'event length {length} below header size')
+                if end > size:
+                    return fail(pos, f'event length {length} runs past end of file')
+                # next_position is 0 for events that were not written to a binlog file
+                if next_position and next_position != end:
+                    return fail(pos, f'next position {next_position} != {end}')
+
+                if type_code == FORMAT_DESCRIPTION_EVENT:
+                    checksums = parse_format_description(buf, pos, length)[0] == CHECKSUM_CRC32
+                    result['checksums'] = checksums
+                if checksums:
+                    expected = struct.unpack_from('<I', buf, end - CHECKSUM_LEN)[0]
+                    if crc32(view[pos:end - CHECKSUM_LEN]) & 0xffffffff != expected:
+                        return fail(pos, f'CRC32 mismatch in {event_name(type_code)} event')
+
+                events += 1
+                result['events'] = events
+                pos = end
+        finally:
+            view.release()
+
+    result['ok'] = True
+    return result
+
+
+def verify_binlogs(paths, workers=None):
+    """Verify binlog files in parallel processes; results keep input order"""
+    paths = list(paths)
+    if len(paths) <= 1:
+        return [verify_binlog(p) for p in paths]
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(verify_binlog, paths))
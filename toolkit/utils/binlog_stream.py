@@ -0,0 +1,339 @@
+"""Minimal MySQL replication client: stream binlog events with COM_BINLOG_DUMP_GTID
+
+Speaks just enough of the client/server protocol to authenticate
+(mysql_native_password and caching_sha2_password, including RSA full
+authentication over TCP), run a few SET statements, register as a replica
+and read the event stream. Events are read into one reusable buffer and
+only their 19-byte header is decoded, so the client itself stays close to
+the cost of the socket reads.
+"""
+import base64
+import hashlib
+import os
+import socket
+import struct
+import uuid
+import zlib
+
+from utils.binlog import (
+    HEADER_LEN, HEADER_STRUCT, CHECKSUM_LEN, CHECKSUM_CRC32, FORMAT_DESCRIPTION_EVENT,
+    parse_format_description,
+)
+
+MAX_PACKET = 0xffffff
+
+CLIENT_LONG_PASSWORD = 0x1
+CLIENT_PROTOCOL_41 = 0x200
+CLIENT_TRANSACTIONS = 0x2000
+CLIENT_SECURE_CONNECTION = 0x8000
+CLIENT_PLUGIN_AUTH = 0x80000
+CLIENT_CAPABILITIES = (CLIENT_LONG_PASSWORD | CLIENT_PROTOCOL_41 | CLIENT_TRANSACTIONS
+                       | CLIENT_SECURE_CONNECTION | CLIENT_PLUGIN_AUTH)
+
+COM_QUERY = 0x03
+COM_REGISTER_SLAVE = 0x15
+COM_BINLOG_DUMP_GTID = 0x1e
+
+BINLOG_DUMP_NON_BLOCK = 0x01
+BINLOG_THROUGH_GTID = 0x04
+
+HEARTBEAT_EVENT = 27
+
+
+class ProtocolError(Exception):
+    pass
+
+
+# ============== Authentication ==============
+
+def xor_bytes(data, key):
+    """XOR data with key, repeating key as needed"""
+    return bytes(a ^ key[i % len(key)] for i, a in enumerate(data))
+
+
+def scramble_native(password, nonce):
+    """mysql_native_password: SHA1(pw) XOR SHA1(nonce + SHA1(SHA1(pw)))"""
+    if not password:
+        return b''
+    stage1 = hashlib.sha1(password).digest()
+    stage2 = hashlib.sha1(stage1).digest()
+    return xor_bytes(stage1, hashlib.sha1(nonce + stage2).digest())
+
+
+def scramble_sha2(password, nonce):
+    """caching_sha2_password fast path: SHA256(pw) XOR SHA256(SHA256(SHA256(pw)) + nonce)"""
+    if not password:
+        return b''
+    stage1 = hashlib.sha256(password).digest()
+    stage2 = hashlib.sha256(stage1).digest()
+    return xor_bytes(stage1, hashlib.sha256(stage2 + nonce).digest())
+
+
+def der_read(buf, pos):
+    """Read one DER TLV; return (tag, value_start, value_end)"""
+    tag = buf[pos]
+    length = buf[pos + 1]
+    pos += 2
+    if length & 0x80:
+        count = length & 0x7f
+        length = int.from_bytes(buf[pos:pos + count], 'big')
+        pos += count
+    return tag, pos, pos + length
+
+
+def parse_rsa_public_key(pem):
+    """(n, e) from a PEM SubjectPublicKeyInfo or PKCS#1 RSA public key"""
+    lines = [l for l in pem.decode().strip().splitlines() if not l.startswith('-----')]
+    der = base64.b64decode(''.join(lines))
+    _, start, end = der_read(der, 0)
+    tag, inner, inner_end = der_read(der, start)
+    if tag == 0x30:
+        # SubjectPublicKeyInfo: skip the algorithm, unwrap the BIT STRING
+        _, bits, _ = der_read(der, inner_end)
+        _, start, end = der_read(der, bits + 1)
+        tag, inner, inner_end = der_read(der, start)
+    n = int.from_bytes(der[inner:inner_end], 'big')
+    _, e_start, e_end = der_read(der, inner_end)
+    return n, int.from_bytes(der[e_start:e_end], 'big')
+
+
+def mgf1(seed, length):
+    """MGF1 mask generation with SHA-1"""
+    out = b''
+    counter = 0
+    while len(out) < length:
+        out += hashlib.sha1(seed + counter.to_bytes(4, 'big')).digest()
+        counter += 1
+    return out[:length]
+
+
+def rsa_oaep_encrypt(pem, message):
+    """RSA/ECB/OAEPWithSHA-1AndMGF1Padding, as caching_sha2_password expects"""
+    n, e = parse_rsa_public_key(pem)
+    k = (n.bit_length() + 7) // 8
+    hlen = 20
+    if len(message) > k - 2 * hlen - 2:
+        raise ProtocolError("Password too long for the server's RSA key")
+    db = hashlib.sha1(b'').digest() + b'\x00' * (k - len(message) - 2 * hlen - 2) + b'\x01' + message
+    seed = os.urandom(hlen)
+    masked_db = xor_bytes(db, mgf1(seed, k - hlen - 1))
+    masked_seed = xor_bytes(seed, mgf1(masked_db, hlen))
+    encoded = int.from_bytes(b'\x00' + masked_seed + masked_db, 'big')
+    return pow(encoded, e, n).to_bytes(k, 'big')
+
+
+# ============== Connection ==============
+
+class ReplicationConnection:
+    """One protocol connection to a MySQL server over a Unix socket or TCP"""
+
+    def __init__(self, user, password, unix_socket=None, host='127.0.0.1', port=3306,
+                 timeout=10, read_buffer=1 << 20):
+        if unix_socket:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            self.sock.connect(unix_socket)
+        else:
+            self.sock = socket.create_connection((host, port), timeout)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.secure = bool(unix_socket)
+        self.reader = self.sock.makefile('rb', buffering=read_buffer)
+        self.header = bytearray(4)
+        self.buffer = bytearray(1 << 16)
+        self.seq = 0
+        self.authenticate(user, password.encode() if isinstance(password, str) else password)
+        self.sock.settimeout(None)
+
+    # ---------- Packets ----------
+
+    def read_exact(self, view):
+        """Fill a memoryview from the socket"""
+        got = 0
+        while got < len(view):
+            n = self.reader.readinto(view[got:])
+            if not n:
+                raise ProtocolError("Connection closed by server")
+            got += n
+
+    def read_packet(self):
+        """Read one logical packet into the reusable buffer; return a memoryview of it"""
+        size = 0
+        while True:
+            self.read_exact(memoryview(self.header))
+            length = self.header[0] | self.header[1] << 8 | self.header[2] << 16
+            self.seq = (self.header[3] + 1) & 0xff
+            if size + length > len(self.buffer):
+                # A new buffer, not an in-place resize: the caller may still
+                # hold views of the previous packet
+                buffer = bytearray(max(size + length, 2 * len(self.buffer)))
+                buffer[:size] = self.buffer[:size]
+                self.buffer = buffer
+            self.read_exact(memoryview(self.buffer)[size:size + length])
+            size += length
+            if length < MAX_PACKET:
+                return memoryview(self.buffer)[:size]
+
+    def write_packet(self, payload):
+        for start in range(0, len(payload) + 1, MAX_PACKET):
+            chunk = payload[start:start + MAX_PACKET]
+            self.sock.sendall(len(chunk).to_bytes(3, 'little') + bytes([self.seq]) + chunk)
+            self.seq = (self.seq + 1) & 0xff
+            if len(chunk) < MAX_PACKET:
+                break
+
+    def command(self, code, payload=b''):
+        self.seq = 0
+        self.write_packet(bytes([code]) + payload)
+
+    @staticmethod
+    def check_error(packet):
+        if packet[0] == 0xff:
+            code = struct.unpack_from('<H', packet, 1)[0]
+            message = bytes(packet[9:] if packet[3:4] == b'#' else packet[3:]).decode('utf-8', 'replace')
+            raise ProtocolError(f"MySQL error {code}: {message}")
+
+    # ---------- Handshake ----------
+
+    def authenticate(self, user, password):
+        packet = bytes(self.read_packet())
+        self.check_error(packet)
+        if packet[0] != 10:
+            raise ProtocolError(f"Unsupported protocol version {packet[0]}")
+        end = packet.index(b'\x00', 1)
+        self.server_version = packet[1:end].decode()
+        pos = end + 1 + 4
+        nonce = packet[pos:pos + 8]
+        pos += 8 + 1
+        capabilities = struct.unpack_from('<H', packet, pos)[0]
+        capabilities |= struct.unpack_from('<H', packet, pos + 5)[0] << 16
+        nonce_len = packet[pos + 7]
+        pos += 8 + 10
+        nonce += packet[pos:pos + max(13, nonce_len - 8)].rstrip(b'\x00')
+        pos += max(13, nonce_len - 8)
+        plugin = 'mysql_native_password'
+        if capabilities & CLIENT_PLUGIN_AUTH:
+            plugin = packet[pos:].split(b'\x00', 1)[0].decode()
+
+        response = self.auth_response(plugin, password, nonce)
+        payload = (struct.pack('<IIB', CLIENT_CAPABILITIES, MAX_PACKET, 45) + b'\x00' * 23
+                   + user.encode() + b'\x00' + bytes([len(response)]) + response
+                   + plugin.encode() + b'\x00')
+        self.write_packet(payload)
+        self.finish_auth(plugin, password, nonce)
+
+    def auth_response(self, plugin, password, nonce):
+        if plugin == 'caching_sha2_password':
+            return scramble_sha2(password, nonce)
+        if plugin == 'mysql_native_password':
+            return scramble_native(password, nonce)
+        raise ProtocolError(f"Unsupported authentication plugin {plugin}")
+
+    def finish_auth(self, plugin, password, nonce):
+        while True:
+            packet = bytes(self.read_packet())
+            self.check_error(packet)
+            if packet[0] == 0x00:
+                return
+            if packet[0] == 0xfe:
+                # Auth switch: new plugin and nonce
+                name, _, data = packet[1:].partition(b'\x00')
+                plugin, nonce = name.decode(), data.rstrip(b'\x00')
+                self.write_packet(self.auth_response(plugin, password, nonce))
+            elif packet[0] == 0x01 and plugin == 'caching_sha2_password':
+                if packet[1:2] == b'\x03':
+                    continue  # fast auth succeeded, OK follows
+                if packet[1:2] == b'\x04':
+                    if self.secure:
+                        self.write_packet(password + b'\x00')
+                    else:
+                        self.write_packet(b'\x02')
+                        key = bytes(self.read_packet())
+                        self.check_error(key)
+                        self.write_packet(rsa_oaep_encrypt(key[1:], xor_bytes(password + b'\x00', nonce)))
+                else:
+                    raise ProtocolError("Unexpected caching_sha2_password response")
+            else:
+                raise ProtocolError(f"Unexpected authentication packet 0x{packet[0]:02x}")
+
+    # ---------- Commands ----------
+
+    def query(self, sql):
+        """Run a statement and discard any result set"""
+        self.command(COM_QUERY, sql.encode())
+        packet = self.read_packet()
+        self.check_error(packet)
+        if packet[0] in (0x00, 0xfe):
+            return
+        # Result set: column definitions then rows, each list ending in EOF
+        for _ in range(2):
+            while True:
+                packet = self.read_packet()
+                self.check_error(packet)
+                if packet[0] == 0xfe and len(packet) < 9:
+                    break
+
+    def register_replica(self, server_id, hostname='toolkit-binlog-dump', port=0):
+        payload = (struct.pack('<I', server_id) + bytes([len(hostname)]) + hostname.encode()
+                   + b'\x00\x00' + struct.pack('<HII', port, 0, 0))
+        self.command(COM_REGISTER_SLAVE, payload)
+        self.check_error(self.read_packet())
+
+    def binlog_dump_gtid(self, server_id, gtid_intervals, block=False):
+        """Start streaming from everything not in gtid_intervals ({uuid: [(start, end)]})"""
+        sids = b''.join(
+            uuid.UUID(sid).bytes + struct.pack('<Q', len(ranges))
+            + b''.join(struct.pack('<QQ', start, end + 1) for start, end in ranges)
+            for sid, ranges in gtid_intervals.items()
+        )
+        data = struct.pack('<Q', len(gtid_intervals)) + sids
+        flags = BINLOG_THROUGH_GTID | (0 if block else BINLOG_DUMP_NON_BLOCK)
+        payload = (struct.pack('<HII', flags, server_id, 0) + struct.pack('<Q', 4)
+                   + struct.pack('<I', len(data)) + data)
+        self.command(COM_BINLOG_DUMP_GTID, payload)
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+# ============== Event stream ==============
+
+def stream_events(conn, on_event, verify_checksums=False):
+    """Read events until the server ends the stream (non-blocking dump) or on_event returns False
+
+    on_event(view, type_code, timestamp, length, next_position) gets a
+    memoryview of the event (header included) that is only valid during the
+    call. Returns the checksum algorithm and the number of checksum failures.
+    """
+    unpack = HEADER_STRUCT.unpack_from
+    checksum_alg = CHECKSUM_CRC32
+    bad_checksums = 0
+    while True:
+        packet = conn.read_packet()
+        marker = packet[0]
+        if marker == 0xfe and len(packet) < 9:
+            break
+        conn.check_error(packet)
+        event = packet[1:]
+        timestamp, type_code, _, length, next_position, _ = unpack(event, 0)
+        if type_code == FORMAT_DESCRIPTION_EVENT:
+            checksum_alg, _ = parse_format_description(event, 0, length)
+        elif verify_checksums and checksum_alg == CHECKSUM_CRC32 and type_code != HEARTBEAT_EVENT:
+            end = length - CHECKSUM_LEN
+            if zlib.crc32(event[:end]) & 0xffffffff != struct.unpack_from('<I', event, end)[0]:
+                bad_checksums += 1
+        if on_event(event, type_code, timestamp, length, next_position) is False:
+            break
+    return checksum_alg, bad_checksums
+
+
+def rotate_target(event, checksums=True):
+    """(file, position) from a ROTATE event"""
+    position = struct.unpack_from('<Q', event, HEADER_LEN)[0]
+    end = len(event) - CHECKSUM_LEN if checksums else len(event)
+    name = bytes(event[HEADER_LEN + 8:end])
+    return name.decode('utf-8', 'replace'), position
+
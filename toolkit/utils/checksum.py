@@ -0,0 +1,276 @@
+"""Chunked table checksums for comparing a source and a destination
+
+Each table is split into primary-key ranges and every range is reduced to
+COUNT(*) and BIT_XOR(CRC32(row)) on the server, so only two integers per
+chunk cross the wire. The same SQL runs on a MySQL destination and on a
+SQLite stand-in, which gets CRC32 / BIT_XOR / CONCAT / CONCAT_WS as Python
+functions with MySQL's semantics.
+
+Values are hashed in their text form, so a destination that stores a
+column with different formatting (DECIMAL scale, DATETIME precision, float
+rendering) reports those chunks as mismatching.
+"""
+import sqlite3
+import threading
+import zlib
+from urllib.parse import urlparse, parse_qs
+
+from utils.mysql_client import MYSQL_DATABASE, MySQLSession, query_rows
+
+INTEGER_TYPES = ('tinyint', 'smallint', 'mediumint', 'int', 'bigint')
+
+
+# ============== Row hash SQL ==============
+
+def quote(name):
+    return f"`{name}`"
+
+
+def row_hash_sql(columns):
+    """CRC32 of a row: values joined by '#' plus a NULL bitmap (CONCAT_WS skips NULLs)"""
+    values = ', '.join(quote(c) for c in columns)
+    nulls = ', '.join(f"({quote(c)} IS NULL)" for c in columns)
+    return f"CRC32(CONCAT_WS('#', {values}, CONCAT({nulls})))"
+
+
+def chunk_where(table, chunk):
+    """WHERE clause selecting a chunk's primary-key range ('' for a whole-table chunk)"""
+    if not table['chunked']:
+        return ''
+    key = quote(table['key'][0])
+    conditions = []
+    if chunk['lo'] is not None:
+        conditions.append(f"{key} >= {chunk['lo']}")
+    if chunk['hi'] is not None:
+        conditions.append(f"{key} < {chunk['hi']}")
+    return f" WHERE {' AND '.join(conditions)}" if conditions else ''
+
+
+def chunk_checksum_sql(table, chunk):
+    return (f"SELECT COUNT(*), COALESCE(BIT_XOR({row_hash_sql(table['columns'])}), 0) "
+            f"FROM {quote(table['name'])}{chunk_where(table, chunk)}")
+
+
+def chunk_rows_sql(table, chunk):
+    """Per-row (key, hash) for a chunk, used to locate differing rows"""
+    key = ', '.join(quote(c) for c in table['key']) if table['key'] else '1'
+    return (f"SELECT CONCAT_WS(',', {key}), {row_hash_sql(table['columns'])} "
+            f"FROM {quote(table['name'])}{chunk_where(table, chunk)}")
+
+
+# ============== Tables and chunks ==============
+
+def list_tables(database, names=None):
+    """Base tables of a database with columns and primary key, from the source"""
+    rows = query_rows(
+        "SELECT c.TABLE_NAME, c.COLUMN_NAME, c.COLUMN_KEY, c.DATA_TYPE "
+        "FROM information_schema.COLUMNS c JOIN information_schema.TABLES t "
+        "ON t.TABLE_SCHEMA = c.TABLE_SCHEMA AND t.TABLE_NAME = c.TABLE_NAME "
+        f"WHERE c.TABLE_SCHEMA = '{database}' AND t.TABLE_TYPE = 'BASE TABLE' "
+        "ORDER BY c.TABLE_NAME, c.ORDINAL_POSITION;", '')
+    tables = {}
+    for row in rows:
+        table = tables.setdefault(row['TABLE_NAME'], {
+            'name': row['TABLE_NAME'], 'columns': [], 'key': [], 'key_types': [],
+        })
+        table['columns'].append(row['COLUMN_NAME'])
+        if row['COLUMN_KEY'] == 'PRI':
+            table['key'].append(row['COLUMN_NAME'])
+            table['key_types'].append(row['DATA_TYPE'])
+    for table in tables.values():
+        # Range chunking needs a single integer key; anything else is one chunk
+        table['chunked'] = len(table['key']) == 1 and table['key_types'][0] in INTEGER_TYPES
+    if names:
+        missing = set(names) - set(tables)
+        if missing:
+            raise Exception(f"Table(s) not found in {database}: {', '.join(sorted(missing))}")
+        return [tables[n] for n in names]
+    return list(tables.values())
+
+
+def plan_chunks(table, source, chunk_size):
+    """Split a table into primary-key ranges of chunk_size key values
+
+    The first and last chunks are open-ended so destination rows outside
+    the source's key range are still compared.
+    """
+    if not table['chunked']:
+        return [{'table': table['name'], 'index': 0, 'lo': None, 'hi': None}]
+    key = quote(table['key'][0])
+    low, high = source.query(f"SELECT MIN({key}), MAX({key}) FROM {quote(table['name'])}")[0]
+    if low is None:
+        return [{'table': table['name'], 'index': 0, 'lo': None, 'hi': None}]
+    bounds = list(range(int(low) + chunk_size, int(high) + 1, chunk_size))
+    edges = [None] + bounds + [None]
+    return [{'table': table['name'], 'index': i, 'lo': lo, 'hi': hi}
+            for i, (lo, hi) in enumerate(zip(edges, edges[1:]))]
+
+
+# ============== Backends ==============
+
+class MySQLBackend:
+    """A MySQL server; one persistent session per worker thread"""
+
+    def __init__(self, database=MYSQL_DATABASE, label='source', **conn):
+        self.database = database
+        self.conn = conn
+        self.label = label
+        self.local = threading.local()
+        self.sessions = []
+        self.lock = threading.Lock()
+
+    def session(self):
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = MySQLSession(self.database, **self.conn)
+            with self.lock:
+                self.sessions.append(session)
+        return session
+
+    def query(self, sql):
+        return [[None if v == 'NULL' else v for v in row] for row in self.session().execute(sql)]
+
+    def close(self):
+        for session in self.sessions:
+            session.close()
+
+
+class BitXor:
+    def __init__(self):
+        self.value = 0
+
+    def step(self, value):
+        if value is not None:
+            self.value ^= int(value)
+
+    def finalize(self):
+        return self.value
+
+
+def _text(value):
+    if isinstance(value, bytes):
+        return value.decode('utf-8', 'surrogateescape')
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _concat(*values):
+    if any(v is None for v in values):
+        return None
+    return ''.join(_text(v) for v in values)
+
+
+def _concat_ws(separator, *values):
+    return separator.join(_text(v) for v in values if v is not None)
+
+
+def _crc32(value):
+    if value is None:
+        return None
+    return zlib.crc32(_text(value).encode('utf-8', 'surrogateescape'))
+
+
+class SQLiteBackend:
+    """A SQLite database standing in for a destination, with MySQL's checksum functions"""
+
+    def __init__(self, path, label='destination'):
+        self.path = path
+        self.label = label
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.create_function('CRC32', 1, _crc32, deterministic=True)
+            conn.create_function('CONCAT', -1, _concat, deterministic=True)
+            conn.create_function('CONCAT_WS', -1, _concat_ws, deterministic=True)
+            conn.create_aggregate('BIT_XOR', 1, BitXor)
+            with self.lock:
+                self.connections.append(conn)
+        return conn
+
+    def query(self, sql):
+        return [list(row) for row in self.connection().execute(sql)]
+
+    def close(self):
+        for conn in self.connections:
+            conn.close()
+
+
+def open_backend(dsn, database=MYSQL_DATABASE):
+    """Backend for a destination DSN
+
+    replica                        the local replica mysqld (port 3307)
+    sqlite:///path/to/file.db      a SQLite file
+    mysql://host:port/db           another MySQL server (toolkit credentials)
+    mysql:///db?socket=/path.sock  ... over a Unix socket
+    """
+    if dsn == 'replica':
+        from utils.replica import REPLICA
+        return MySQLBackend(database, label='replica', **REPLICA)
+    url = urlparse(dsn)
+    if url.scheme == 'sqlite':
+        return SQLiteBackend(url.path if not url.netloc else f"{url.netloc}{url.path}",
+                             label=f"sqlite:{url.path}")
+    if url.scheme == 'mysql':
+        conn = {}
+        if url.hostname:
+            conn['host'] = url.hostname
+        if url.port:
+            conn['port'] = url.port
+        socket_path = parse_qs(url.query).get('socket')
+        if socket_path:
+            conn.update(socket=socket_path[0], host='localhost')
+        return MySQLBackend(url.path.lstrip('/') or database, label=dsn, **conn)
+    raise ValueError(f"Unsupported destination {dsn!r} (replica, sqlite:///FILE or mysql://HOST:PORT/DB)")
+
+
+# ============== Comparison ==============
+
+def checksum_chunk(backend, table, chunk):
+    """(rows, crc) of a chunk on one backend"""
+    count, crc = backend.query(chunk_checksum_sql(table, chunk))[0]
+    return int(count), int(crc or 0)
+
+
+def compare_chunk(source, destination, table, chunk):
+    """Checksum a chunk on both sides; return the chunk with results filled in"""
+    chunk = dict(chunk)
+    chunk['source'] = checksum_chunk(source, table, chunk)
+    try:
+        chunk['destination'] = checksum_chunk(destination, table, chunk)
+    except Exception as e:
+        chunk['destination'] = None
+        chunk['error'] = str(e).strip()
+    chunk['match'] = chunk['source'] == chunk['destination']
+    return chunk
+
+
+def diff_rows(source, destination, table, chunk, limit=20):
+    """Keys that are missing, extra or changed on the destination within a chunk"""
+    rows_sql = chunk_rows_sql(table, chunk)
+    ours = dict(source.query(rows_sql))
+    theirs = dict(destination.query(rows_sql))
+    missing = sorted(set(ours) - set(theirs))
+    extra = sorted(set(theirs) - set(ours))
+    changed = sorted(k for k in set(ours) & set(theirs) if str(ours[k]) != str(theirs[k]))
+    return {'missing': missing[:limit], 'extra': extra[:limit], 'changed': changed[:limit],
+            'counts': {'missing': len(missing), 'extra': len(extra), 'changed': len(changed)}}
+
+
+def describe_chunk(table, chunk):
+    """Human-readable key range of a chunk"""
+    if not table['chunked']:
+        return 'whole table'
+    key = table['key'][0]
+    if chunk['lo'] is None and chunk['hi'] is None:
+        return 'all rows'
+    if chunk['lo'] is None:
+        return f"{key} < {chunk['hi']}"
+    if chunk['hi'] is None:
+        return f"{key} >= {chunk['lo']}"
+    return f"{chunk['lo']} <= {key} < {chunk['hi']}"
@@ -0,0 +1,308 @@
+"""Toolkit daemon: run commands in a warm process over a Unix socket
+
+The CLI forwards `toolkit <command> ...` to the daemon when it is running,
+so a call costs a socket round trip instead of an interpreter start, the
+command module imports, and a mysql client spawn per statement. Output is
+streamed back line by line as JSON messages:
+
+    -> {"argv": ["status"], "cwd": "/"}
+    <- {"stream": "out", "data": "..."}   (repeated)
+    <- {"exit": 0}
+
+Ctrl+C in the client sends {"cancel": true} (a second one disconnects);
+the daemon raises KeyboardInterrupt in the command's thread on either, so
+the command's interrupt handling and cleanup run as they would in-process.
+
+The client module only imports the standard library pieces it needs, so
+forwarding stays cheap.
+"""
+import ctypes
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+DAEMON_SOCKET = os.environ.get('TOOLKIT_DAEMON_SOCKET', '/var/run/toolkit-daemon.sock')
+DAEMON_PIDFILE = '/var/run/toolkit-daemon.pid'
+DAEMON_LOG = '/var/log/toolkit-daemon.log'
+
+
+# ============== Client ==============
+
+def daemon_request(request, socket_path=DAEMON_SOCKET, timeout=5):
+    """Send one non-command request (status) and return the response"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request).encode() + b'\n')
+        with sock.makefile('rb') as reader:
+            return json.loads(reader.readline())
+
+
+def forward(argv, socket_path=DAEMON_SOCKET):
+    """Run a command in the daemon and stream its output
+
+    Returns the command's exit code, or None when no daemon is running (or
+    it declined the request) and the caller should run the command itself.
+    """
+    if os.environ.get('TOOLKIT_NO_DAEMON') or not os.path.exists(socket_path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        return None
+
+    with sock, sock.makefile('rb') as reader:
+        sock.sendall(json.dumps({'argv': argv, 'cwd': os.getcwd()}).encode() + b'\n')
+        try:
+            return relay_output(reader)
+        except KeyboardInterrupt:
+            # Let the command run its interrupt handling; show its output
+            sock.sendall(json.dumps({'cancel': True}).encode() + b'\n')
+            print("\nCancelling (Ctrl+C again to detach)...", file=sys.stderr, flush=True)
+            return relay_output(reader)
+
+
+def relay_output(reader):
+    """Copy a forwarded command's output until its exit message"""
+    for line in reader:
+        message = json.loads(line)
+        if 'exit' in message:
+            return message['exit']
+        if message.get('fallback'):
+            return None
+        stream = sys.stderr if message['stream'] == 'err' else sys.stdout
+        stream.write(message['data'])
+        stream.flush()
+    print("Error: toolkit daemon closed the connection", file=sys.stderr)
+    return 1
+
+
+def daemon_pid():
+    """PID of the running daemon, or None"""
+    try:
+        with open(DAEMON_PIDFILE) as f:
+            pid = int(f.read().strip())
+        os.kill(pid, 0)
+        return pid
+    except (OSError, ValueError):
+        return None
+
+
+# ============== Server ==============
+
+class ClientSink:
+    """Line-buffered writer that streams one stream of a command to its client"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.lock = threading.Lock()
+        self.buffers = {'out': '', 'err': ''}
+        self.closed = False
+
+    def send(self, message):
+        with self.lock:
+            if self.closed:
+                return
+            try:
+                self.conn.sendall(json.dumps(message).encode() + b'\n')
+            except OSError:
+                # Client went away: drop output so the command's cleanup still runs
+                self.closed = True
+
+    def write(self, stream, data):
+        buffered = self.buffers[stream] + data
+        head, sep, tail = buffered.rpartition('\n')
+        self.buffers[stream] = tail
+        if sep:
+            self.send({'stream': stream, 'data': head + sep})
+
+    def flush(self):
+        for stream, data in self.buffers.items():
+            if data:
+                self.buffers[stream] = ''
+                self.send({'stream': stream, 'data': data})
+
+
+class Cancellation:
+    """Turns a client's cancel message or disconnect into KeyboardInterrupt in the command thread
+
+    The exception is raised asynchronously, so a command blocked in a C call
+    (a long sleep, a socket read) sees it when that call returns.
+    """
+
+    def __init__(self, ident):
+        self.ident = ident
+        self.lock = threading.Lock()
+        self.done = False
+        self.cancelled = False
+
+    def watch(self, reader):
+        """Read client messages until cancel or EOF, then cancel"""
+        try:
+            for line in reader:
+                if json.loads(line).get('cancel'):
+                    break
+        except (OSError, ValueError):
+            pass
+        self.cancel()
+
+    def cancel(self):
+        with self.lock:
+            if self.done or self.cancelled:
+                return
+            self.cancelled = True
+            ctypes.pythonapi.PyThreadState_SetAsyncExc(
+                ctypes.c_ulong(self.ident), ctypes.py_object(KeyboardInterrupt))
+
+    def finish(self):
+        """Mark the command finished; drop a cancel that has not been raised yet"""
+        with self.lock:
+            self.done = True
+            if self.cancelled:
+                ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(self.ident), None)
+
+
+class OutputRouter:
+    """sys.stdout/sys.stderr replacement that routes writes to the calling command's client
+
+    Threads started by a command do not inherit its sink; their output goes
+    to the only running command if there is exactly one, else to the log.
+    """
+
+    def __init__(self, daemon, stream, fallback):
+        self.daemon = daemon
+        self.stream = stream
+        self.fallback = fallback
+
+    def _sink(self):
+        sink = getattr(self.daemon.local, 'sink', None)
+        if sink is None:
+            active = list(self.daemon.active.values())
+            if len(active) == 1:
+                sink = active[0]
+        return sink
+
+    def write(self, data):
+        sink = self._sink()
+        if sink is None:
+            return self.fallback.write(data)
+        sink.write(self.stream, data)
+        return len(data)
+
+    def flush(self):
+        sink = self._sink()
+        if sink is None:
+            self.fallback.flush()
+        else:
+            sink.flush()
+
+    def isatty(self):
+        return False
+
+    def fileno(self):
+        return self.fallback.fileno()
+
+    @property
+    def encoding(self):
+        return self.fallback.encoding
+
+
+class ToolkitDaemon:
+    """Accepts forwarded commands and runs them in threads of this process"""
+
+    def __init__(self, dispatch, socket_path=DAEMON_SOCKET, pool=None):
+        self.dispatch = dispatch
+        self.socket_path = socket_path
+        self.pool = pool
+        self.local = threading.local()
+        self.active = {}
+        self.started = time.time()
+        self.stats = {'requests': 0, 'fallbacks': 0, 'errors': 0}
+        self.server = None
+
+    def status(self):
+        return {
+            'ok': True,
+            'pid': os.getpid(),
+            'uptime_s': round(time.time() - self.started, 1),
+            'active': len(self.active),
+            'stats': self.stats,
+            'modules': len(sys.modules),
+            'pool': {
+                'stats': self.pool.stats if self.pool else {},
+                'idle': sum(self.pool.sizes().values()) if self.pool else 0,
+            },
+        }
+
+    def run_command(self, conn, reader, argv):
+        """Run one forwarded command with its output routed to conn"""
+        sink = ClientSink(conn)
+        ident = threading.get_ident()
+        cancellation = Cancellation(ident)
+        self.local.sink = sink
+        self.active[ident] = sink
+        self.stats['requests'] += 1
+        threading.Thread(target=cancellation.watch, args=(reader,), daemon=True).start()
+        try:
+            code = self.dispatch(argv[0], argv[1:])
+        except SystemExit as e:
+            if isinstance(e.code, str):
+                print(e.code, file=sys.stderr)
+            code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except KeyboardInterrupt:
+            # Cancelled outside the command's own handling
+            code = 130
+        finally:
+            cancellation.finish()
+            self.local.sink = None
+            self.active.pop(ident, None)
+        sink.flush()
+        sink.send({'exit': code})
+
+    def handle(self, conn):
+        try:
+            with conn, conn.makefile('rb') as reader:
+                request = json.loads(reader.readline() or b'{}')
+                if 'argv' in request:
+                    # Threads share one working directory, so relative paths
+                    # only resolve correctly for clients in the daemon's cwd
+                    if request.get('cwd', os.getcwd()) != os.getcwd() or not request['argv']:
+                        self.stats['fallbacks'] += 1
+                        conn.sendall(json.dumps({'fallback': True}).encode() + b'\n')
+                        return
+                    self.run_command(conn, reader, request['argv'])
+                else:
+                    conn.sendall(json.dumps(self.status()).encode() + b'\n')
+        except (BrokenPipeError, ConnectionResetError, KeyboardInterrupt):
+            pass
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"[{time.strftime('%H:%M:%S')}] request failed: {e}", file=sys.__stderr__, flush=True)
+
+    def serve(self):
+        """Serve until interrupted; every connection gets its own thread"""
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.socket_path)
+        self.server.listen(512)
+        sys.stdout = OutputRouter(self, 'out', sys.__stdout__)
+        sys.stderr = OutputRouter(self, 'err', sys.__stderr__)
+        print(f"Toolkit daemon listening on {self.socket_path} (pid {os.getpid()})",
+              file=sys.__stdout__, flush=True)
+        try:
+            while True:
+                conn, _ = self.server.accept()
+                threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+        finally:
+            sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+            self.server.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            if self.pool:
+                self.pool.close()
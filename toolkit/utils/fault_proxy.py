@@ -0,0 +1,307 @@
+"""Userspace asyncio TCP proxy with live-configurable fault injection"""
+import asyncio
+import json
+import os
+import random
+import socket
+import struct
+import time
+
+PROXY_PORT = 13306
+UPSTREAM_HOST = '127.0.0.1'
+UPSTREAM_PORT = 3306
+CONTROL_SOCKET = '/var/run/toolkit-proxy.sock'
+PROXY_PIDFILE = '/var/run/toolkit-proxy.pid'
+PROXY_LOG = '/var/log/toolkit-proxy.log'
+CHUNK_SIZE = 65536
+
+DEFAULT_CONFIG = {
+    'latency_ms': 0,          # one-way delay added to every chunk
+    'jitter_ms': 0,           # uniform +/- jitter on top of latency (order preserved)
+    'bandwidth_kbps': 0,      # per-connection, per-direction cap (0 = unlimited)
+    'direction': 'both',      # both | upstream (client->server) | downstream
+    'reset_ratio': 0.0,       # fraction of new connections reset right after accept
+    'half_open_ratio': 0.0,   # fraction of new connections accepted but never served
+}
+
+
+def reset_socket(writer):
+    """Close a connection with RST instead of FIN"""
+    sock = writer.get_extra_info('socket')
+    if sock is not None:
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+        except OSError:
+            pass
+    writer.transport.abort()
+
+
+class Connection:
+    """One proxied client connection"""
+
+    def __init__(self, conn_id, client_writer):
+        self.id = conn_id
+        self.client_writer = client_writer
+        self.server_writer = None
+        self.peer = client_writer.get_extra_info('peername')
+        self.started = time.time()
+        self.bytes = {'upstream': 0, 'downstream': 0}
+        self.state = 'open'
+        self.tasks = []
+
+    def info(self):
+        return {
+            'id': self.id,
+            'peer': f"{self.peer[0]}:{self.peer[1]}" if self.peer else None,
+            'age_seconds': round(time.time() - self.started, 1),
+            'state': self.state,
+            'bytes_up': self.bytes['upstream'],
+            'bytes_down': self.bytes['downstream'],
+        }
+
+
+class FaultProxy:
+    """TCP proxy that forwards to an upstream server and injects faults
+
+    Each direction of a connection is a receive task feeding a delivery
+    queue and a deliver task that holds chunks until their due time, so
+    latency is pipelined rather than stop-and-wait. Configuration is read
+    per chunk, so changes apply to live connections immediately.
+    """
+
+    def __init__(self, listen_port=PROXY_PORT, upstream_host=UPSTREAM_HOST,
+                 upstream_port=UPSTREAM_PORT, config=None):
+        self.listen_port = listen_port
+        self.upstream = (upstream_host, upstream_port)
+        self.config = dict(DEFAULT_CONFIG, **(config or {}))
+        self.connections = {}
+        self.next_id = 1
+        self.flowing = asyncio.Event()
+        self.flowing.set()
+        self.stall_until = 0.0
+        self.stats = {'accepted': 0, 'resets': 0, 'half_open': 0, 'upstream_errors': 0}
+
+    # ---- fault helpers ----
+
+    def applies(self, direction):
+        return self.config['direction'] in ('both', direction)
+
+    def delay(self, direction):
+        if not self.applies(direction):
+            return 0.0
+        latency = self.config['latency_ms']
+        jitter = self.config['jitter_ms']
+        if jitter:
+            latency += random.uniform(-jitter, jitter)
+        return max(0.0, latency) / 1000
+
+    def stall(self, seconds):
+        """Pause all forwarding for a while (connections stay open)"""
+        loop = asyncio.get_running_loop()
+        self.stall_until = max(self.stall_until, loop.time() + seconds)
+        self.flowing.clear()
+        loop.call_at(self.stall_until, self._resume)
+
+    def _resume(self):
+        if asyncio.get_running_loop().time() >= self.stall_until:
+            self.flowing.set()
+
+    def reset(self, conn_id=None):
+        """RST one connection (or all); return how many were reset"""
+        targets = [self.connections[conn_id]] if conn_id in self.connections else (
+            list(self.connections.values()) if conn_id is None else [])
+        for conn in targets:
+            conn.state = 'reset'
+            reset_socket(conn.client_writer)
+            if conn.server_writer:
+                conn.server_writer.close()
+            for task in conn.tasks:
+                task.cancel()
+        self.stats['resets'] += len(targets)
+        return len(targets)
+
+    def half_open(self, conn_id=None):
+        """Drop the upstream side but keep the client socket open and silent"""
+        targets = [self.connections[conn_id]] if conn_id in self.connections else (
+            list(self.connections.values()) if conn_id is None else [])
+        for conn in targets:
+            conn.state = 'half-open'
+            if conn.server_writer:
+                conn.server_writer.close()
+        self.stats['half_open'] += len(targets)
+        return len(targets)
+
+    # ---- data path ----
+
+    async def receive(self, conn, reader, queue, direction):
+        try:
+            while True:
+                data = await reader.read(CHUNK_SIZE)
+                if not data:
+                    break
+                if conn.state == 'half-open':
+                    continue
+                await queue.put((time.monotonic() + self.delay(direction), data))
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            await queue.put((0, None))
+
+    async def deliver(self, conn, writer, queue, direction):
+        last_due = 0.0
+        next_free = 0.0
+        try:
+            while True:
+                due, data = await queue.get()
+                if data is None:
+                    break
+                # Never deliver out of order, even with jitter
+                due = max(due, last_due)
+                last_due = due
+                wait = due - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                if not self.flowing.is_set():
+                    await self.flowing.wait()
+                if conn.state == 'half-open':
+                    continue
+
+                rate = self.config['bandwidth_kbps'] * 1024 / 8 if self.applies(direction) else 0
+                if rate:
+                    now = time.monotonic()
+                    next_free = max(next_free, now) + len(data) / rate
+                    if next_free - now > 0.001:
+                        await asyncio.sleep(next_free - now)
+
+                writer.write(data)
+                conn.bytes[direction] += len(data)
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            if conn.state != 'half-open':
+                writer.close()
+
+    async def handle_client(self, client_reader, client_writer):
+        conn = Connection(self.next_id, client_writer)
+        self.next_id += 1
+        self.stats['accepted'] += 1
+
+        if random.random() < self.config['reset_ratio']:
+            self.stats['resets'] += 1
+            reset_socket(client_writer)
+            return
+        self.connections[conn.id] = conn
+        try:
+            if random.random() < self.config['half_open_ratio']:
+                # Accepted, but the handshake never arrives
+                self.stats['half_open'] += 1
+                conn.state = 'half-open'
+                while await client_reader.read(CHUNK_SIZE):
+                    pass
+                return
+
+            try:
+                server_reader, server_writer = await asyncio.open_connection(*self.upstream)
+            except OSError:
+                self.stats['upstream_errors'] += 1
+                client_writer.close()
+                return
+            conn.server_writer = server_writer
+
+            up, down = asyncio.Queue(maxsize=256), asyncio.Queue(maxsize=256)
+            conn.tasks = [
+                asyncio.ensure_future(self.receive(conn, client_reader, up, 'upstream')),
+                asyncio.ensure_future(self.deliver(conn, server_writer, up, 'upstream')),
+                asyncio.ensure_future(self.receive(conn, server_reader, down, 'downstream')),
+                asyncio.ensure_future(self.deliver(conn, client_writer, down, 'downstream')),
+            ]
+            await asyncio.gather(*conn.tasks, return_exceptions=True)
+        finally:
+            self.connections.pop(conn.id, None)
+            if conn.state != 'reset':
+                client_writer.close()
+
+    # ---- control ----
+
+    def status(self):
+        return {
+            'listen_port': self.listen_port,
+            'upstream': f"{self.upstream[0]}:{self.upstream[1]}",
+            'config': self.config,
+            'stalled': not self.flowing.is_set(),
+            'active': len(self.connections),
+            'stats': self.stats,
+        }
+
+    def control(self, request):
+        """Apply one control request and return the response"""
+        if request.get('clear'):
+            self.config = dict(DEFAULT_CONFIG)
+        if 'set' in request:
+            unknown = set(request['set']) - set(DEFAULT_CONFIG)
+            if unknown:
+                return {'ok': False, 'error': f"unknown setting(s): {', '.join(sorted(unknown))}"}
+            for key, value in request['set'].items():
+                self.config[key] = type(DEFAULT_CONFIG[key])(value)
+        if 'stall' in request:
+            self.stall(float(request['stall']))
+        if 'reset' in request:
+            return {'ok': True, 'reset': self.reset(request['reset'])}
+        if 'half_open' in request:
+            return {'ok': True, 'half_open': self.half_open(request['half_open'])}
+        if request.get('connections'):
+            return {'ok': True, 'connections': [c.info() for c in self.connections.values()]}
+        return dict(self.status(), ok=True)
+
+    async def handle_control(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    response = self.control(json.loads(line))
+                except (ValueError, TypeError, KeyError) as e:
+                    response = {'ok': False, 'error': str(e)}
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, control_socket=CONTROL_SOCKET):
+        server = await asyncio.start_server(
+            self.handle_client, '0.0.0.0', self.listen_port, backlog=4096, reuse_address=True)
+        if os.path.exists(control_socket):
+            os.unlink(control_socket)
+        control = await asyncio.start_unix_server(self.handle_control, control_socket)
+        print(f"Fault proxy listening on :{self.listen_port} -> "
+              f"{self.upstream[0]}:{self.upstream[1]} (control: {control_socket})", flush=True)
+        async with server, control:
+            await asyncio.gather(server.serve_forever(), control.serve_forever())
+
+
+def proxy_request(request, control_socket=CONTROL_SOCKET, timeout=5):
+    """Send one control request to a running proxy and return its response"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(control_socket)
+        sock.sendall(json.dumps(request).encode() + b'\n')
+        data = b''
+        while not data.endswith(b'\n'):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    return json.loads(data)
+
+
+def proxy_pid():
+    """PID of the running proxy, or None"""
+    try:
+        with open(PROXY_PIDFILE) as f:
+            pid = int(f.read().strip())
+        os.kill(pid, 0)
+        return pid
+    except (OSError, ValueError):
+        return None
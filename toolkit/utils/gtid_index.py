@@ -0,0 +1,250 @@
+"""Persistent GTID -> binlog position index (SQLite)"""
+import glob
+import os
+import sqlite3
+from datetime import datetime
+
+from utils.mysql_client import BINLOG_DIR
+from utils.binlog import (
+    GTID_EVENT, QUERY_EVENT, XID_EVENT, HEADER_LEN,
+    BINLOG_MAGIC, iter_events, open_binlog, parse_gtid,
+)
+
+DATA_DIR = '/opt/toolkit-data'
+INDEX_DB = f'{DATA_DIR}/binlog_index.db'
+BINLOG_BASENAME = 'mysql-bin'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    indexed_to INTEGER NOT NULL DEFAULT 4
+);
+CREATE TABLE IF NOT EXISTS sids (
+    id INTEGER PRIMARY KEY,
+    uuid TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS gtids (
+    sid INTEGER NOT NULL,
+    gno INTEGER NOT NULL,
+    file_id INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    PRIMARY KEY (sid, gno)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS gtids_ts ON gtids (ts);
+CREATE INDEX IF NOT EXISTS gtids_pos ON gtids (file_id, start);
+"""
+
+
+def split_gtid(gtid):
+    """Split 'uuid:gno' into (uuid, gno)"""
+    uuid, _, gno = gtid.strip().rpartition(':')
+    if not uuid or not gno.isdigit():
+        raise ValueError(f"Invalid GTID (expected uuid:number): {gtid}")
+    return uuid.lower(), int(gno)
+
+
+def parse_time(value):
+    """Parse epoch seconds or an ISO timestamp (local time) into epoch seconds"""
+    if str(value).isdigit():
+        return int(value)
+    return int(datetime.fromisoformat(str(value)).timestamp())
+
+
+def query_is_begin(buf, offset):
+    """True if the QUERY event at offset is a transaction's BEGIN"""
+    body = offset + HEADER_LEN
+    db_len = buf[body + 8]
+    status_len = int.from_bytes(buf[body + 11:body + 13], 'little')
+    query = body + 13 + status_len + db_len + 1
+    return buf[query:query + 5] == b'BEGIN'
+
+
+def scan_transactions(buf, start):
+    """Yield GTID transactions completed after start, plus the resume offset
+
+    Yields (gtid, start, end, timestamp) tuples and finally
+    (None, resume_offset, None, None). A transaction is complete once its
+    XID or non-BEGIN QUERY (DDL / COMMIT) has been written.
+    """
+    resume = start
+    pending = None
+    for pos, type_code, length, timestamp in iter_events(buf, start):
+        end = pos + length
+        if type_code == GTID_EVENT:
+            pending = (parse_gtid(buf, pos), pos, timestamp)
+            continue
+        if pending is None:
+            # Between transactions every event boundary is a safe resume point
+            resume = end
+            continue
+        if type_code == XID_EVENT or (type_code == QUERY_EVENT and not query_is_begin(buf, pos)):
+            gtid, gtid_pos, gtid_ts = pending
+            yield gtid, gtid_pos, end, gtid_ts
+            pending = None
+            resume = end
+    yield None, resume, None, None
+
+
+class GtidIndex:
+    """SQLite-backed index of GTID -> (file, start, end, timestamp)
+
+    The index is updated incrementally: each file remembers the offset up to
+    which it has been scanned, so an update only reads newly written events.
+    Lookups go through B-tree indexes and are O(log n).
+    """
+
+    def __init__(self, path=INDEX_DB, binlog_dir=BINLOG_DIR):
+        self.path = path
+        self.binlog_dir = binlog_dir
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._sids = dict(self.conn.execute("SELECT uuid, id FROM sids"))
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def binlog_files(self):
+        """Binlog files present on disk, oldest first"""
+        pattern = f"{self.binlog_dir}/{BINLOG_BASENAME}.[0-9]*"
+        return sorted(os.path.basename(p) for p in glob.glob(pattern))
+
+    def sid_id(self, uuid):
+        """Integer id for a server UUID, creating it if needed"""
+        if uuid not in self._sids:
+            cur = self.conn.execute("INSERT INTO sids (uuid) VALUES (?)", (uuid,))
+            self._sids[uuid] = cur.lastrowid
+        return self._sids[uuid]
+
+    def file_state(self, name):
+        """Return (file_id, indexed_to) for a binlog file, creating it if needed"""
+        row = self.conn.execute(
+            "SELECT id, indexed_to FROM files WHERE name = ?", (name,)).fetchone()
+        if row:
+            return row
+        cur = self.conn.execute("INSERT INTO files (name) VALUES (?)", (name,))
+        return cur.lastrowid, 4
+
+    def forget_file(self, file_id):
+        """Drop all entries of a file"""
+        self.conn.execute("DELETE FROM gtids WHERE file_id = ?", (file_id,))
+        self.conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def update_file(self, name):
+        """Index new transactions in one binlog file; return count added"""
+        path = f"{self.binlog_dir}/{name}"
+        file_id, indexed_to = self.file_state(name)
+        size = os.path.getsize(path)
+        if size < indexed_to:
+            # File shrank (truncated / corrupted): index it again from the start.
+            # Entries past the new end are kept, so the GTIDs that were cut off
+            # still resolve to this file for restore
+            indexed_to = 4
+        if size <= indexed_to:
+            return 0
+
+        rows = []
+        with open_binlog(path) as buf:
+            if buf[:4] != BINLOG_MAGIC:
+                return 0
+            for gtid, start, end, ts in scan_transactions(buf, indexed_to):
+                if gtid is None:
+                    indexed_to = start
+                    break
+                uuid, gno = split_gtid(gtid)
+                rows.append((self.sid_id(uuid), gno, file_id, start, end, ts))
+
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO gtids (sid, gno, file_id, start, end, ts) "
+            "VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self.conn.execute("UPDATE files SET indexed_to = ? WHERE id = ?", (indexed_to, file_id))
+        return len(rows)
+
+    def update(self):
+        """Incrementally index all binlog files; return {file: new_gtids}"""
+        present = self.binlog_files()
+        added = {}
+        with self.conn:
+            for file_id, name in self.conn.execute("SELECT id, name FROM files").fetchall():
+                if name not in present:
+                    self.forget_file(file_id)
+            for name in present:
+                count = self.update_file(name)
+                if count:
+                    added[name] = count
+        return added
+
+    def _row(self, row):
+        if not row:
+            return None
+        uuid, gno, name, start, end, ts = row
+        return {
+            'gtid': f"{uuid}:{gno}",
+            'file': name,
+            'start': start,
+            'end': end,
+            'timestamp': ts,
+            'time': datetime.fromtimestamp(ts).isoformat(sep=' '),
+        }
+
+    _SELECT = ("SELECT s.uuid, g.gno, f.name, g.start, g.end, g.ts FROM gtids g "
+               "JOIN sids s ON s.id = g.sid JOIN files f ON f.id = g.file_id ")
+
+    def lookup_gtid(self, gtid):
+        """Return the position of a GTID, or None"""
+        uuid, gno = split_gtid(gtid)
+        if uuid not in self._sids:
+            return None
+        return self._row(self.conn.execute(
+            self._SELECT + "WHERE g.sid = ? AND g.gno = ?",
+            (self._sids[uuid], gno)).fetchone())
+
+    def lookup_time(self, when):
+        """Return the first transaction at or after a timestamp, or None"""
+        return self._row(self.conn.execute(
+            self._SELECT + "WHERE g.ts >= ? ORDER BY g.ts LIMIT 1",
+            (parse_time(when),)).fetchone())
+
+    def lookup_position(self, name, position):
+        """Return the transaction containing a file offset, or None"""
+        return self._row(self.conn.execute(
+            self._SELECT + "WHERE f.name = ? AND g.start <= ? ORDER BY g.start DESC LIMIT 1",
+            (name, position)).fetchone())
+
+    def stats(self):
+        """Return per-file GTID counts and ranges"""
+        rows = self.conn.execute(
+            "SELECT f.name, f.indexed_to, COUNT(g.gno), MIN(g.ts), MAX(g.ts) FROM files f "
+            "LEFT JOIN gtids g ON g.file_id = f.id GROUP BY f.id ORDER BY f.name").fetchall()
+        return [{'file': r[0], 'indexed_to': r[1], 'gtids': r[2],
+                 'first_ts': r[3], 'last_ts': r[4]} for r in rows]
+
+
+def resolve_gtid(gtid, path=INDEX_DB, binlog_dir=BINLOG_DIR):
+    """Return the position of a GTID, updating the index only if it is not known yet
+
+    An entry whose bytes are no longer in the file (truncated, cut by
+    corruption) is returned with 'stale': True.
+    """
+    with GtidIndex(path, binlog_dir) as index:
+        entry = index.lookup_gtid(gtid)
+        if entry is None:
+            index.update()
+            entry = index.lookup_gtid(gtid)
+    if entry is not None:
+        try:
+            entry['stale'] = os.path.getsize(f"{binlog_dir}/{entry['file']}") < entry['end']
+        except OSError:
+            entry['stale'] = True
+    return entry
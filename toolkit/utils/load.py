@@ -0,0 +1,155 @@
+"""Load profiles and an open-loop rate scheduler for write workloads"""
+import json
+import math
+import time
+from datetime import datetime
+
+from utils.mysql_client import MySQLSession
+
+
+def step_profile(levels='1000/5000/2000', every=30):
+    """Hold each rate level for `every` seconds, then repeat the last"""
+    rates = [float(r) for r in str(levels).split('/')]
+    every = float(every)
+    return lambda t: rates[min(int(t // every), len(rates) - 1)]
+
+
+def ramp_profile(start=100, end=5000, over=60):
+    """Linear ramp from start to end over `over` seconds, then hold"""
+    start, end, over = float(start), float(end), float(over)
+    return lambda t: start + (end - start) * min(t / over, 1.0)
+
+
+def sine_profile(base=2000, amplitude=1500, period=60):
+    """Sine wave around base"""
+    base, amplitude, period = float(base), float(amplitude), float(period)
+    return lambda t: base + amplitude * math.sin(2 * math.pi * t / period)
+
+
+def burst_profile(base=500, peak=8000, every=30, length=5):
+    """Base rate with a burst of `length` seconds at the start of every period"""
+    base, peak, every, length = float(base), float(peak), float(every), float(length)
+    return lambda t: peak if t % every < length else base
+
+
+def load_rate_curve(path):
+    """Read a recorded rate curve: JSON [[seconds, rate], ...] or 'seconds,rate' lines"""
+    with open(path) as f:
+        text = f.read()
+    if text.lstrip().startswith('['):
+        points = [(float(t), float(r)) for t, r in json.loads(text)]
+    else:
+        points = []
+        for line in text.splitlines():
+            line = line.strip()
+            if line and not line.startswith('#'):
+                t, r = line.split(',')[:2]
+                points.append((float(t), float(r)))
+    return sorted(points)
+
+
+def replay_profile(file):
+    """Replay a recorded rate curve with linear interpolation"""
+    points = load_rate_curve(file)
+    if not points:
+        raise ValueError(f"Empty rate curve: {file}")
+
+    def rate(t):
+        if t <= points[0][0]:
+            return points[0][1]
+        for (t0, r0), (t1, r1) in zip(points, points[1:]):
+            if t < t1:
+                return r0 + (r1 - r0) * (t - t0) / (t1 - t0)
+        return points[-1][1]
+    return rate
+
+
+PROFILES = {
+    'step': step_profile,
+    'ramp': ramp_profile,
+    'sine': sine_profile,
+    'burst': burst_profile,
+    'replay': replay_profile,
+}
+
+
+def parse_profile(spec):
+    """Build a rate function from 'name:key=value,...' (e.g. 'sine:base=2000,period=60')"""
+    name, _, params = spec.partition(':')
+    if name not in PROFILES:
+        raise ValueError(f"Unknown load profile '{name}' (choose from {', '.join(PROFILES)})")
+    kwargs = dict(p.split('=', 1) for p in params.split(',') if p)
+    return PROFILES[name](**kwargs)
+
+
+def run_profile(rate, duration, make_sql, stats=None, stop=None,
+                max_batch=500, log_interval=1.0, quiet=False, session=None, on_sample=None):
+    """Issue statements following rate(t) ops/s for duration seconds
+
+    Open-loop: the intended op count is the integral of the rate curve on a
+    monotonic clock, and every op that is due is sent, coalesced into one
+    round trip when the scheduler falls behind, so short stalls do not
+    lower the offered load. Each op is one autocommit statement from
+    make_sql(). stats is updated live with intended/done counts and
+    per-interval intended vs actual rates; on_sample(sample) is called for
+    each interval as it completes.
+    """
+    stats = stats if stats is not None else {}
+    stats.update({'intended': 0.0, 'done': 0, 'intervals': []})
+    own_session = session is None
+    session = session or MySQLSession()
+
+    start = time.perf_counter()
+    prev_t, prev_rate = 0.0, max(0.0, rate(0.0))
+    log_t, log_intended, log_done = 0.0, 0.0, 0
+    try:
+        while not (stop and stop.is_set()):
+            t = time.perf_counter() - start
+            if t >= duration:
+                break
+            current = max(0.0, rate(t))
+            stats['intended'] += (prev_rate + current) / 2 * (t - prev_t)
+            prev_t, prev_rate = t, current
+
+            due = int(stats['intended']) - stats['done']
+            if due > 0:
+                count = min(due, max_batch)
+                session.execute_many([make_sql() for _ in range(count)])
+                stats['done'] += count
+            else:
+                wait = (stats['done'] + 1 - stats['intended']) / current if current else 0.01
+                time.sleep(min(max(wait, 0.0), 0.01))
+
+            if t - log_t >= log_interval:
+                elapsed = t - log_t
+                sample = {
+                    'elapsed': round(t, 3),
+                    'intended_rate': (stats['intended'] - log_intended) / elapsed,
+                    'actual_rate': (stats['done'] - log_done) / elapsed,
+                }
+                stats['intervals'].append(sample)
+                if on_sample:
+                    on_sample(sample)
+                log_t, log_intended, log_done = t, stats['intended'], stats['done']
+                if not quiet:
+                    timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+                    print(f"[{timestamp}] t={t:7.1f}s  intended={sample['intended_rate']:9.1f} ops/s  "
+                          f"actual={sample['actual_rate']:9.1f} ops/s  "
+                          f"behind={int(stats['intended']) - stats['done']}")
+    finally:
+        stats['elapsed'] = time.perf_counter() - start
+        if own_session:
+            session.close()
+    return stats
+
+
+def profile_summary(stats):
+    """Print intended vs actual totals for a finished run"""
+    intervals = stats['intervals']
+    errors = [abs(s['actual_rate'] - s['intended_rate']) / s['intended_rate']
+              for s in intervals if s['intended_rate'] > 0]
+    print(f"Ops intended: {int(stats['intended'])}, done: {stats['done']} "
+          f"in {stats['elapsed']:.1f}s ({stats['done'] / max(stats['elapsed'], 1e-6):.1f} ops/s)")
+    if errors:
+        print(f"Rate error per interval: mean {sum(errors) / len(errors):.1%}, "
+              f"max {max(errors):.1%}")
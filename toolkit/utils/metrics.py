@@ -0,0 +1,78 @@
+"""Latency and throughput summary helpers"""
+import bisect
+import math
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (0 if empty)"""
+    if not values:
+        return 0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def latency_summary(values):
+    """Summarize latencies (seconds) as milliseconds: count, avg, p50, p95, p99, max"""
+    if not values:
+        return {'count': 0, 'avg_ms': 0, 'p50_ms': 0, 'p95_ms': 0, 'p99_ms': 0, 'max_ms': 0}
+    return {
+        'count': len(values),
+        'avg_ms': round(sum(values) / len(values) * 1000, 3),
+        'p50_ms': round(percentile(values, 50) * 1000, 3),
+        'p95_ms': round(percentile(values, 95) * 1000, 3),
+        'p99_ms': round(percentile(values, 99) * 1000, 3),
+        'max_ms': round(max(values) * 1000, 3),
+    }
+
+
+def format_latency(summary):
+    """One-line latency summary"""
+    return (f"avg {summary['avg_ms']:.2f}ms  p50 {summary['p50_ms']:.2f}ms  "
+            f"p95 {summary['p95_ms']:.2f}ms  p99 {summary['p99_ms']:.2f}ms  "
+            f"max {summary['max_ms']:.2f}ms")
+
+
+class LatencyHistogram:
+    """Fixed log-spaced latency buckets; cheap to update, mergeable across runs"""
+
+    BOUNDS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500,
+                 1000, 2500, 5000, 10000, 30000, 60000]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(self.BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, pct):
+        """Upper bound (ms) of the bucket holding the pct-th percentile"""
+        if not self.count:
+            return 0
+        rank = math.ceil(pct / 100 * self.count)
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return self.BOUNDS_MS[i] if i < len(self.BOUNDS_MS) else round(self.max, 3)
+        return round(self.max, 3)
+
+    def to_dict(self):
+        buckets = {f"le_{b}ms": n for b, n in zip(self.BOUNDS_MS, self.counts)}
+        buckets['le_inf'] = self.counts[-1]
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total / self.count, 3) if self.count else 0,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'max_ms': round(self.max, 3),
+            'buckets': buckets,
+        }
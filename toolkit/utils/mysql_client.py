@@ -1,6 +1,11 @@
 """MySQL connection helper"""
 import subprocess
 import os
+import re
+import threading
+import time
+
+from utils.profiling import span, timed
 
 MYSQL_USER = os.environ.get('MYSQL_USER', 'root')
 MYSQL_PASSWORD = os.environ.get('MYSQL_ROOT_PASSWORD', 'rootpassword')
@@ -9,27 +14,277 @@ MYSQL_HOST = os.environ.get('MYSQL_HOST', 'localhost')
 BINLOG_DIR = '/var/lib/mysql'
 
 
-def execute_sql(sql, database=None, raw=False):
-    """Execute SQL and return output
-
-    Uses stdin for large queries to avoid 'Argument list too long' errors.
-    """
-    db = database or MYSQL_DATABASE
+def mysql_command(database=None, host=None, port=None, socket=None):
+    """Build the mysql client argv for a server (default: local primary)"""
     cmd = [
         'mysql',
         f'-u{MYSQL_USER}',
         f'-p{MYSQL_PASSWORD}',
-        '-h', MYSQL_HOST,
-        db,
+        '-h', host or MYSQL_HOST,
     ]
-    if raw:
-        cmd.append('-N')  # No headers
+    if port:
+        cmd += ['-P', str(port)]
+    if socket:
+        cmd.append(f'--socket={socket}')
+    if database != '':
+        cmd.append(database or MYSQL_DATABASE)
+    return cmd
+
+
+@timed('execute_sql')
+def execute_sql(sql, database=None, raw=False, host=None, port=None, socket=None):
+    """Execute SQL and return output
+
+    Uses stdin for large queries to avoid 'Argument list too long' errors.
+    Pass host/port/socket to target a server other than the local primary,
+    and database='' to connect without selecting a database.
+    """
+    started = time.perf_counter()
+    try:
+        if _session_pool is not None:
+            output = _session_pool.execute(sql, database, raw, host, port, socket)
+        else:
+            cmd = mysql_command(database, host, port, socket)
+            if raw:
+                cmd.append('-N')  # No headers
+
+            # Use stdin for SQL to handle large queries. Popen returns once
+            # the child is exec'd; the client's startup, connect and auth
+            # fall in client_total along with the statement itself
+            with span('execute_sql.fork'):
+                proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.PIPE, text=True)
+            with span('execute_sql.client_total'):
+                stdout, stderr = proc.communicate(sql)
+            if proc.returncode != 0:
+                raise Exception(f"MySQL error: {stderr}")
+            output = stdout.strip()
+    except Exception as e:
+        notify_observers(sql, started, e)
+        raise
+    notify_observers(sql, started)
+    return output
+
+
+# Callables (sql, seconds, error) told about every statement batch sent
+# through execute_sql or a MySQLSession, e.g. to build run records
+_observers = []
+
+
+def add_observer(func):
+    _observers.append(func)
+
+
+def remove_observer(func):
+    if func in _observers:
+        _observers.remove(func)
+
+
+def notify_observers(sql, started, error=None):
+    if _observers:
+        elapsed = time.perf_counter() - started
+        for func in list(_observers):
+            func(sql, elapsed, error)
+
+
+def query_rows(sql, database=None, **conn):
+    """Execute a query and return rows as dicts keyed by column name"""
+    output = execute_sql(sql, database, **conn)
+    if not output:
+        return []
+    lines = output.split('\n')
+    columns = lines[0].split('\t')
+    return [dict(zip(columns, line.split('\t'))) for line in lines[1:]]
+
+
+class MySQLSession:
+    """Persistent mysql client process for issuing many statements cheaply
+
+    SQL is written to the client's stdin followed by a marker SELECT, and
+    output is read back up to the marker. Session state (gtid_next, user
+    variables, locks) persists between calls, unlike execute_sql which
+    spawns a new client for every statement.
+    """
+
+    MARKER = '__toolkit_session_marker__'
+    ERROR_RE = re.compile(r'^ERROR \d+')
 
-    # Use stdin for SQL to handle large queries
-    result = subprocess.run(cmd, input=sql, capture_output=True, text=True)
-    if result.returncode != 0:
-        raise Exception(f"MySQL error: {result.stderr}")
-    return result.stdout.strip()
+    def __init__(self, database=None, host=None, port=None, socket=None):
+        cmd = mysql_command(database, host, port, socket)
+        cmd[1:1] = ['-N', '-B', '--unbuffered', '--force']
+        self.proc = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT, text=True, bufsize=1
+        )
+
+    @timed('MySQLSession.execute')
+    def execute(self, sql):
+        """Execute one or more statements; return output rows as lists of columns"""
+        sql = sql.strip()
+        if not sql.endswith(';'):
+            sql += ';'
+        started = time.perf_counter()
+        self.proc.stdin.write(f"{sql}\nSELECT '{self.MARKER}';\n")
+        self.proc.stdin.flush()
+
+        rows = []
+        error = None
+        while True:
+            line = self.proc.stdout.readline()
+            if not line:
+                error = Exception(f"MySQL session closed: {error or 'client exited'}")
+                notify_observers(sql, started, error)
+                raise error
+            line = line.rstrip('\n')
+            if line == self.MARKER:
+                break
+            if self.ERROR_RE.match(line):
+                error = error or line
+            elif not line.startswith('mysql: [Warning]'):
+                rows.append(line.split('\t'))
+        if error:
+            error = Exception(f"MySQL error: {error}")
+            notify_observers(sql, started, error)
+            raise error
+        notify_observers(sql, started)
+        return rows
+
+    def execute_many(self, statements):
+        """Execute a list of statements in a single round trip"""
+        return self.execute('\n'.join(s.rstrip().rstrip(';') + ';' for s in statements))
+
+    def value(self, sql):
+        """Execute a query and return the first column of the first row"""
+        rows = self.execute(sql)
+        return rows[0][0] if rows else None
+
+    def close(self):
+        if self.proc.poll() is None:
+            try:
+                self.proc.stdin.close()
+            except OSError:
+                pass
+            try:
+                self.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SessionPool:
+    """Warm mysql client processes reused by execute_sql
+
+    Used by the toolkit daemon so a command does not pay for spawning and
+    authenticating a client per statement. Each session runs without
+    --force, so an error ends the client exactly as it would for
+    execute_sql; the session is then dropped and the error raised. Sessions
+    that ran USE/SET/LOCK/transaction statements are dropped instead of
+    being returned, so no session state leaks into the next caller.
+    """
+
+    MARKER = MySQLSession.MARKER
+    STATEFUL_RE = re.compile(r'^\s*(USE|SET|LOCK|BEGIN|START\s+TRANSACTION)\b', re.I | re.M)
+
+    def __init__(self, max_idle=4):
+        self.max_idle = max_idle
+        self.idle = {}
+        self.lock = threading.Lock()
+        self.stats = {'spawned': 0, 'reused': 0, 'dropped': 0}
+
+    def _spawn(self, key):
+        database, raw, host, port, socket = key
+        cmd = mysql_command(database, host, port, socket)
+        cmd[1:1] = ['-B', '--unbuffered'] + (['-N'] if raw else [])
+        self.stats['spawned'] += 1
+        return subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT, text=True, bufsize=1
+        )
+
+    def _acquire(self, key):
+        with self.lock:
+            sessions = self.idle.get(key)
+            while sessions:
+                proc = sessions.pop()
+                if proc.poll() is None:
+                    self.stats['reused'] += 1
+                    return proc
+            return self._spawn(key)
+
+    def _release(self, key, proc, reusable):
+        with self.lock:
+            sessions = self.idle.setdefault(key, [])
+            if reusable and proc.poll() is None and len(sessions) < self.max_idle:
+                sessions.append(proc)
+                return
+            self.stats['dropped'] += 1
+        self._close(proc)
+
+    def _close(self, proc):
+        if proc.poll() is None:
+            try:
+                proc.stdin.close()
+                proc.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                proc.kill()
+
+    def execute(self, sql, database=None, raw=False, host=None, port=None, socket=None):
+        """Same contract as execute_sql, over a pooled session"""
+        key = (database, raw, host, port, socket)
+        proc = self._acquire(key)
+        sql = sql.strip()
+        if not sql.endswith(';'):
+            sql += ';'
+        lines = []
+        try:
+            proc.stdin.write(f"{sql}\nSELECT '{self.MARKER}';\n")
+            proc.stdin.flush()
+            while True:
+                line = proc.stdout.readline()
+                if not line:
+                    break
+                line = line.rstrip('\n')
+                if line == self.MARKER:
+                    if not raw:
+                        proc.stdout.readline()
+                    self._release(key, proc, not self.STATEFUL_RE.search(sql))
+                    return '\n'.join(lines).strip()
+                if not line.startswith('mysql: [Warning]'):
+                    lines.append(line)
+        except OSError:
+            pass
+        self._release(key, proc, False)
+        errors = [l for l in lines if MySQLSession.ERROR_RE.match(l)]
+        message = '\n'.join(errors or lines) or 'client exited'
+        raise Exception(f"MySQL error: {message}")
+
+    def sizes(self):
+        """Idle sessions per connection key"""
+        with self.lock:
+            return {key: len(sessions) for key, sessions in self.idle.items() if sessions}
+
+    def close(self):
+        with self.lock:
+            sessions = [p for procs in self.idle.values() for p in procs]
+            self.idle = {}
+        for proc in sessions:
+            self._close(proc)
+
+
+_session_pool = None
+
+
+def enable_session_pool(max_idle=4):
+    """Route execute_sql through a process-wide SessionPool"""
+    global _session_pool
+    if _session_pool is None:
+        _session_pool = SessionPool(max_idle)
+    return _session_pool
 
 
 def get_binlog_status():
@@ -60,6 +315,19 @@ def get_binlog_files():
     return files
 
 
+def binlog_bytes_between(start, end):
+    """Binlog bytes written between two get_binlog_status() results"""
+    if start['file'] == end['file']:
+        return end['position'] - start['position']
+    total = 0
+    for f in get_binlog_files():
+        if f['name'] == start['file']:
+            total += f['size'] - start['position']
+        elif start['file'] < f['name'] < end['file']:
+            total += f['size']
+    return total + end['position']
+
+
 def get_record_count(table='users'):
     """Get record count from table"""
     output = execute_sql(f"SELECT COUNT(*) FROM {table};", raw=True)
@@ -0,0 +1,166 @@
+"""mysqld lifecycle: pidfile/socket liveness, fast readiness and timing"""
+import os
+import re
+import signal
+import socket
+import subprocess
+import time
+from datetime import datetime
+
+MYSQLD_SOCKET = os.environ.get('MYSQLD_SOCKET', '/var/run/mysqld/mysqld.sock')
+MYSQLD_PIDFILE = os.environ.get('MYSQLD_PIDFILE', '/var/run/mysqld/mysqld.pid')
+MYSQLD_LOG = '/var/log/mysqld-toolkit.err'
+POLL_INTERVAL = 0.005
+
+LOG_TIME_RE = re.compile(r'^(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d+)Z?\s')
+
+
+def read_pid(pidfile=MYSQLD_PIDFILE):
+    """PID of a live mysqld from its pidfile, or None (stale pidfiles are ignored)"""
+    try:
+        with open(pidfile) as f:
+            pid = int(f.read().strip())
+        with open(f'/proc/{pid}/comm') as f:
+            if f.read().strip() != 'mysqld':
+                return None
+        return pid
+    except (OSError, ValueError):
+        return None
+
+
+def process_alive(pid):
+    """True while a process exists and is not a zombie"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except OSError:
+        return False
+
+
+def socket_accepting(path=MYSQLD_SOCKET, timeout=0.5):
+    """True if the server on a Unix socket sends its handshake greeting"""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(path)
+            header = sock.recv(5)
+    except OSError:
+        return False
+    # 4-byte packet header, then protocol version 10 (or 0xff error, e.g. too many connections)
+    return len(header) == 5 and header[4] in (10, 0xff)
+
+
+def wait_until(predicate, timeout, interval=POLL_INTERVAL):
+    """Poll predicate until true; return seconds waited, or None on timeout"""
+    start = time.perf_counter()
+    while True:
+        if predicate():
+            return time.perf_counter() - start
+        if time.perf_counter() - start >= timeout:
+            return None
+        time.sleep(interval)
+
+
+def log_size(path=MYSQLD_LOG):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def parse_startup_log(path=MYSQLD_LOG, offset=0):
+    """InnoDB startup/recovery timing from the error log written since offset"""
+    try:
+        with open(path, errors='replace') as f:
+            f.seek(offset)
+            lines = f.read().splitlines()
+    except OSError:
+        return {}
+
+    def stamp(needle):
+        for line in lines:
+            if needle in line.lower():
+                match = LOG_TIME_RE.match(line)
+                if match:
+                    return datetime.fromisoformat(match.group(1))
+        return None
+
+    text = '\n'.join(lines).lower()
+    result = {'crash_recovery': 'crash recovery' in text or 'not shutdown normally' in text}
+    init_start = stamp('innodb initialization has started')
+    init_end = stamp('innodb initialization has ended')
+    ready = stamp('ready for connections')
+    if init_start and init_end:
+        result['innodb_init_ms'] = round((init_end - init_start).total_seconds() * 1000, 1)
+    if init_start and ready:
+        result['startup_ms'] = round((ready - init_start).total_seconds() * 1000, 1)
+    return result
+
+
+def prepare_log(path, user='mysql'):
+    """Create an error log owned by the mysql user
+
+    mysqld opens --log-error after dropping to --user, so a log created by
+    root (e.g. when we redirect its stderr there) would be unwritable.
+    """
+    if not os.path.exists(path):
+        open(path, 'a').close()
+    try:
+        import pwd
+        entry = pwd.getpwnam(user)
+        os.chown(path, entry.pw_uid, entry.pw_gid)
+    except (ImportError, KeyError, PermissionError):
+        pass
+
+
+def mysqld_start(args=None, socket_path=MYSQLD_SOCKET, pidfile=MYSQLD_PIDFILE,
+                 log_path=MYSQLD_LOG, timeout=120):
+    """Start mysqld and wait for its socket; return timing dict
+
+    time_to_connect_ms is from spawn to the first accepted connection
+    (handshake received). InnoDB init / crash recovery times come from
+    the error log.
+    """
+    prepare_log(log_path)
+    offset = log_size(log_path)
+    with open(log_path, 'a') as log:
+        start = time.perf_counter()
+        proc = subprocess.Popen(['mysqld', '--user=mysql', f'--log-error={log_path}'] + (args or []),
+                                stdout=subprocess.DEVNULL, stderr=log)
+    waited = wait_until(lambda: socket_accepting(socket_path) or proc.poll() is not None, timeout)
+    result = {'pid': proc.pid, 'ready': waited is not None and proc.poll() is None}
+    if result['ready']:
+        result['time_to_connect_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    result.update(parse_startup_log(log_path, offset))
+    return result
+
+
+def mysqld_stop(pidfile=MYSQLD_PIDFILE, timeout=60, crash=False):
+    """Stop mysqld with SIGTERM (clean shutdown) or SIGKILL (crash); return timing dict"""
+    pid = read_pid(pidfile)
+    if not pid:
+        return {'stopped': False, 'reason': 'not running'}
+    start = time.perf_counter()
+    os.kill(pid, signal.SIGKILL if crash else signal.SIGTERM)
+    waited = wait_until(lambda: not process_alive(pid), timeout)
+    result = {'stopped': True, 'pid': pid, 'crash': crash, 'forced': False}
+    if waited is None:
+        os.kill(pid, signal.SIGKILL)
+        wait_until(lambda: not process_alive(pid), 10)
+        result['forced'] = True
+    result['shutdown_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+def format_timing(result):
+    """One-line summary of a start/stop timing dict"""
+    parts = []
+    for key, label in (('shutdown_ms', 'shutdown'), ('time_to_connect_ms', 'first connection'),
+                       ('innodb_init_ms', 'InnoDB init'), ('startup_ms', 'startup')):
+        if key in result:
+            parts.append(f"{label} {result[key]:.0f}ms")
+    if result.get('crash_recovery'):
+        parts.append("crash recovery ran")
+    if result.get('forced'):
+        parts.append("force killed")
+    return ', '.join(parts)
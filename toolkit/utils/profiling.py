@@ -0,0 +1,160 @@
+"""Profiling switches for toolkit runs: cProfile, tracemalloc and timing spans
+
+toolkit.py enables these with global options placed before the command:
+
+    toolkit --timing --profile=/tmp/run.pstats --trace-memory=15 generate-data
+
+Reports go to stderr so a command's own (e.g. --json) output stays clean.
+Functions decorated with @timed record a span per call while --timing is
+on and cost one global lookup otherwise.
+"""
+import contextlib
+import functools
+import os
+import sys
+import threading
+import time
+
+GLOBAL_OPTIONS = ('--profile', '--trace-memory', '--timing')
+
+_spans = None
+_spans_lock = threading.Lock()
+
+
+def timed(name):
+    """Record each call of the decorated function as a span called name"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _spans is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with _spans_lock:
+                    _spans.setdefault(name, []).append(elapsed)
+        return wrapper
+    return decorator
+
+
+@contextlib.contextmanager
+def span(name):
+    """Record the enclosed block as a span called name while --timing is on"""
+    if _spans is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _spans_lock:
+            _spans.setdefault(name, []).append(elapsed)
+
+
+class Profiler:
+    """Wraps one command run with the requested instrumentation"""
+
+    def __init__(self, profile=None, trace_memory=None, timing=False):
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.timing = timing
+        self.profiler = None
+
+    @property
+    def enabled(self):
+        return bool(self.profile or self.trace_memory or self.timing)
+
+    def start(self):
+        global _spans
+        if self.trace_memory:
+            import tracemalloc
+            tracemalloc.start(10)
+        if self.timing:
+            _spans = {}
+        self.times = os.times()
+        self.wall = time.perf_counter()
+        if self.profile:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def stop(self, out=None):
+        """Stop instrumenting and print the reports (to stderr by default)"""
+        global _spans
+        out = out or sys.stderr
+        if self.profiler:
+            self.profiler.disable()
+        wall = time.perf_counter() - self.wall
+        times = os.times()
+        spans, _spans = _spans, None
+
+        if self.profiler:
+            self.report_profile(out)
+        if self.trace_memory:
+            self.report_memory(out)
+        if self.timing:
+            self.report_timing(spans or {}, wall, times, out)
+
+    def report_profile(self, out):
+        import pstats
+        print("\n" + "=" * 70, file=out)
+        print("Profile (main thread, top 25 by cumulative time)", file=out)
+        print("=" * 70, file=out)
+        stats = pstats.Stats(self.profiler, stream=out)
+        stats.sort_stats('cumulative').print_stats(25)
+        if isinstance(self.profile, str):
+            stats.dump_stats(self.profile)
+            print(f"pstats written to {self.profile} (python -m pstats {self.profile})", file=out)
+
+    def report_memory(self, out):
+        import tracemalloc
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        top = self.trace_memory if isinstance(self.trace_memory, int) else 10
+        print("\n" + "=" * 70, file=out)
+        print(f"Memory: current {current / 1024:.1f}KB, peak {peak / 1024:.1f}KB; "
+              f"top {top} allocation sites", file=out)
+        print("=" * 70, file=out)
+        for stat in snapshot.statistics('lineno')[:top]:
+            frame = stat.traceback[0]
+            print(f"  {stat.size / 1024:10.1f}KB {stat.count:8d} blocks  "
+                  f"{frame.filename}:{frame.lineno}", file=out)
+
+    def report_timing(self, spans, wall, times, out):
+        python_cpu = (times.user - self.times.user) + (times.system - self.times.system)
+        child_cpu = ((times.children_user - self.times.children_user)
+                     + (times.children_system - self.times.children_system))
+        print("\n" + "=" * 70, file=out)
+        print(f"Timing: wall {wall * 1000:.1f}ms, Python CPU {python_cpu * 1000:.1f}ms, "
+              f"child process CPU {child_cpu * 1000:.1f}ms", file=out)
+        print("=" * 70, file=out)
+        print(f"  {'span':34s} {'calls':>7s} {'total':>10s} {'avg':>9s} {'max':>9s} {'wall':>6s}",
+              file=out)
+        # Spans from worker threads overlap, so their wall share can exceed 100%
+        for name, values in sorted(spans.items(), key=lambda kv: -sum(kv[1])):
+            total = sum(values)
+            print(f"  {name:34s} {len(values):7d} {total * 1000:8.1f}ms "
+                  f"{total / len(values) * 1000:7.2f}ms {max(values) * 1000:7.2f}ms "
+                  f"{total / wall:6.1%}", file=out)
+        if not spans:
+            print("  (no instrumented calls)", file=out)
+        print("  Child CPU is spent in mysql client processes (spawn, auth, parsing); "
+              "wall time not covered by CPU is mostly waiting on MySQL.", file=out)
+
+
+def parse_global_options(argv):
+    """Split leading --profile[=FILE] / --trace-memory[=N] / --timing off argv"""
+    options = {}
+    while argv and argv[0].partition('=')[0] in GLOBAL_OPTIONS:
+        flag, _, value = argv.pop(0).partition('=')
+        if flag == '--profile':
+            options['profile'] = value or True
+        elif flag == '--trace-memory':
+            options['trace_memory'] = int(value) if value else True
+        else:
+            options['timing'] = True
+    return Profiler(**options), argv
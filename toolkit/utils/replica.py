@@ -0,0 +1,191 @@
+"""Local GTID replica (second mysqld in the same container)"""
+import os
+import subprocess
+
+from utils.mysqld import read_pid, socket_accepting, wait_until, mysqld_stop, prepare_log
+from utils.mysql_client import (
+    MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE, execute_sql, query_rows,
+)
+
+REPLICA_DATADIR = '/var/lib/mysql-replica'
+REPLICA_PORT = 3307
+REPLICA_SOCKET = '/var/run/mysqld/mysqld-replica.sock'
+REPLICA_PIDFILE = '/var/run/mysqld/mysqld-replica.pid'
+REPLICA_LOG = '/var/log/mysql-replica.err'
+REPLICA_INIT_FILE = f'{REPLICA_DATADIR}-init.sql'
+REPLICA_SERVER_ID = 2
+
+SOURCE_HOST = '127.0.0.1'
+SOURCE_PORT = 3306
+
+# Connection kwargs for execute_sql / query_rows
+REPLICA = {'socket': REPLICA_SOCKET, 'host': 'localhost'}
+
+
+def replica_sql(sql, raw=True, database=''):
+    """Execute SQL on the local replica"""
+    return execute_sql(sql, database, raw=raw, **REPLICA)
+
+
+def replica_pid():
+    """PID of the replica mysqld, or None if it is not running"""
+    return read_pid(REPLICA_PIDFILE)
+
+
+def replica_is_running():
+    """Check if the replica mysqld is running"""
+    return replica_pid() is not None
+
+
+def replica_initialize():
+    """Create the replica data directory (empty root password, fixed via init file)"""
+    if os.path.isdir(f"{REPLICA_DATADIR}/mysql"):
+        return False
+
+    print(f"Initializing replica datadir {REPLICA_DATADIR}...")
+    result = subprocess.run(
+        ['mysqld', '--no-defaults', '--initialize-insecure', '--user=mysql',
+         f'--datadir={REPLICA_DATADIR}'],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise Exception(f"Replica initialization failed: {result.stderr}")
+
+    # Runs on every start; keeps the replica on the same credentials as the source
+    with open(REPLICA_INIT_FILE, 'w') as f:
+        f.write(f"ALTER USER 'root'@'localhost' IDENTIFIED BY '{MYSQL_PASSWORD}';\n")
+    return True
+
+
+def replica_start(parallel_workers=4):
+    """Start the replica mysqld and wait for it to accept connections"""
+    if replica_is_running():
+        print("Replica is already running")
+        return
+
+    replica_initialize()
+    print(f"Starting replica mysqld on port {REPLICA_PORT}...")
+    prepare_log(REPLICA_LOG)
+    proc = subprocess.Popen(
+        ['mysqld', '--no-defaults', '--user=mysql',
+         f'--datadir={REPLICA_DATADIR}',
+         f'--port={REPLICA_PORT}',
+         f'--socket={REPLICA_SOCKET}',
+         f'--pid-file={REPLICA_PIDFILE}',
+         f'--log-error={REPLICA_LOG}',
+         f'--init-file={REPLICA_INIT_FILE}',
+         f'--server-id={REPLICA_SERVER_ID}',
+         '--log-bin=replica-bin',
+         '--relay-log=replica-relay-bin',
+         '--gtid-mode=ON',
+         '--enforce-gtid-consistency=ON',
+         '--binlog-format=ROW',
+         f'--replica-parallel-workers={parallel_workers}',
+         '--replica-preserve-commit-order=ON',
+         '--skip-replica-start',
+         '--mysqlx=OFF'],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+
+    waited = wait_until(lambda: socket_accepting(REPLICA_SOCKET) or proc.poll() is not None, 60)
+    if waited is None or proc.poll() is not None:
+        raise Exception(f"Replica did not become ready, see {REPLICA_LOG}")
+    print(f"Replica started in {waited * 1000:.0f}ms")
+
+
+def replica_stop():
+    """Stop the replica mysqld"""
+    result = mysqld_stop(REPLICA_PIDFILE)
+    if not result['stopped']:
+        print("Replica is not running")
+    elif result['forced']:
+        print("Replica force stopped")
+    else:
+        print(f"Replica stopped in {result['shutdown_ms']:.0f}ms")
+
+
+def replica_seed(database=MYSQL_DATABASE):
+    """Copy the source database into the replica and set gtid_purged to match"""
+    print(f"Seeding replica with {database} from source...")
+    dump = subprocess.run(
+        ['mysqldump', f'-u{MYSQL_USER}', f'-p{MYSQL_PASSWORD}', '-h', 'localhost',
+         '--single-transaction', '--set-gtid-purged=ON', '--databases', database],
+        capture_output=True, text=True
+    )
+    if dump.returncode != 0:
+        raise Exception(f"mysqldump failed: {dump.stderr}")
+    replica_sql("STOP REPLICA; RESET REPLICA ALL; RESET MASTER;")
+    replica_sql(dump.stdout)
+
+
+def replica_configure(source_delay=0, parallel_workers=None):
+    """Point the replica at the source with GTID auto-positioning and start it"""
+    replica_sql("STOP REPLICA;")
+    replica_sql(
+        f"CHANGE REPLICATION SOURCE TO "
+        f"SOURCE_HOST='{SOURCE_HOST}', SOURCE_PORT={SOURCE_PORT}, "
+        f"SOURCE_USER='{MYSQL_USER}', SOURCE_PASSWORD='{MYSQL_PASSWORD}', "
+        f"SOURCE_AUTO_POSITION=1, GET_SOURCE_PUBLIC_KEY=1, "
+        f"SOURCE_DELAY={int(source_delay)};"
+    )
+    if parallel_workers is not None:
+        replica_sql(f"SET GLOBAL replica_parallel_workers={int(parallel_workers)};")
+    replica_sql("START REPLICA;")
+
+
+def replica_set_delay(source_delay):
+    """Change SOURCE_DELAY without touching the receiver thread"""
+    replica_sql("STOP REPLICA SQL_THREAD;")
+    replica_sql(f"CHANGE REPLICATION SOURCE TO SOURCE_DELAY={int(source_delay)};")
+    replica_sql("START REPLICA SQL_THREAD;")
+
+
+def replica_set_workers(parallel_workers):
+    """Change applier parallelism (takes effect on applier restart)"""
+    replica_sql("STOP REPLICA SQL_THREAD;")
+    replica_sql(f"SET GLOBAL replica_parallel_workers={int(parallel_workers)};")
+    replica_sql("START REPLICA SQL_THREAD;")
+
+
+def replica_status():
+    """Return SHOW REPLICA STATUS as a dict, or None if replication is not configured"""
+    rows = query_rows("SHOW REPLICA STATUS;", '', **REPLICA)
+    return rows[0] if rows else None
+
+
+def gtid_set_intervals(gtid_set):
+    """Parse a GTID set into {uuid: [(start, end), ...]}"""
+    intervals = {}
+    for part in gtid_set.replace('\\n', '').replace('\n', '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        sid, _, ranges = part.partition(':')
+        for interval in ranges.split(':'):
+            if not interval:
+                continue
+            start, _, end = interval.partition('-')
+            intervals.setdefault(sid.lower(), []).append((int(start), int(end or start)))
+    return intervals
+
+
+def gtid_set_count(gtid_set, uuid=None):
+    """Number of transactions in a GTID set (optionally for one server UUID)"""
+    total = 0
+    for sid, ranges in gtid_set_intervals(gtid_set).items():
+        if uuid and sid != uuid.lower():
+            continue
+        total += sum(end - start + 1 for start, end in ranges)
+    return total
+
+
+def source_uuid():
+    """server_uuid of the source"""
+    return execute_sql("SELECT @@server_uuid;", raw=True)
+
+
+def executed_count(uuid, **conn):
+    """Transactions from a source UUID executed on a server"""
+    gtid_set = execute_sql("SELECT @@GLOBAL.gtid_executed;", '', raw=True, **conn)
+    return gtid_set_count(gtid_set, uuid)
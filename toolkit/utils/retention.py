@@ -0,0 +1,212 @@
+"""Binlog retention: byte / age budgets that never purge what a consumer needs
+
+The oldest binlog any consumer still needs (the "floor") comes from two
+places:
+
+  * connected binlog dump threads: the binlog files mysqld holds open
+    (/proc/<pid>/fd) besides the active one are being read by them;
+  * registered consumers: names with a FILE:POS or GTID they have
+    processed up to, kept in CONSUMERS_FILE. This covers consumers that are
+    disconnected at the moment the budget is enforced.
+
+Files older than the floor may be purged with PURGE BINARY LOGS TO; the
+active file and everything from the floor on are always kept.
+"""
+import json
+import os
+import re
+import time
+from datetime import datetime
+
+from utils.gtid_index import DATA_DIR, BINLOG_BASENAME, resolve_gtid
+from utils.mysql_client import BINLOG_DIR, execute_sql, get_binlog_files, query_rows
+from utils.mysqld import read_pid
+
+CONSUMERS_FILE = f'{DATA_DIR}/consumers.json'
+
+SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+DURATION_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_size(value):
+    """'500M' / '2G' / '1048576' -> bytes"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]?)B?\s*', str(value), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid size: {value!r} (e.g. 500M, 2G)")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+
+
+def parse_duration(value):
+    """'30m' / '6h' / '2d' / '3600' -> seconds"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*', str(value))
+    if not match:
+        raise ValueError(f"Invalid duration: {value!r} (e.g. 30m, 6h, 2d)")
+    return float(match.group(1)) * DURATION_UNITS[match.group(2)]
+
+
+# ============== Registered consumers ==============
+
+def load_consumers(path=CONSUMERS_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_consumers(consumers, path=CONSUMERS_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(consumers, f, indent=2)
+    os.replace(tmp, path)
+
+
+def register_consumer(name, position=None, gtid=None, path=CONSUMERS_FILE):
+    """Record (or advance) the position a consumer has processed up to"""
+    entry = {'updated': datetime.now().isoformat(timespec='seconds')}
+    if position:
+        file, _, offset = position.partition(':')
+        entry.update(file=file, position=int(offset or 4))
+    elif gtid:
+        found = resolve_gtid(gtid)
+        if found is None:
+            raise ValueError(f"GTID {gtid} is not in the retained binlogs (binlog-index)")
+        entry['gtid'] = gtid
+    else:
+        raise ValueError("A consumer needs a FILE:POS position or a GTID")
+    consumers = load_consumers(path)
+    consumers[name] = entry
+    save_consumers(consumers, path)
+    return entry
+
+
+def unregister_consumer(name, path=CONSUMERS_FILE):
+    """Forget a consumer; return True if it was registered"""
+    consumers = load_consumers(path)
+    if consumers.pop(name, None) is None:
+        return False
+    save_consumers(consumers, path)
+    return True
+
+
+def consumer_file(entry):
+    """Binlog file a registered consumer still needs, or None if it cannot be resolved"""
+    if entry.get('file'):
+        return entry['file']
+    found = resolve_gtid(entry['gtid'])
+    return found['file'] if found else None
+
+
+# ============== Dump threads ==============
+
+def dump_threads():
+    """Connected binlog dump threads (replicas and CDC clients)"""
+    return query_rows(
+        "SELECT ID, USER, HOST, COMMAND, TIME, STATE FROM information_schema.PROCESSLIST "
+        "WHERE COMMAND LIKE 'Binlog Dump%';", '')
+
+
+def open_binlog_files(pid=None):
+    """Binlog files mysqld holds open, or None if its fds cannot be read"""
+    pid = pid or read_pid()
+    if pid is None:
+        return None
+    fd_dir = f'/proc/{pid}/fd'
+    try:
+        fds = os.listdir(fd_dir)
+    except OSError:
+        return None
+    files = set()
+    for fd in fds:
+        try:
+            target = os.readlink(f'{fd_dir}/{fd}')
+        except OSError:
+            continue
+        name = os.path.basename(target)
+        if re.fullmatch(rf'{re.escape(BINLOG_BASENAME)}\.\d+', name):
+            files.add(name)
+    return files
+
+
+# ============== Budget ==============
+
+def binlog_inventory():
+    """Binlog files oldest first with size and last-write time (mtime, None if not local)"""
+    files = get_binlog_files()
+    for f in files:
+        try:
+            f['mtime'] = os.path.getmtime(f"{BINLOG_DIR}/{f['name']}")
+        except OSError:
+            f['mtime'] = None
+    return files
+
+
+def consumer_floor(files, consumers=None, force=False):
+    """Oldest binlog still needed, with who holds it
+
+    Returns (floor_file, holders, blocked); floor_file is None when nothing
+    is held. blocked is a reason string when dump threads are connected but
+    the files they read cannot be determined, or a registered consumer's
+    GTID does not resolve to a file (unless force), in which case nothing
+    may be purged.
+    """
+    names = [f['name'] for f in files]
+    holders = []
+    blocked = None
+
+    threads = dump_threads()
+    if threads:
+        opened = open_binlog_files()
+        if opened is None:
+            blocked = (f"{len(threads)} binlog dump thread(s) connected but mysqld's open "
+                       f"files are not readable")
+        else:
+            for name in sorted(opened & set(names[:-1])):
+                holders.append({'consumer': f"dump thread(s) ({len(threads)} connected)",
+                                'file': name})
+
+    consumers = load_consumers() if consumers is None else consumers
+    for name, entry in sorted(consumers.items()):
+        needed = consumer_file(entry)
+        if needed is None:
+            holders.append({'consumer': name, 'file': None,
+                            'note': f"GTID {entry.get('gtid')} not found in retained binlogs"})
+            if not force and not blocked:
+                blocked = (f"registered consumer {name} needs GTID {entry.get('gtid')}, which "
+                           f"does not resolve to a binlog (--force to purge anyway)")
+        elif needed not in names:
+            holders.append({'consumer': name, 'file': needed, 'note': 'file already purged'})
+        else:
+            holders.append({'consumer': name, 'file': needed})
+
+    held = [h['file'] for h in holders if h['file'] in names]
+    floor = min(held, key=names.index) if held else None
+    return floor, holders, blocked
+
+
+def plan_purge(files, max_bytes=None, max_age=None, floor=None, now=None):
+    """Oldest files to purge to meet the budgets without reaching the floor or the active file
+
+    Returns (purge, stopped_by): the files to purge, and why purging stopped
+    while still over budget ('consumer' or 'active'), else None.
+    """
+    now = now or time.time()
+    total = sum(f['size'] for f in files)
+    purge = []
+    for i, f in enumerate(files):
+        over_bytes = max_bytes is not None and total > max_bytes
+        too_old = max_age is not None and f['mtime'] is not None and now - f['mtime'] > max_age
+        if not (over_bytes or too_old):
+            return purge, None
+        if i == len(files) - 1:
+            return purge, 'active'
+        if f['name'] == floor:
+            return purge, 'consumer'
+        purge.append(f)
+        total -= f['size']
+    return purge, None
+
+
+def purge_before(name):
+    """PURGE BINARY LOGS TO name (removes every file before it)"""
+    execute_sql(f"PURGE BINARY LOGS TO '{name}';", '')
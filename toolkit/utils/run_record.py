@@ -0,0 +1,209 @@
+"""Structured run records for toolkit commands
+
+Every command run through the CLI (or the daemon) produces one record:
+start/end time, exit code, statement count and bytes sent, a latency
+histogram of every statement batch, binlog position and GTID set before
+and after, row/byte counters reported by the command, and errors.
+
+TOOLKIT_RUN_RECORDS selects where records go:
+
+    *.json       overwritten with the latest record
+    a directory  one <command>-<time>-<pid>.json file per run
+    other paths  one NDJSON line appended per run (default)
+    off          no records
+"""
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+from utils.metrics import LatencyHistogram
+from utils.mysql_client import (
+    add_observer, remove_observer, get_binlog_status, binlog_bytes_between,
+)
+
+RUN_RECORDS = os.environ.get('TOOLKIT_RUN_RECORDS', '/opt/toolkit-data/runs.ndjson')
+MAX_ERRORS = 20
+
+_active = []
+_active_lock = threading.Lock()
+_current = threading.local()
+
+
+def binlog_snapshot():
+    """Current binlog file, position and executed GTID set, or None if unavailable"""
+    try:
+        return get_binlog_status()
+    except Exception:
+        return None
+
+
+def current_run():
+    """Record of the command running in this thread
+
+    Threads started by a command only know it if they were bound with
+    bind_run; otherwise the only running command is used if there is
+    exactly one, else None.
+    """
+    record = getattr(_current, 'record', None)
+    if record is None:
+        with _active_lock:
+            if len(_active) == 1:
+                record = _active[0]
+    return record
+
+
+def bind_run(func):
+    """Wrap func so that, in whichever thread it runs, it records into the caller's run"""
+    record = getattr(_current, 'record', None)
+
+    def bound(*args, **kwargs):
+        previous = getattr(_current, 'record', None)
+        _current.record = record
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _current.record = previous
+    return bound
+
+
+def record_counts(**counters):
+    """Add to named counters (rows, bytes, ...) of the calling command's run"""
+    record = current_run()
+    if record is not None:
+        record.count(**counters)
+
+
+def _observe(sql, seconds, error):
+    record = current_run()
+    if record is not None:
+        record.observe(sql, seconds, error)
+
+
+class RunRecord:
+    """Collects metrics for one command invocation
+
+    Statements are observed through utils.mysql_client, so every command is
+    covered without changes. Each statement is attributed to the record of
+    the thread that ran it (see current_run), so commands running at the
+    same time in the daemon keep separate records.
+    """
+
+    def __init__(self, command, args):
+        self.command = command
+        self.args = list(args)
+        self.lock = threading.Lock()
+        self.histogram = LatencyHistogram()
+        self.statements = 0
+        self.failed = 0
+        self.bytes_sent = 0
+        self.counters = {}
+        self.errors = []
+        self.started_at = datetime.now()
+        self.binlog_before = binlog_snapshot()
+        self.start = time.perf_counter()
+        self.previous = getattr(_current, 'record', None)
+        _current.record = self
+        with _active_lock:
+            if not _active:
+                add_observer(_observe)
+            _active.append(self)
+
+    def observe(self, sql, seconds, error):
+        with self.lock:
+            self.statements += 1
+            self.bytes_sent += len(sql)
+            self.histogram.add(seconds)
+            if error is not None:
+                self.failed += 1
+                self.add_error(str(error))
+
+    def count(self, **counters):
+        with self.lock:
+            for key, value in counters.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+
+    def add_error(self, message):
+        message = ' '.join(message.split())[:500]
+        if message not in self.errors and len(self.errors) < MAX_ERRORS:
+            self.errors.append(message)
+
+    def finish(self, exit_code, error=None):
+        """Stop observing and return the record as a dict"""
+        duration = time.perf_counter() - self.start
+        with _active_lock:
+            if self in _active:
+                _active.remove(self)
+            if not _active:
+                remove_observer(_observe)
+        if getattr(_current, 'record', None) is self:
+            _current.record = self.previous
+        after = binlog_snapshot()
+        if error:
+            self.add_error(error)
+
+        binlog_bytes = None
+        if self.binlog_before and after:
+            try:
+                binlog_bytes = binlog_bytes_between(self.binlog_before, after)
+            except Exception:
+                pass
+        return {
+            'command': self.command,
+            'args': self.args,
+            'pid': os.getpid(),
+            'started_at': self.started_at.isoformat(timespec='milliseconds'),
+            'ended_at': datetime.now().isoformat(timespec='milliseconds'),
+            'duration_s': round(duration, 3),
+            'exit_code': exit_code,
+            'operations': {
+                'statements': self.statements,
+                'failed': self.failed,
+                'bytes_sent': self.bytes_sent,
+                'statements_per_s': round(self.statements / duration, 1) if duration else 0,
+                'bytes_per_s': round(self.bytes_sent / duration, 1) if duration else 0,
+            },
+            'counters': self.counters,
+            'latency': self.histogram.to_dict(),
+            'binlog': {
+                'before': self.binlog_before,
+                'after': after,
+                'bytes_written': binlog_bytes,
+            },
+            'errors': self.errors,
+        }
+
+
+def start_run(command, args):
+    """Start recording a command, or None when records are off or for --help"""
+    if RUN_RECORDS.lower() in ('', 'off', 'none', '0') or {'-h', '--help'} & set(args):
+        return None
+    return RunRecord(command, args)
+
+
+def write_record(record, path=RUN_RECORDS):
+    """Write a finished record to path (see module docstring for the formats)"""
+    try:
+        if os.path.isdir(path) or path.endswith('/'):
+            os.makedirs(path, exist_ok=True)
+            stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+            with open(os.path.join(path, f"{record['command']}-{stamp}-{record['pid']}.json"), 'w') as f:
+                json.dump(record, f, indent=2)
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if path.endswith('.json'):
+            with open(path, 'w') as f:
+                json.dump(record, f, indent=2)
+        else:
+            with open(path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+    except OSError as e:
+        print(f"Warning: could not write run record to {path}: {e}", file=sys.stderr)
+
+
+def finish_run(record, exit_code, error=None):
+    """Finish and write a record started by start_run"""
+    if record is not None:
+        write_record(record.finish(exit_code, error))
@@ -0,0 +1,347 @@
+"""Declarative scenarios: phased, concurrent workloads and faults with assertions
+
+A scenario file is JSON:
+
+    {"name": "cdc-resilience",
+     "phases": [
+       {"name": "baseline",
+        "steps": [
+          {"id": "load", "load": "sine:base=200,period=10", "duration": 30},
+          {"id": "ddl", "command": "schema-change", "args": ["--type", "add-column"], "at": 5},
+          {"id": "outage", "fault": "reject", "at": 10, "duration": 5},
+          {"id": "count", "sql": "SELECT COUNT(*) FROM users", "after": ["load"]}
+        ],
+        "assert": [
+          {"metric": "load.rate_error_max", "op": "<", "value": 0.2},
+          {"sql": "SELECT COUNT(*) FROM users", "op": ">", "value": 0}
+        ]}
+     ]}
+
+Phases run in order and each one is a barrier: every step of a phase
+finishes before its assertions run and the next phase starts. Steps of a
+phase start at their `at` offset (seconds from the phase start, on a
+monotonic clock) and run concurrently; `after` additionally waits for
+earlier steps of the same phase. Step kinds:
+
+    command  a toolkit command in a child process; with `duration` it is
+             interrupted (SIGINT) after that many seconds
+    load     single-row INSERTs following a load profile (see utils/load.py)
+    fault    a network timeline action held for `duration` seconds
+    sql      one statement over the shared session pool
+
+Every event (phase/step start and end, command output, load samples,
+assertion results) is one JSON line in the scenario's event stream.
+"""
+import json
+import operator
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+
+from utils.load import parse_profile, run_profile
+from utils.mysql_client import execute_sql
+from utils.timeline import sleep_until, wall_clock
+
+SCENARIO_DIR = '/opt/toolkit-data/scenarios'
+STEP_KINDS = ('command', 'load', 'fault', 'sql')
+STOP_GRACE = 10
+OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+def load_scenario(path):
+    """Read a scenario file and check its structure"""
+    with open(path) as f:
+        plan = json.load(f)
+    if not isinstance(plan, dict) or not plan.get('phases'):
+        raise ValueError("Scenario needs a non-empty 'phases' list")
+    plan.setdefault('name', os.path.splitext(os.path.basename(path))[0])
+
+    seen = set()
+    for p, phase in enumerate(plan['phases'], 1):
+        phase.setdefault('name', f'phase-{p}')
+        earlier = set()
+        for s, step in enumerate(phase.setdefault('steps', []), 1):
+            kinds = [k for k in STEP_KINDS if k in step]
+            if len(kinds) != 1:
+                raise ValueError(f"{phase['name']} step #{s}: needs exactly one of "
+                                 f"{', '.join(STEP_KINDS)}")
+            step['kind'] = kinds[0]
+            step.setdefault('id', f"{phase['name']}-{s}")
+            if step['id'] in seen:
+                raise ValueError(f"Duplicate step id {step['id']!r}")
+            if step['kind'] == 'load' and 'duration' not in step:
+                raise ValueError(f"Step {step['id']!r}: load steps need a duration")
+            if step.get('duration') is not None and float(step['duration']) < 0:
+                raise ValueError(f"Step {step['id']!r}: duration must not be negative")
+            for dep in step.get('after', []):
+                if dep not in earlier:
+                    raise ValueError(f"Step {step['id']!r}: 'after' must name an earlier "
+                                     f"step of the same phase, not {dep!r}")
+            seen.add(step['id'])
+            earlier.add(step['id'])
+        for a, assertion in enumerate(phase.setdefault('assert', []), 1):
+            if ('metric' in assertion) == ('sql' in assertion) or 'value' not in assertion:
+                raise ValueError(f"{phase['name']} assertion #{a}: needs 'metric' or 'sql', and 'value'")
+            if assertion.get('op', '==') not in OPERATORS:
+                raise ValueError(f"{phase['name']} assertion #{a}: op must be one of "
+                                 f"{' '.join(OPERATORS)}")
+    return plan
+
+
+def coerce(actual, expected):
+    """Convert a metric or SQL value to the type of the expected value"""
+    if isinstance(expected, bool):
+        return str(actual).lower() in ('1', 'true', 'yes', 'on')
+    if isinstance(expected, (int, float)) and not isinstance(actual, (int, float)):
+        return float(actual)
+    return actual
+
+
+class EventStream:
+    """NDJSON stream of scenario events, shared by every step"""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.file = open(path, 'w')
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+
+    def emit(self, event, **fields):
+        record = {
+            't': round(time.perf_counter() - self.start, 3),
+            'time': datetime.now().isoformat(timespec='milliseconds'),
+            'event': event,
+        }
+        record.update(fields)
+        with self.lock:
+            self.file.write(json.dumps(record) + '\n')
+            self.file.flush()
+        return record
+
+    def close(self):
+        self.file.close()
+
+
+class Scenario:
+    """Run a loaded scenario
+
+    fault_actions maps fault names to (start, end) callables as used by
+    the network timeline; make_insert(rows) returns one INSERT statement
+    for load steps.
+    """
+
+    def __init__(self, plan, events, fault_actions, make_insert, verbose=False):
+        for phase in plan['phases']:
+            for step in phase['steps']:
+                if step['kind'] == 'fault':
+                    if step['fault'] not in fault_actions:
+                        raise ValueError(f"Step {step['id']!r}: unknown fault {step['fault']!r} "
+                                         f"(choose from {', '.join(sorted(fault_actions))})")
+                    if fault_actions[step['fault']][1] and 'duration' not in step:
+                        raise ValueError(f"Step {step['id']!r}: fault {step['fault']!r} needs a duration")
+        self.plan = plan
+        self.events = events
+        self.fault_actions = fault_actions
+        self.make_insert = make_insert
+        self.verbose = verbose
+        self.stop = threading.Event()
+        self.metrics = {}
+        self.report = {'name': plan['name'], 'phases': [], 'interrupted': False}
+
+    def log(self, message):
+        print(f"[{wall_clock()}] {message}", flush=True)
+
+    # ---------- Steps ----------
+
+    def run_command(self, step):
+        argv = [sys.executable, os.path.abspath(sys.argv[0]), step['command']]
+        argv += [str(a) for a in step.get('args', [])]
+        env = dict(os.environ, PYTHONUNBUFFERED='1')
+        duration = step.get('duration')
+        if duration is not None:
+            # SIGINT stops an in-process command at once; a forwarded one is only
+            # interrupted once a blocking call in the daemon returns
+            env['TOOLKIT_NO_DAEMON'] = '1'
+        proc = subprocess.Popen(argv, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                stdin=subprocess.DEVNULL, text=True, bufsize=1, env=env)
+        interrupted = threading.Event()
+        threading.Thread(target=self.watch_process, args=(proc, duration, interrupted),
+                         daemon=True).start()
+        for line in proc.stdout:
+            line = line.rstrip('\n')
+            self.events.emit('output', step=step['id'], line=line)
+            if self.verbose:
+                print(f"    {step['id']} | {line}", flush=True)
+        code = proc.wait()
+        ok = code == 0 or (interrupted.is_set() and code == 130)
+        return {'exit': code, 'error': None if ok else f"exit code {code}"}
+
+    def watch_process(self, proc, duration, interrupted):
+        """Interrupt a command step at its deadline or when the scenario stops"""
+        deadline = time.perf_counter() + duration if duration is not None else None
+        while proc.poll() is None:
+            if self.stop.wait(0.05) or (deadline and time.perf_counter() >= deadline):
+                interrupted.set()
+                proc.send_signal(signal.SIGINT)
+                try:
+                    proc.wait(STOP_GRACE)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                return
+
+    def run_load(self, step):
+        rows = int(step.get('rows', 1))
+        stats = run_profile(
+            parse_profile(step['load']), float(step['duration']), lambda: self.make_insert(rows),
+            stop=self.stop, quiet=True,
+            on_sample=lambda sample: self.events.emit('sample', step=step['id'], **sample),
+        )
+        errors = [abs(s['actual_rate'] - s['intended_rate']) / s['intended_rate']
+                  for s in stats['intervals'] if s['intended_rate'] > 0]
+        return {
+            'intended': int(stats['intended']),
+            'done': stats['done'],
+            'rows': stats['done'] * rows,
+            'actual_rate': round(stats['done'] / max(stats['elapsed'], 1e-6), 1),
+            'rate_error_mean': round(sum(errors) / len(errors), 4) if errors else 0,
+            'rate_error_max': round(max(errors), 4) if errors else 0,
+        }
+
+    def run_fault(self, step):
+        start, end = self.fault_actions[step['fault']]
+        params = step.get('params', {})
+        start(params)
+        if end:
+            try:
+                self.stop.wait(float(step['duration']))
+            finally:
+                end(params)
+        return {}
+
+    def run_sql(self, step):
+        output = execute_sql(step['sql'], raw=True)
+        lines = output.split('\n') if output else []
+        return {'rows': len(lines), 'value': lines[0].split('\t')[0] if lines else None}
+
+    def run_step(self, step, phase_start, deps):
+        wait(deps)
+        sleep_until(phase_start + float(step.get('at', 0)), self.stop)
+        result = {'kind': step['kind'], 'ok': False, 'error': None}
+        if self.stop.is_set():
+            result['error'] = 'skipped'
+            self.metrics[step['id']] = result
+            return result
+
+        started = time.perf_counter()
+        result['started'] = round(started - phase_start, 3)
+        self.events.emit('step_start', step=step['id'], kind=step['kind'])
+        if self.verbose:
+            self.log(f"  start {step['id']} ({step['kind']})")
+        try:
+            result.update(getattr(self, f"run_{step['kind']}")(step))
+        except Exception as e:
+            result['error'] = str(e)
+        result['duration_s'] = round(time.perf_counter() - started, 3)
+        result['ok'] = result['error'] is None or step.get('allow_failure', False)
+        self.metrics[step['id']] = result
+        self.events.emit('step_end', step=step['id'], **result)
+        status = 'ok' if result['ok'] else f"FAILED ({result['error']})"
+        self.log(f"  {step['id']:20s} {step['kind']:8s} {result['duration_s']:8.2f}s  {status}")
+        return result
+
+    # ---------- Assertions ----------
+
+    def check(self, assertion):
+        expected = assertion['value']
+        op = assertion.get('op', '==')
+        entry = {'op': op, 'expected': expected}
+        try:
+            if 'sql' in assertion:
+                entry['sql'] = assertion['sql']
+                output = execute_sql(assertion['sql'], raw=True)
+                actual = output.split('\n')[0].split('\t')[0] if output else None
+            else:
+                entry['metric'] = assertion['metric']
+                step_id, _, key = assertion['metric'].rpartition('.')
+                if key not in self.metrics.get(step_id, {}):
+                    raise KeyError(f"unknown metric {assertion['metric']!r}")
+                actual = self.metrics[step_id][key]
+            entry['actual'] = coerce(actual, expected)
+            entry['passed'] = bool(OPERATORS[op](entry['actual'], expected))
+        except Exception as e:
+            entry.update(actual=None, passed=False, error=str(e))
+        self.events.emit('assert', **entry)
+        return entry
+
+    # ---------- Phases ----------
+
+    def run_phase(self, phase):
+        steps = phase['steps']
+        self.events.emit('phase_start', phase=phase['name'], steps=len(steps))
+        self.log(f"Phase {phase['name']}: {len(steps)} step(s)")
+        start = time.perf_counter()
+        futures = {}
+        with ThreadPoolExecutor(max_workers=max(len(steps), 1)) as pool:
+            for step in steps:
+                deps = [futures[d] for d in step.get('after', [])]
+                futures[step['id']] = pool.submit(self.run_step, step, start, deps)
+            try:
+                while wait(list(futures.values()), timeout=0.2).not_done:
+                    pass
+            except KeyboardInterrupt:
+                self.log("Interrupted, stopping steps and ending faults...")
+                self.report['interrupted'] = True
+                self.stop.set()
+
+        assertions = [] if self.stop.is_set() else [self.check(a) for a in phase['assert']]
+        for entry in assertions:
+            target = entry.get('metric') or entry.get('sql')
+            verdict = 'PASS' if entry['passed'] else 'FAIL'
+            detail = f" ({entry['error']})" if entry.get('error') else ''
+            self.log(f"  {verdict} {target} {entry['op']} {entry['expected']!r}: "
+                     f"actual {entry['actual']!r}{detail}")
+
+        result = {
+            'name': phase['name'],
+            'duration_s': round(time.perf_counter() - start, 3),
+            'steps': {step['id']: self.metrics.get(step['id'], {}) for step in steps},
+            'assertions': assertions,
+        }
+        result['passed'] = (all(s.get('ok') for s in result['steps'].values())
+                            and all(a['passed'] for a in assertions))
+        self.events.emit('phase_end', phase=phase['name'], passed=result['passed'],
+                         duration_s=result['duration_s'])
+        return result
+
+    def run(self):
+        """Run every phase; stop at the first failed phase unless continue_on_failure"""
+        self.events.emit('scenario_start', name=self.plan['name'], phases=len(self.plan['phases']))
+        self.log(f"Scenario {self.plan['name']}: {len(self.plan['phases'])} phase(s), "
+                 f"events -> {self.events.path}")
+        start = time.perf_counter()
+        for phase in self.plan['phases']:
+            result = self.run_phase(phase)
+            self.report['phases'].append(result)
+            if self.stop.is_set() or (not result['passed']
+                                      and not self.plan.get('continue_on_failure')):
+                break
+        self.report['duration_s'] = round(time.perf_counter() - start, 3)
+        self.report['passed'] = (not self.report['interrupted']
+                                 and len(self.report['phases']) == len(self.plan['phases'])
+                                 and all(p['passed'] for p in self.report['phases']))
+        self.events.emit('scenario_end', passed=self.report['passed'],
+                         duration_s=self.report['duration_s'])
+        return self.report
@@ -0,0 +1,237 @@
+"""Schema version history keyed by binlog position / GTID (SQLite)"""
+import glob
+import json
+import os
+import sqlite3
+import time
+
+from utils.mysql_client import BINLOG_DIR, MYSQL_DATABASE, execute_sql, get_binlog_status
+from utils.binlog import (
+    BINLOG_MAGIC, FORMAT_DESCRIPTION_EVENT, GTID_EVENT, QUERY_EVENT, CHECKSUM_OFF,
+    iter_events, open_binlog, parse_format_description, parse_gtid, parse_query,
+)
+from utils.gtid_index import DATA_DIR, BINLOG_BASENAME, GtidIndex
+
+HISTORY_DB = f'{DATA_DIR}/schema_history.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS versions (
+    id INTEGER PRIMARY KEY,
+    file TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    gtid TEXT,
+    ts INTEGER NOT NULL,
+    ddl TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS versions_gtid ON versions (gtid);
+CREATE INDEX IF NOT EXISTS versions_pos ON versions (file, position);
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    columns TEXT,
+    PRIMARY KEY (table_name, version)
+) WITHOUT ROWID;
+"""
+
+
+def normalize_sql(sql):
+    """Lowercase, drop backticks and trailing ';', collapse whitespace"""
+    return ' '.join(sql.replace('`', '').lower().split()).rstrip(';').strip()
+
+
+def qualify(table, database=MYSQL_DATABASE):
+    """'users' -> 'testdb.users'"""
+    return table if '.' in table else f"{database}.{table}"
+
+
+def snapshot_columns(database=MYSQL_DATABASE):
+    """Return {db.table: ['column type', ...]} for every table of a database"""
+    output = execute_sql(
+        "SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE FROM information_schema.COLUMNS "
+        f"WHERE TABLE_SCHEMA = '{database}' ORDER BY TABLE_NAME, ORDINAL_POSITION;",
+        raw=True)
+    tables = {}
+    for line in output.split('\n'):
+        if line:
+            table, column, column_type = line.split('\t')
+            tables.setdefault(f"{database}.{table}", []).append(f"{column} {column_type}")
+    return tables
+
+
+def locate_statements(start, statements, binlog_dir=BINLOG_DIR):
+    """Find the binlog events of statements executed after start, in order
+
+    start is a get_binlog_status() result taken before the statements ran.
+    Returns [(file, end_position, gtid), ...] for the statements found; a
+    statement matches the first later non-BEGIN QUERY event whose text
+    starts with it (the server may append comments, e.g. to DROP TABLE).
+    """
+    pending = [normalize_sql(s)[:200] for s in statements]
+    found = []
+    names = sorted(os.path.basename(p) for p in
+                   glob.glob(f"{binlog_dir}/{BINLOG_BASENAME}.[0-9]*"))
+    for name in (n for n in names if n >= start['file']):
+        offset = start['position'] if name == start['file'] else 4
+        with open_binlog(f"{binlog_dir}/{name}") as buf:
+            if buf[:4] != BINLOG_MAGIC:
+                continue
+            checksums = False
+            gtid = None
+            for pos, type_code, length, _ in iter_events(buf, 4):
+                if type_code == FORMAT_DESCRIPTION_EVENT:
+                    checksums = parse_format_description(buf, pos, length)[0] != CHECKSUM_OFF
+                    break
+            for pos, type_code, length, _ in iter_events(buf, max(offset, 4)):
+                if type_code == GTID_EVENT:
+                    gtid = parse_gtid(buf, pos)
+                elif type_code == QUERY_EVENT:
+                    query = normalize_sql(parse_query(buf, pos, length, checksums)[1])
+                    if query != 'begin' and query.startswith(pending[len(found)]):
+                        found.append((name, pos + length, gtid))
+                        if len(found) == len(pending):
+                            return found
+    return found
+
+
+class SchemaHistory:
+    """Per-table column lists versioned by the binlog position of each DDL
+
+    Each DDL adds a version row (file, end position, GTID). Only tables
+    whose columns changed get a table_versions row, so the history is
+    stored as diffs. The schema of a table at any point is the latest
+    table row at or before the version in effect there: one indexed
+    lookup for DDL GTIDs, plus one GTID index lookup for other GTIDs.
+    """
+
+    def __init__(self, path=HISTORY_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        # Latest known columns per table, to store only changes
+        self.latest = {
+            table: columns for table, columns, _ in self.conn.execute(
+                "SELECT table_name, columns, MAX(version) FROM table_versions "
+                "GROUP BY table_name")
+        }
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record(self, file, position, gtid, ddl, tables, full=False):
+        """Add a version; tables maps db.table -> column list (None = dropped)
+
+        With full=True, tables is a complete snapshot and known tables that
+        are missing from it are recorded as dropped.
+        """
+        if gtid:
+            # A GTID can only be reused after RESET MASTER; keep the newest
+            self.conn.execute("UPDATE versions SET gtid = NULL WHERE gtid = ?", (gtid,))
+        cur = self.conn.execute(
+            "INSERT INTO versions (file, position, gtid, ts, ddl) "
+            "VALUES (?, ?, ?, ?, ?)", (file, position, gtid, int(time.time()), ddl))
+        version = cur.lastrowid
+        changes = {t: json.dumps(cols) for t, cols in tables.items() if cols is not None}
+        dropped = set(t for t, cols in tables.items() if cols is None)
+        if full:
+            dropped |= set(t for t, cols in self.latest.items()
+                           if cols is not None and t not in tables)
+        changes.update((t, None) for t in dropped)
+        rows = [(t, version, cols) for t, cols in changes.items() if self.latest.get(t) != cols]
+        self.conn.executemany(
+            "INSERT INTO table_versions (table_name, version, columns) VALUES (?, ?, ?)", rows)
+        for table, _, cols in rows:
+            self.latest[table] = cols
+        return version
+
+    def version_at_gtid(self, gtid):
+        """Version in effect at a GTID (the DDL itself, or the last DDL before it)
+
+        A DDL's own GTID is a direct hit. Any other GTID is looked up in the
+        binlog index (a B-tree search, O(log n)) and then by position. The
+        index is not brought up to date here, so GTIDs written after the
+        last binlog-index run return None.
+        """
+        row = self.conn.execute("SELECT id FROM versions WHERE gtid = ?", (gtid,)).fetchone()
+        if row:
+            return row[0]
+        with GtidIndex() as index:
+            entry = index.lookup_gtid(gtid)
+        if not entry:
+            return None
+        return self.version_at_position(entry['file'], entry['start'])
+
+    def version_at_position(self, file, position):
+        """Latest version recorded at or before a binlog position"""
+        row = self.conn.execute(
+            "SELECT id FROM versions WHERE file = ? AND position <= ? "
+            "ORDER BY position DESC LIMIT 1", (file, position)).fetchone()
+        if not row:
+            row = self.conn.execute(
+                "SELECT id FROM versions WHERE file < ? "
+                "ORDER BY file DESC, position DESC LIMIT 1", (file,)).fetchone()
+        return row[0] if row else None
+
+    def table_at(self, table, version):
+        """Column list of a table at a version (None if unknown or dropped)"""
+        if version is None:
+            return None
+        row = self.conn.execute(
+            "SELECT columns FROM table_versions WHERE table_name = ? AND version <= ? "
+            "ORDER BY version DESC LIMIT 1", (qualify(table), version)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def schema_at_gtid(self, table, gtid):
+        """Columns of a table as of a GTID"""
+        return self.table_at(table, self.version_at_gtid(gtid))
+
+    def schema_at_position(self, table, file, position):
+        """Columns of a table as of a binlog position"""
+        return self.table_at(table, self.version_at_position(file, position))
+
+    def versions(self, table=None, limit=50):
+        """Most recent versions (optionally only those changing one table)"""
+        if table:
+            rows = self.conn.execute(
+                "SELECT v.id, v.file, v.position, v.gtid, v.ts, v.ddl FROM versions v "
+                "JOIN table_versions t ON t.version = v.id WHERE t.table_name = ? "
+                "ORDER BY v.id DESC LIMIT ?", (qualify(table), limit)).fetchall()
+        else:
+            rows = self.conn.execute(
+                "SELECT id, file, position, gtid, ts, ddl FROM versions "
+                "ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [{'version': r[0], 'file': r[1], 'position': r[2], 'gtid': r[3],
+                 'timestamp': r[4], 'ddl': r[5]} for r in rows]
+
+
+def record_ddl(statements, start, snapshots=None, path=HISTORY_DB):
+    """Record schema versions for DDL statements executed after start
+
+    snapshots, if given, holds one {db.table: columns} dict per statement
+    (as tracked by the caller); otherwise the whole database is snapshotted
+    once and attached to the last statement. Statements that cannot be
+    found in the binlog fall back to the current binlog position.
+    """
+    try:
+        located = locate_statements(start, statements)
+        if len(located) < len(statements):
+            status = get_binlog_status()
+            located += [(status['file'], status['position'], None)] * (len(statements) - len(located))
+        with SchemaHistory(path) as history, history.conn:
+            for i, (sql, (file, position, gtid)) in enumerate(zip(statements, located)):
+                if snapshots:
+                    history.record(file, position, gtid, sql.strip(), snapshots[i])
+                elif i == len(statements) - 1:
+                    history.record(file, position, gtid, sql.strip(), snapshot_columns(), full=True)
+                else:
+                    history.record(file, position, gtid, sql.strip(), {})
+    except Exception as e:
+        print(f"Warning: schema history not recorded: {e}")
@@ -0,0 +1,153 @@
+"""Declarative fault timeline executed against a monotonic clock"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+SPIN_SECONDS = 0.002
+
+
+def load_plan(path):
+    """Read a plan file: {"faults": [...]} or a bare list of faults"""
+    with open(path) as f:
+        plan = json.load(f)
+    return plan['faults'] if isinstance(plan, dict) else plan
+
+
+def wall_clock():
+    """Current time with millisecond precision"""
+    return datetime.now().strftime("%H:%M:%S.%f")[:-3]
+
+
+def sleep_until(deadline, stop=None):
+    """Sleep until a perf_counter deadline; sleep coarse, then spin the last ms"""
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0 or (stop and stop.is_set()):
+            return
+        if remaining > SPIN_SECONDS:
+            if stop:
+                stop.wait(remaining - SPIN_SECONDS)
+            else:
+                time.sleep(remaining - SPIN_SECONDS)
+
+
+class Timeline:
+    """Run fault start/end transitions at planned offsets
+
+    Each fault is {"at": seconds, "action": name, "duration": seconds,
+    "params": {...}}. actions maps a name to (start, end) callables taking
+    the params dict; end may be None for instant actions. Transitions are
+    scheduled at absolute offsets from one monotonic start time and run in
+    worker threads. A slow action (e.g. waiting for mysqld) therefore
+    never delays later transitions, and lateness never accumulates. A
+    fault's end waits for its own start to finish. Faults may overlap.
+    """
+
+    def __init__(self, faults, actions, workers=8):
+        self.actions = actions
+        self.faults = []
+        for i, fault in enumerate(faults, 1):
+            if fault.get('action') not in actions:
+                raise ValueError(f"Fault #{i}: unknown action {fault.get('action')!r} "
+                                 f"(choose from {', '.join(sorted(actions))})")
+            if fault.get('duration') is not None and float(fault['duration']) < 0:
+                raise ValueError(f"Fault #{i}: duration must not be negative")
+            self.faults.append(dict(fault, id=i, at=float(fault.get('at', 0)),
+                                    params=fault.get('params', {})))
+        self.workers = workers
+        self.log = []
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+
+    def transitions(self):
+        """Sorted (offset, kind, fault) transitions
+
+        At the same offset, ends of earlier faults come before starts (a
+        fault is lifted before the next one is applied), and a zero-length
+        fault ends after it starts.
+        """
+        items = []
+        for fault in self.faults:
+            items.append((fault['at'], 'start', fault))
+            end = self.actions[fault['action']][1]
+            if end and fault.get('duration') is not None:
+                items.append((fault['at'] + float(fault['duration']), 'end', fault))
+        return sorted(items, key=lambda t: (t[0], self.order(t), t[2]['id']))
+
+    @staticmethod
+    def order(transition):
+        offset, kind, fault = transition
+        if kind == 'start':
+            return 1
+        return 0 if fault['at'] < offset else 2
+
+    def record(self, fault, kind, planned, dispatched, finished, error):
+        entry = {
+            'fault': fault['id'],
+            'action': fault['action'],
+            'transition': kind,
+            'planned': round(planned, 3),
+            'actual': round(dispatched, 3),
+            'drift_ms': round((dispatched - planned) * 1000, 1),
+            'took_ms': round((finished - dispatched) * 1000, 1),
+            'error': error,
+        }
+        with self.lock:
+            self.log.append(entry)
+        status = f"ERROR {error}" if error else f"done in {entry['took_ms']:.0f}ms"
+        print(f"[{wall_clock()}] #{fault['id']} {kind.upper():5s} {fault['action']:12s} "
+              f"planned +{planned:.3f}s actual +{dispatched:.3f}s "
+              f"(drift {entry['drift_ms']:+.1f}ms) {status}", flush=True)
+
+    def execute(self, kind, fault, planned, start, wait_for=None):
+        if wait_for is not None:
+            wait_for.result()
+        dispatched = time.perf_counter() - start
+        func = self.actions[fault['action']][0 if kind == 'start' else 1]
+        error = None
+        try:
+            func(fault['params'])
+        except Exception as e:
+            error = str(e)
+        self.record(fault, kind, planned, dispatched, time.perf_counter() - start, error)
+
+    def run(self):
+        """Execute the plan; on Ctrl+C, end every fault that has started"""
+        transitions = self.transitions()
+        started = {}
+        ended = set()
+        print(f"[{wall_clock()}] Timeline: {len(self.faults)} fault(s), "
+              f"{len(transitions)} transition(s), "
+              f"{transitions[-1][0] if transitions else 0:.3f}s", flush=True)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            start = time.perf_counter()
+            try:
+                for offset, kind, fault in transitions:
+                    sleep_until(start + offset, self.stop)
+                    if self.stop.is_set():
+                        break
+                    if kind == 'start':
+                        started[fault['id']] = pool.submit(self.execute, kind, fault, offset, start)
+                    else:
+                        ended.add(fault['id'])
+                        pool.submit(self.execute, kind, fault, offset, start, started[fault['id']])
+            except KeyboardInterrupt:
+                print(f"\n[{wall_clock()}] Timeline interrupted, ending active faults...")
+                now = time.perf_counter() - start
+                for fault in self.faults:
+                    if fault['id'] in started and fault['id'] not in ended \
+                            and self.actions[fault['action']][1]:
+                        pool.submit(self.execute, 'end', fault, now, start, started[fault['id']])
+        self.summary()
+        return self.log
+
+    def summary(self):
+        if not self.log:
+            return
+        drifts = [abs(e['drift_ms']) for e in self.log]
+        errors = [e for e in self.log if e['error']]
+        print("-" * 40)
+        print(f"Transitions: {len(self.log)}, max drift {max(drifts):.1f}ms, "
+              f"mean drift {sum(drifts) / len(drifts):.1f}ms, errors {len(errors)}")